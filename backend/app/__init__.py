@@ -0,0 +1 @@
+from app import config  # noqa: F401  (loads .env before the other modules read it)
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+from collections import deque
+from starlette.responses import JSONResponse
+from app import metrics
+
+# Admission control in front of the routes. Every request belongs to a class:
+# "pdf" (slip PDFs and the monthly ZIP), "hash" (login and signup, which
+# hash a password) or "default" (everything else, including the employee
+# import, whose hashing auth already keeps behind the logins). Each class
+# runs at most <CLASS>_CONCURRENCY requests at a time; the next
+# <CLASS>_QUEUE wait on the event loop, holding no thread, and later ones get
+# 503 with Retry-After at once. A request that waits ADMISSION_QUEUE_TIMEOUT
+# seconds is turned away the same way. So a wave of PDF downloads takes a
+# couple of threads from the request threadpool (40 threads) and queues the
+# rest, and /auth/me and the lists still find a free thread.
+#
+# Keep the three limits together under the threadpool size; each worker
+# process has its own limits. Waits are recorded in
+# payroll_admission_wait_seconds and rejections in
+# payroll_admission_rejected_total on /metrics. The event streams and
+# /metrics are not limited.
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_PDF_CONCURRENCY = int(os.getenv("ADMISSION_PDF_CONCURRENCY", os.cpu_count() or 2))
+ADMISSION_PDF_QUEUE = int(os.getenv("ADMISSION_PDF_QUEUE", 64))
+ADMISSION_HASH_CONCURRENCY = int(os.getenv("ADMISSION_HASH_CONCURRENCY", os.cpu_count() or 2))
+ADMISSION_HASH_QUEUE = int(os.getenv("ADMISSION_HASH_QUEUE", 64))
+ADMISSION_DEFAULT_CONCURRENCY = int(os.getenv("ADMISSION_DEFAULT_CONCURRENCY", 24))
+ADMISSION_DEFAULT_QUEUE = int(os.getenv("ADMISSION_DEFAULT_QUEUE", 512))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 10))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+
+HASH_PATHS = {"/auth/login", "/auth/signup"}
+UNLIMITED_PATHS = {"/metrics", "/admin/events", "/employee/events"}
+
+
+def route_class(path):
+    """The admission class of a request path, or None when it is not limited."""
+    if path.endswith("/pdf") or path.endswith("/pdf-archive"):
+        return "pdf"
+    if path in HASH_PATHS:
+        return "hash"
+    if path in UNLIMITED_PATHS:
+        return None
+    return "default"
+
+
+class Rejected(Exception):
+    """Raised by Limiter.acquire when a request is not admitted."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Limiter:
+    """
+    A concurrency limit with a bounded FIFO queue. Used from the event loop
+    only, so it needs no lock; a released slot passes straight to the
+    oldest waiter.
+    """
+
+    def __init__(self, name, concurrency, queue_depth):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.active = 0
+        self._waiters = deque()
+
+    async def acquire(self, timeout=ADMISSION_QUEUE_TIMEOUT):
+        """Take a slot, waiting up to `timeout` seconds; returns the time spent waiting."""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return 0.0
+        if len(self._waiters) >= self.queue_depth:
+            raise Rejected("queue_full")
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just as we gave up
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise Rejected("timeout") from None
+            raise
+        return time.perf_counter() - start
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+limiters = {
+    "pdf": Limiter("pdf", ADMISSION_PDF_CONCURRENCY, ADMISSION_PDF_QUEUE),
+    "hash": Limiter("hash", ADMISSION_HASH_CONCURRENCY, ADMISSION_HASH_QUEUE),
+    "default": Limiter("default", ADMISSION_DEFAULT_CONCURRENCY, ADMISSION_DEFAULT_QUEUE),
+}
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware; the slot is held until the response, streamed or not, is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters[name]
+        try:
+            wait = await limiter.acquire()
+        except Rejected as e:
+            metrics.admission_rejected.inc(route_class=name, reason=e.reason)
+            response = JSONResponse(
+                {"detail": "Server is busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+        metrics.admission_wait.observe(wait, route_class=name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from itertools import chain
+from sqlalchemy import delete, insert, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlmodel import Session, func, select
+from app import archive, models
+
+# Payroll totals per month and expense totals per (month, category, status)
+# are kept up to date by crud with atomic "add this delta" upserts in the same
+# transaction as the change, so the dashboard summary reads a handful of rows
+# however much history exists. `python -m app.aggregates` rebuilds them from
+# scratch.
+
+SLIP_FIELDS = ("basic", "allowances", "deductions", "net_pay")
+
+
+def expense_month(date):
+    return date.strftime("%Y-%m")
+
+
+def slip_row(slip):
+    return {f: getattr(slip, f) for f in ("month",) + SLIP_FIELDS}
+
+
+def expense_row(exp):
+    return {f: getattr(exp, f) for f in ("date", "category", "status", "amount")}
+
+
+def _upsert(session: Session, model, keys: dict, deltas: dict):
+    """Add `deltas` to the row identified by `keys`, creating it if needed."""
+    dialect = session.get_bind().dialect.name
+    values = dict(keys, **deltas)
+    if dialect in ("sqlite", "postgresql"):
+        ins = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(model).values(**values)
+        stmt = ins.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: getattr(model, c) + ins.excluded[c] for c in deltas},
+        )
+        session.execute(stmt)
+    elif dialect in ("mysql", "mariadb"):
+        ins = mysql.insert(model).values(**values)
+        session.execute(ins.on_duplicate_key_update({c: getattr(model, c) + ins.inserted[c] for c in deltas}))
+    else:
+        stmt = update(model).where(*(getattr(model, k) == v for k, v in keys.items()))
+        result = session.execute(stmt.values({c: getattr(model, c) + v for c, v in deltas.items()}))
+        if result.rowcount == 0:
+            session.execute(insert(model).values(**values))
+
+
+def add_slips(session: Session, rows, sign=1):
+    """Apply slips (mappings with month and amounts) to the monthly totals; sign=-1 removes them."""
+    totals = defaultdict(lambda: dict(slip_count=0, **{f: 0.0 for f in SLIP_FIELDS}))
+    for row in rows:
+        t = totals[row["month"]]
+        t["slip_count"] += sign
+        for f in SLIP_FIELDS:
+            t[f] += sign * row[f]
+    for month in sorted(totals):
+        _upsert(session, models.PayrollMonthTotal, {"month": month}, totals[month])
+
+
+def _expense_totals(rows, sign=1):
+    totals = defaultdict(lambda: dict(expense_count=0, amount=0.0))
+    for row in rows:
+        t = totals[(expense_month(row["date"]), row["category"], row["status"])]
+        t["expense_count"] += sign
+        t["amount"] += sign * row["amount"]
+    return totals
+
+
+def _write_expense_totals(session: Session, totals):
+    for month, category, status in sorted(totals):
+        keys = {"month": month, "category": category, "status": status}
+        _upsert(session, models.ExpenseTotal, keys, totals[(month, category, status)])
+
+
+def add_expenses(session: Session, rows, sign=1):
+    """Apply expenses (mappings with date, category, status, amount) to the expense totals."""
+    _write_expense_totals(session, _expense_totals(rows, sign))
+
+
+def get_summary(session: Session, month: str | None = None):
+    payroll = select(models.PayrollMonthTotal).where(models.PayrollMonthTotal.slip_count > 0)
+    expenses = select(models.ExpenseTotal).where(models.ExpenseTotal.expense_count > 0)
+    if month:
+        payroll = payroll.where(models.PayrollMonthTotal.month == month)
+        expenses = expenses.where(models.ExpenseTotal.month == month)
+    payroll = payroll.order_by(models.PayrollMonthTotal.month)
+    expenses = expenses.order_by(models.ExpenseTotal.month, models.ExpenseTotal.category, models.ExpenseTotal.status)
+    return {"payroll": session.exec(payroll).all(), "expenses": session.exec(expenses).all()}
+
+
+def rebuild(session: Session):
+    """Recompute both aggregate tables from the slips and expenses. The caller commits."""
+    session.execute(delete(models.PayrollMonthTotal))
+    session.execute(delete(models.ExpenseTotal))
+
+    slip = models.SalarySlip
+    session.execute(
+        insert(models.PayrollMonthTotal).from_select(
+            ["month", "slip_count", *SLIP_FIELDS],
+            select(
+                slip.month,
+                func.count(),
+                *(func.coalesce(func.sum(getattr(slip, f)), 0.0) for f in SLIP_FIELDS),
+            ).group_by(slip.month),
+        )
+    )
+    # archived fiscal years are no longer in the live tables but still count;
+    # a row edited while it was being archived is in both and counts once
+    add_slips(session, archive.iter_rows(archive.SLIPS, ("month",) + SLIP_FIELDS, session))
+
+    # expenses are grouped by calendar month of their date; formatting dates
+    # differs per database, so that part is done here while streaming rows
+    stmt = select(models.Expense.date, models.Expense.category, models.Expense.status, models.Expense.amount)
+    live = session.execute(stmt.execution_options(yield_per=5000)).mappings()
+    archived = archive.iter_rows(archive.EXPENSES, ("date", "category", "status", "amount"), session)
+    totals = _expense_totals(chain(live, archived))
+    rows = [
+        dict(month=month, category=category, status=status, **t)
+        for (month, category, status), t in totals.items()
+    ]
+    if rows:
+        # the table was just emptied, so one bulk INSERT instead of upserts
+        session.execute(insert(models.ExpenseTotal), rows)
+
+
+def rebuild_if_empty(engine):
+    """Build the aggregates for a database that predates them."""
+    with Session(engine) as session:
+        if session.exec(select(models.PayrollMonthTotal.month).limit(1)).first() is not None:
+            return
+        if session.exec(select(models.ExpenseTotal.month).limit(1)).first() is not None:
+            return
+        has_slips = session.exec(select(models.SalarySlip.id).limit(1)).first() is not None
+        has_expenses = session.exec(select(models.Expense.id).limit(1)).first() is not None
+        if has_slips or has_expenses or archive.archives():
+            rebuild(session)
+            session.commit()
+
+
+if __name__ == "__main__":
+    from app import database
+
+    database.init_db()
+    with Session(database.engine) as session:
+        rebuild(session)
+        session.commit()
+        summary = get_summary(session)
+    print(f"Rebuilt {len(summary['payroll'])} payroll months and {len(summary['expenses'])} expense groups")
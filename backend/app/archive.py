@@ -0,0 +1,662 @@
+import argparse
+import heapq
+import json
+import mmap
+import os
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, Float, Integer, and_, bindparam, delete
+from sqlmodel import Session, func, select
+from app import fastjson, models, pagination
+
+# Hot/cold split of salary-slip and expense history. `python -m app.archive`
+# moves closed fiscal years out of the live tables into one read-only file
+# per year under ARCHIVE_DIR, so the tables and their indexes only hold the
+# recent years. The files are columnar: each column is stored in compressed
+# blocks of BLOCK_ROWS rows, sorted by employee and date, with an index by
+# id, and read through mmap so only the blocks a request needs are
+# decompressed. The slip and expense lists, slip lookups and PDF downloads
+# fall through to the archives; pending expenses stay in the live table until
+# they are settled. Archived rows keep counting in the dashboard totals.
+# resolved once, so it does not depend on the directory a worker later runs in
+ARCHIVE_DIR = os.path.abspath(os.getenv("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "archive")))
+# month the fiscal year starts in: with 4, FY2024-25 runs April 2024 to March 2025
+FISCAL_YEAR_START_MONTH = int(os.getenv("FISCAL_YEAR_START_MONTH", 4))
+# decompressed column blocks kept in memory per archive file
+ARCHIVE_BLOCK_CACHE = int(os.getenv("ARCHIVE_BLOCK_CACHE", 256))
+
+BLOCK_ROWS = 1024
+DELETE_CHUNK = 500
+MAGIC = b"PAYARC01"
+SUFFIX = ".parc"
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+SLIPS = "salary_slips"
+EXPENSES = "expenses"
+# archived table -> (model, column an employee's history is ordered by)
+TABLES = {
+    SLIPS: (models.SalarySlip, "created_at"),
+    EXPENSES: (models.Expense, "date"),
+}
+
+
+def fiscal_year_of(month: str) -> int:
+    """Fiscal year, named by the calendar year it starts in, of a YYYY-MM month."""
+    year, mon = int(month[:4]), int(month[5:7])
+    return year if mon >= FISCAL_YEAR_START_MONTH else year - 1
+
+
+def fiscal_year_bounds(year):
+    """First day of fiscal year `year` and of the year after it."""
+    return datetime(year, FISCAL_YEAR_START_MONTH, 1), datetime(year + 1, FISCAL_YEAR_START_MONTH, 1)
+
+
+def label(year):
+    if FISCAL_YEAR_START_MONTH == 1:
+        return f"FY{year}"
+    return f"FY{year}-{(year + 1) % 100:02d}"
+
+
+def archive_path(year, directory=None):
+    return os.path.join(directory or ARCHIVE_DIR, f"fy{year}{SUFFIX}")
+
+
+def column_names(table):
+    return [c.name for c in TABLES[table][0].__table__.columns]
+
+
+# -------------------------------
+# COLUMN ENCODING
+# -------------------------------
+def _column_kind(column):
+    # fixed-width arrays for the non-null numbers and timestamps, JSON for the rest
+    if column.nullable:
+        return "json"
+    if isinstance(column.type, DateTime):
+        return "datetime"
+    if isinstance(column.type, Float):
+        return "float"
+    if isinstance(column.type, Integer):
+        return "int"
+    return "json"
+
+
+def _pack(code, values):
+    packed = array(code, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(code, raw):
+    packed = array(code)
+    packed.frombytes(raw)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed
+
+
+def _encode(kind, values):
+    if kind == "float":
+        raw = _pack("d", values)
+    elif kind == "int":
+        raw = _pack("q", values)
+    elif kind == "datetime":
+        raw = _pack("q", [(v - EPOCH) // _MICROSECOND for v in values])
+    else:
+        raw = fastjson.dumps(values)
+    return zlib.compress(raw, 6)
+
+
+def _decode(kind, data):
+    raw = zlib.decompress(data)
+    if kind == "float":
+        return _unpack("d", raw).tolist()
+    if kind == "int":
+        return _unpack("q", raw).tolist()
+    if kind == "datetime":
+        return [EPOCH + timedelta(microseconds=v) for v in _unpack("q", raw)]
+    return json.loads(raw)
+
+
+# -------------------------------
+# READING ARCHIVES
+# -------------------------------
+class Archive:
+    """One fiscal year's archive file, memory-mapped read-only."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # layout: MAGIC, column blocks, footer JSON, footer length, MAGIC
+        if len(self._mm) < 24 or self._mm[:8] != MAGIC or self._mm[-8:] != MAGIC:
+            raise ValueError(f"{path} is not a payroll archive")
+        length = int.from_bytes(self._mm[-16:-8], "little")
+        meta = json.loads(self._mm[-16 - length:-16])
+        self.fiscal_year = meta["fiscal_year"]
+        self.block_rows = meta["block_rows"]
+        self.tables = {name: ArchiveTable(self, name, m) for name, m in meta["tables"].items()}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def block(self, kind, ref, cache=True):
+        """Decoded values of the block at ref = [offset, length]."""
+        offset, length = ref
+        if not cache:
+            return _decode(kind, self._mm[offset:offset + length])
+        with self._lock:
+            values = self._cache.get(offset)
+            if values is not None:
+                self._cache.move_to_end(offset)
+                return values
+        values = _decode(kind, self._mm[offset:offset + length])
+        with self._lock:
+            self._cache[offset] = values
+            while len(self._cache) > ARCHIVE_BLOCK_CACHE:
+                self._cache.popitem(last=False)
+        return values
+
+    def close(self):
+        self._mm.close()
+
+
+class ArchiveTable:
+    def __init__(self, archive, name, meta):
+        self.archive = archive
+        self.name = name
+        self.rows = meta["rows"]
+        self.key = meta["key"]
+        self.max_key = datetime.fromisoformat(meta["max_key"]) if meta["max_key"] else None
+        self.block_rows = archive.block_rows
+        self.columns = {name: (c["kind"], c["blocks"]) for name, c in meta["columns"].items()}
+        self._index = meta["index"]
+        self._employees_ref = meta["employees"]
+        self._employees = None
+
+    def values(self, name, start, stop, cache=True):
+        """Column `name` for rows [start, stop); None for columns the file predates."""
+        if name not in self.columns:
+            return [None] * (stop - start)
+        if start >= stop:
+            return []
+        kind, blocks = self.columns[name]
+        first, last = start // self.block_rows, (stop - 1) // self.block_rows
+        out = []
+        for i in range(first, last + 1):
+            out.extend(self.archive.block(kind, blocks[i], cache))
+        offset = first * self.block_rows
+        return out[start - offset:stop - offset]
+
+    def records(self, start, stop, fields, cache=True):
+        columns = [self.values(name, start, stop, cache) for name in fields]
+        return [dict(zip(fields, row)) for row in zip(*columns)]
+
+    def employee_range(self, employee_id):
+        """Rows [start, stop) of one employee, oldest first."""
+        if self._employees is None:
+            self._employees = self.archive.block("json", self._employees_ref, cache=False)
+        ids, starts = self._employees
+        i = bisect_left(ids, employee_id)
+        if i == len(ids) or ids[i] != employee_id:
+            return 0, 0
+        return starts[i], starts[i + 1] if i + 1 < len(ids) else self.rows
+
+    def history(self, employee_id, before=None, limit=None, fields=None):
+        """An employee's rows newest first, starting after the (key, id) pair `before`."""
+        start, stop = self.employee_range(employee_id)
+        if start == stop:
+            return []
+        if before is not None:
+            keys = list(zip(self.values(self.key, start, stop), self.values("id", start, stop)))
+            stop = start + bisect_left(keys, tuple(before))
+        if limit:
+            start = max(start, stop - limit)
+        rows = self.records(start, stop, fields)
+        rows.reverse()
+        return rows
+
+    def find(self, row_id):
+        """Row number of `row_id`, or None."""
+        i = bisect_right(self._index["first"], row_id) - 1
+        if i < 0:
+            return None
+        ids = self.archive.block("json", self._index["id"][i])
+        j = bisect_left(ids, row_id)
+        if j == len(ids) or ids[j] != row_id:
+            return None
+        return self.archive.block("int", self._index["row"][i])[j]
+
+    def iter_records(self, fields):
+        """Every row in file order, decoded a block at a time without caching."""
+        for start in range(0, self.rows, self.block_rows):
+            yield from self.records(start, min(start + self.block_rows, self.rows), fields, cache=False)
+
+
+_open = {}  # (path, inode, mtime) -> Archive
+_dir_stamp = None
+_scan_lock = threading.Lock()
+
+
+def archives():
+    """Archives in ARCHIVE_DIR, newest fiscal year first, reopened when a file is replaced."""
+    global _open, _dir_stamp
+    try:
+        st = os.stat(ARCHIVE_DIR)
+        stamp = (st.st_ino, st.st_mtime_ns)
+    except FileNotFoundError:
+        stamp = None
+    if stamp == _dir_stamp:
+        return list(_open.values())
+    with _scan_lock:
+        if stamp != _dir_stamp:
+            found = {}
+            if stamp is not None:
+                for entry in os.scandir(ARCHIVE_DIR):
+                    if not entry.name.endswith(SUFFIX):
+                        continue
+                    st = entry.stat()
+                    key = (entry.path, st.st_ino, st.st_mtime_ns)
+                    # replaced files are left to the garbage collector: a
+                    # request on another thread may still be reading them
+                    found[key] = _open.get(key) or Archive(entry.path)
+            _open = dict(sorted(found.items(), key=lambda item: -item[1].fiscal_year))
+            _dir_stamp = stamp
+        return list(_open.values())
+
+
+def _sort_key(row, key):
+    if isinstance(row, dict):
+        return row[key], row["id"]
+    return getattr(row, key), row.id
+
+
+def merge_history(table, live, employee_id, limit=None, cursor=None, fields=None):
+    """
+    Complete a page of an employee's history (newest first) with archived rows.
+
+    `live` is the page read from the live table. The archives are only read
+    when that page is short or a file holds rows newer than its last one, so
+    recent pages never touch them. Archived rows are dicts of `fields`, or
+    model objects when `fields` is None, like the live ones.
+    """
+    found = archives()
+    if not found:
+        return live
+    model, key = TABLES[table]
+    floor = _sort_key(live[-1], key)[0] if limit and len(live) == limit else None
+    before = pagination.decode_cursor(cursor) if cursor else None
+    names = list(fields or column_names(table))
+    archived = []
+    for arc in found:
+        part = arc.tables.get(table)
+        if part is None or part.max_key is None or (floor is not None and part.max_key < floor):
+            continue
+        archived += part.history(employee_id, before, limit, names)
+    if not archived:
+        return live
+    # a row is in both while an archive run is deleting it from the live table
+    seen = {_sort_key(row, key)[1] for row in live}
+    archived = [row for row in archived if row["id"] not in seen]
+    if fields is None:
+        archived = [model(**row) for row in archived]
+    rows = sorted(live + archived, key=lambda row: _sort_key(row, key), reverse=True)
+    return rows[:limit] if limit else rows
+
+
+def find(table, row_id, fields=None):
+    """An archived row as a dict of `fields` (every model column by default), or None."""
+    for arc in archives():
+        part = arc.tables.get(table)
+        row = part.find(row_id) if part else None
+        if row is not None:
+            return part.records(row, row + 1, list(fields or column_names(table)))[0]
+    return None
+
+
+def slips_for_month(month, employee_ids=None):
+    """Archived slips of a YYYY-MM month as dicts, optionally for some employees only."""
+    try:
+        year = fiscal_year_of(month)
+    except ValueError:
+        return []
+    names = column_names(SLIPS)
+    for arc in archives():
+        part = arc.tables.get(SLIPS)
+        if arc.fiscal_year != year or part is None:
+            continue
+        if employee_ids:
+            ranges = [part.employee_range(e) for e in set(employee_ids)]
+        else:
+            ranges = [(0, part.rows)]
+        rows = []
+        for start, stop in ranges:
+            months = part.values("month", start, stop, cache=False)
+            for i, value in enumerate(months, start):
+                if value == month:
+                    rows += part.records(i, i + 1, names)
+        return rows
+    return []
+
+
+def iter_rows(table, fields, session: Session | None = None):
+    """
+    Every archived row of `table` as dicts of `fields`.
+
+    With a session, rows that are still in the live table (edited while an
+    archive run was deleting them) are left out, so the live copy wins.
+    """
+    parts = [arc.tables[table] for arc in archives() if table in arc.tables]
+    live = set()
+    newest = max((part.max_key for part in parts if part.max_key is not None), default=None)
+    if session is not None and newest is not None:
+        model, key = TABLES[table]
+        older = select(model.id).where(getattr(model, key) <= newest)
+        live = set(session.exec(older.execution_options(yield_per=5000)))
+    names = list(fields) if not live or "id" in fields else ["id", *fields]
+    for part in parts:
+        for row in part.iter_records(names):
+            if row["id"] not in live:
+                yield row
+
+
+# -------------------------------
+# WRITING ARCHIVES
+# -------------------------------
+class _TableWriter:
+    """Appends one table, fed in (employee_id, key, id) order, to an open archive file."""
+
+    def __init__(self, out, columns, key):
+        self.out = out
+        self.columns = columns
+        self.key = key
+        self.rows = 0
+        self.max_key = None
+        self.blocks = {name: [] for name, _ in columns}
+        self._pending = {name: [] for name, _ in columns}
+        self._employees, self._starts = [], []
+        self._ids = []
+
+    def _write(self, kind, values):
+        data = _encode(kind, values)
+        offset = self.out.tell()
+        self.out.write(data)
+        return [offset, len(data)]
+
+    def _flush(self):
+        for name, kind in self.columns:
+            if self._pending[name]:
+                self.blocks[name].append(self._write(kind, self._pending[name]))
+                self._pending[name] = []
+
+    def add(self, row):
+        if not self._employees or self._employees[-1] != row["employee_id"]:
+            self._employees.append(row["employee_id"])
+            self._starts.append(self.rows)
+        for name, _ in self.columns:
+            self._pending[name].append(row.get(name))
+        self._ids.append((row["id"], self.rows))
+        if self.max_key is None or row[self.key] > self.max_key:
+            self.max_key = row[self.key]
+        self.rows += 1
+        if self.rows % BLOCK_ROWS == 0:
+            self._flush()
+
+    def finish(self):
+        self._flush()
+        self._ids.sort()
+        index = {"first": [], "id": [], "row": []}
+        for i in range(0, len(self._ids), BLOCK_ROWS):
+            chunk = self._ids[i:i + BLOCK_ROWS]
+            index["first"].append(chunk[0][0])
+            index["id"].append(self._write("json", [row_id for row_id, _ in chunk]))
+            index["row"].append(self._write("int", [row for _, row in chunk]))
+        return {
+            "rows": self.rows,
+            "key": self.key,
+            "max_key": self.max_key.isoformat() if self.max_key else None,
+            "columns": {name: {"kind": kind, "blocks": self.blocks[name]} for name, kind in self.columns},
+            "employees": self._write("json", [self._employees, self._starts]),
+            "index": index,
+        }
+
+
+def _live_conditions(table, year):
+    start, end = fiscal_year_bounds(year)
+    if table == SLIPS:
+        month = models.SalarySlip.month
+        return [month >= f"{start:%Y-%m}", month < f"{end:%Y-%m}"]
+    date = models.Expense.date
+    return [date >= start, date < end, models.Expense.status != "pending"]
+
+
+def _with_components(session, rows):
+    """Attach each slip's computed breakdown as [name, kind, amount, rules_version] lists."""
+    comp = models.SalarySlipComponent
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) < DELETE_CHUNK:
+            continue
+        yield from _attach_components(session, comp, batch)
+        batch = []
+    yield from _attach_components(session, comp, batch)
+
+
+def _attach_components(session, comp, batch):
+    found = defaultdict(list)
+    if batch:
+        stmt = select(comp.slip_id, comp.name, comp.kind, comp.amount, comp.rules_version)
+        for slip_id, *component in session.exec(stmt.where(comp.slip_id.in_([r["id"] for r in batch]))).all():
+            found[slip_id].append(component)
+    for row in batch:
+        row["components"] = found.get(row["id"])
+        yield row
+
+
+def _merged(previous, live, key):
+    """Merge two sorted row streams; a live row replaces an archived one with the same id."""
+    last = None
+    merged = heapq.merge(previous, live, key=lambda row: (row["employee_id"], row[key], row["id"]))
+    for row in merged:
+        if last is not None and last["id"] != row["id"]:
+            yield last
+        last = row
+    if last is not None:
+        yield last
+
+
+def archive_fiscal_year(session: Session, year, directory=None):
+    """
+    Move a closed fiscal year's slips and settled expenses into its archive.
+
+    The file is written next to the final path and swapped in atomically,
+    merged with what an earlier run archived for the same year; the rows are
+    then deleted from the live tables in one transaction, those edited since
+    they were read excepted. Returns counts.
+    """
+    start, end = fiscal_year_bounds(year)
+    if end > datetime.utcnow():
+        raise ValueError(f"{label(year)} has not ended yet")
+    directory = directory or ARCHIVE_DIR
+    path = archive_path(year, directory)
+    summary = dict(fiscal_year=label(year), path=path, salary_slips=0, expenses=0, changed_kept=0)
+    pending = select(func.count()).select_from(models.Expense).where(
+        models.Expense.date >= start, models.Expense.date < end, models.Expense.status == "pending"
+    )
+    summary["pending_expenses_kept"] = session.exec(pending).one()
+
+    counts = {}
+    for table, (model, _) in TABLES.items():
+        counts[table] = session.exec(select(func.count()).select_from(model).where(*_live_conditions(table, year))).one()
+    if not any(counts.values()):
+        return summary
+
+    os.makedirs(directory, exist_ok=True)
+    previous = Archive(path) if os.path.exists(path) else None
+    moved = {}
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(MAGIC)
+            tables = {}
+            for table, (model, key) in TABLES.items():
+                columns = [(c.name, _column_kind(c)) for c in model.__table__.columns]
+                if table == SLIPS:
+                    columns.append(("components", "json"))
+                names = [name for name, _ in columns]
+                stmt = (
+                    select(model.__table__)
+                    .where(*_live_conditions(table, year))
+                    .order_by(model.employee_id, getattr(model, key), model.id)
+                )
+                result = session.execute(stmt.execution_options(stream_results=True, yield_per=5000)).mappings()
+                ids = moved[table] = []
+
+                def live_rows(result=result, ids=ids):
+                    for row in result:
+                        ids.append(row["id"])
+                        yield dict(row)
+
+                live = live_rows()
+                if table == SLIPS:
+                    live = _with_components(session, live)
+                old = previous.tables[table].iter_records(names) if previous and table in previous.tables else ()
+                writer = _TableWriter(out, columns, key)
+                for row in _merged(old, live, key):
+                    writer.add(row)
+                tables[table] = writer.finish()
+            footer = fastjson.dumps({"fiscal_year": year, "block_rows": BLOCK_ROWS, "tables": tables})
+            out.write(footer)
+            out.write(len(footer).to_bytes(8, "little"))
+            out.write(MAGIC)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    finally:
+        if previous is not None:
+            previous.close()
+
+    written = Archive(path)
+    try:
+        for table, ids in moved.items():
+            deleted = _delete_archived(session, table, written.tables[table], ids)
+            summary[table] = deleted
+            summary["changed_kept"] += len(ids) - deleted
+    finally:
+        written.close()
+    session.commit()
+    return summary
+
+
+def _delete_archived(session, table, part, ids):
+    """
+    Delete the live rows of `ids` that still hold what `part` archived for
+    them, and return how many went. A row edited after it was read stays
+    live (a live row takes precedence over its archived copy) and is
+    archived again by the next run.
+    """
+    model = TABLES[table][0]
+    names = column_names(table)
+    columns = model.__table__.c
+    unchanged = and_(
+        columns.id == bindparam("archived_id"),
+        *(columns[name].is_not_distinct_from(bindparam(f"archived_{name}")) for name in names if name != "id"),
+    )
+    wanted = set(ids)
+    conn = session.connection()
+    deleted = 0
+
+    def flush(batch):
+        chunk = [row["id"] for row in batch]
+        # lock the rows (PostgreSQL; SQLite has one writer) so none changes between the comparison and the delete
+        session.execute(select(model.id).where(model.id.in_(chunk)).with_for_update())
+        params = [{f"archived_{name}": row[name] for name in names} for row in batch]
+        if table == SLIPS:
+            comp = models.SalarySlipComponent
+            conn.execute(delete(comp).where(comp.slip_id.in_(select(columns.id).where(unchanged))), params)
+        conn.execute(delete(model.__table__).where(unchanged), params)
+        left = session.exec(select(func.count()).select_from(model).where(model.id.in_(chunk))).one()
+        return len(chunk) - left
+
+    batch = []
+    for row in part.iter_records(names):
+        if row["id"] not in wanted:
+            continue
+        batch.append(row)
+        if len(batch) == DELETE_CHUNK:
+            deleted += flush(batch)
+            batch = []
+    if batch:
+        deleted += flush(batch)
+    return deleted
+
+
+def closed_fiscal_years(session: Session, keep=1, today=None):
+    """Fiscal years with live rows that ended before the last `keep` closed years."""
+    today = today or datetime.utcnow()
+    last_closed = fiscal_year_of(f"{today:%Y-%m}") - 1
+    oldest_month = session.exec(select(func.min(models.SalarySlip.month))).one()
+    oldest_date = session.exec(select(func.min(models.Expense.date))).one()
+    oldest = []
+    if oldest_month:
+        try:
+            oldest.append(fiscal_year_of(oldest_month))
+        except ValueError:
+            pass
+    if oldest_date:
+        oldest.append(fiscal_year_of(f"{oldest_date:%Y-%m}"))
+    if not oldest:
+        return []
+    return list(range(min(oldest), last_closed - keep + 1))
+
+
+def vacuum(engine):
+    """Give the space freed by archiving back to the filesystem (SQLite only)."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+    return True
+
+
+if __name__ == "__main__":
+    from app import database
+
+    parser = argparse.ArgumentParser(description="Move closed fiscal years into archive files.")
+    parser.add_argument("--year", type=int, action="append", help="fiscal year to archive, by its starting year")
+    parser.add_argument("--keep", type=int, default=1, help="most recent closed years to leave live (default 1)")
+    parser.add_argument("--vacuum", action="store_true", help="compact a SQLite database afterwards")
+    parser.add_argument("--list", action="store_true", help="list the archive files and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for arc in archives():
+            counts = ", ".join(f"{part.rows} {name}" for name, part in arc.tables.items())
+            print(f"{label(arc.fiscal_year)}  {arc.path}  {os.path.getsize(arc.path) / 1024:.0f} KB  {counts}")
+        raise SystemExit
+
+    database.init_db()
+    with Session(database.engine) as session:
+        years = args.year or closed_fiscal_years(session, args.keep)
+        for year in years:
+            try:
+                result = archive_fiscal_year(session, year)
+            except ValueError as e:
+                raise SystemExit(str(e))
+            print(f"{result['fiscal_year']}: archived {result['salary_slips']} salary slips and "
+                  f"{result['expenses']} expenses, {result['pending_expenses_kept']} pending expenses left live")
+            if result["changed_kept"]:
+                print(f"  {result['changed_kept']} rows edited while archiving left live; run again to archive them")
+    if args.vacuum and vacuum(database.engine):
+        print("Database compacted")
@@ -0,0 +1,189 @@
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from sqlalchemy import insert
+from sqlmodel import Session
+from app import auth, fastjson, metrics, models
+
+# Append-only audit trail of salary slip and expense writes and of logins,
+# with the values before and after each change and who made it. crud records
+# an entry once its transaction has committed; the entry goes onto a bounded
+# in-process queue, and a writer thread inserts whatever accumulates within
+# AUDIT_FLUSH_SECONDS of the first entry with one statement and one commit
+# (group commit), so a write request only pays for building a dict and the
+# database sees a few audit commits a second however busy the API is. The
+# queue is flushed on shutdown.
+#
+# A full queue drops entries (counted in payroll_audit_entries_total with
+# result="dropped") rather than stall requests. Entries are collected while
+# the writer runs, i.e. in the API process with AUDIT_LOG=1; scripts calling
+# crud directly are not audited.
+AUDIT_LOG = os.getenv("AUDIT_LOG", "1") == "1"
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 50000))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 1000))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 0.2))
+AUDIT_WRITE_ATTEMPTS = int(os.getenv("AUDIT_WRITE_ATTEMPTS", 3))
+AUDIT_RETRY_SECONDS = float(os.getenv("AUDIT_RETRY_SECONDS", 1))
+
+SLIP_FIELDS = ("employee_id", "month", "basic", "allowances", "deductions", "net_pay", "notes")
+EXPENSE_FIELDS = ("employee_id", "date", "category", "amount", "description", "status", "admin_comment")
+
+# (bearer token, client address) of the request being served, set by AuditContextMiddleware
+_request: ContextVar[tuple | None] = ContextVar("audit_request", default=None)
+
+logger = logging.getLogger(__name__)
+
+
+def values(obj, fields):
+    """The audited fields of an ORM object or a row mapping."""
+    if isinstance(obj, dict):
+        return {f: obj.get(f) for f in fields}
+    return {f: getattr(obj, f) for f in fields}
+
+
+def _context(actor_id):
+    """(actor id, client address) of the current request."""
+    token, ip = _request.get() or (None, None)
+    if actor_id is None and token:
+        actor_id = auth.decode_token(token)
+    return actor_id, ip
+
+
+def _put(writer, entry):
+    try:
+        writer.queue.put_nowait(entry)
+    except queue.Full:
+        metrics.audit_entries.inc(result="dropped")
+
+
+def record(action, entity, entity_id, before=None, after=None, actor_id=None):
+    """Queue an audit entry; call after the change is committed. The actor defaults to the requesting user."""
+    writer = _writer
+    if writer is None:
+        return
+    actor_id, ip = _context(actor_id)
+    _put(writer, dict(
+        at=datetime.utcnow(), actor_id=actor_id, ip=ip,
+        action=action, entity=entity, entity_id=entity_id, before=before, after=after,
+    ))
+
+
+def record_many(action, entity, changes):
+    """Queue one entry per (entity_id, before, after) in `changes`, e.g. for a bulk update."""
+    writer = _writer
+    if writer is None:
+        return
+    actor_id, ip = _context(None)
+    now = datetime.utcnow()
+    for entity_id, before, after in changes:
+        _put(writer, dict(
+            at=now, actor_id=actor_id, ip=ip,
+            action=action, entity=entity, entity_id=entity_id, before=before, after=after,
+        ))
+
+
+def _json(value):
+    return None if value is None else fastjson.dumps(value).decode()
+
+
+class AuditWriter(threading.Thread):
+    """Background thread that batch-inserts queued entries until stopped."""
+
+    def __init__(self, engine, queue_size=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE, flush_seconds=AUDIT_FLUSH_SECONDS):
+        super().__init__(name="audit-writer", daemon=True)
+        self.engine = engine
+        self.queue = queue.Queue(queue_size)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.stopping = threading.Event()
+
+    def write(self, batch):
+        rows = [dict(e, id=models.gen_id(), before=_json(e["before"]), after=_json(e["after"])) for e in batch]
+        for attempt in range(1, AUDIT_WRITE_ATTEMPTS + 1):
+            try:
+                with Session(self.engine) as session:
+                    session.execute(insert(models.AuditLog), rows)
+                    session.commit()
+            except Exception as e:
+                logger.warning("audit writer error (attempt %d of %d): %s", attempt, AUDIT_WRITE_ATTEMPTS, e)
+                if attempt < AUDIT_WRITE_ATTEMPTS:
+                    time.sleep(AUDIT_RETRY_SECONDS)
+            else:
+                metrics.audit_entries.inc(len(rows), result="written")
+                return
+        metrics.audit_entries.inc(len(rows), result="dropped")
+
+    def run(self):
+        while True:
+            # wait for the first entry, looking at the stop flag every flush
+            # window, then collect what arrives in the window
+            try:
+                batch = [self.queue.get(timeout=self.flush_seconds)]
+            except queue.Empty:
+                if self.stopping.is_set():
+                    # everything queued before stop() has been written
+                    return
+                continue
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self.write(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self):
+        """Wait until every entry queued so far is written."""
+        self.queue.join()
+
+    def stop(self, timeout=10):
+        """Write out the queue, however full, then end the thread; waits up to `timeout` seconds."""
+        self.stopping.set()
+        self.join(timeout)
+
+
+_writer = None
+
+
+def start_writer(engine):
+    global _writer
+    if AUDIT_LOG and _writer is None:
+        _writer = AuditWriter(engine)
+        _writer.start()
+
+
+def stop_writer():
+    """Write out what is queued and stop; later entries are not collected."""
+    global _writer
+    if _writer is not None:
+        writer, _writer = _writer, None
+        writer.stop()
+
+
+def flush():
+    if _writer is not None:
+        _writer.flush()
+
+
+class AuditContextMiddleware:
+    """Makes the request's bearer token and client address visible to record()."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        reset = _request.set((auth.bearer_token(scope), client[0] if client else None))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request.reset(reset)
@@ -1,27 +1,92 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Query, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
-from app import models, database
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import models, database, metrics
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
 
+# Verified tokens and the user rows they resolve to are cached for a short
+# time so authenticated requests skip the JWT signature check and the user
+# lookup. Role changes and deletes in this process invalidate immediately;
+# other workers pick them up within AUTH_CACHE_TTL seconds.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", 60))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+
+# Password hashing runs on its own small pool instead of the request
+# threadpool. pbkdf2 releases the GIL, so the pool hashes in parallel. Login
+# and signup await their hash on the event loop, so a request waiting for the
+# pool holds no request thread. At most HASH_WORKERS + HASH_MAX_PENDING
+# operations may be queued; beyond that callers get HashPoolBusy at once.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 2))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", HASH_WORKERS * 4))
+
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+_hash_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_MAX_PENDING)
+# bulk imports never have more than HASH_WORKERS hashes queued, so logins
+# only ever wait behind a handful of them
+_bulk_slots = threading.BoundedSemaphore(HASH_WORKERS)
+
+
+class HashPoolBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+def _timed(operation, fn, *args):
+    with metrics.timed(operation):
+        return fn(*args)
+
+def _submit_hash(operation, fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise HashPoolBusy("Too many password operations in progress")
+    try:
+        future = _hash_pool.submit(_timed, operation, fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
 
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return _submit_hash("password_verify", pwd_context.verify, plain, hashed).result()
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _submit_hash("password_hash", pwd_context.hash, password).result()
+
+async def verify_password_async(plain, hashed):
+    """verify_password for async routes: the wait holds no thread."""
+    return await asyncio.wrap_future(_submit_hash("password_verify", pwd_context.verify, plain, hashed))
+
+async def get_password_hash_async(password):
+    return await asyncio.wrap_future(_submit_hash("password_hash", pwd_context.hash, password))
+
+def hash_passwords(passwords):
+    """Hash many passwords in parallel on the hashing pool, preserving order."""
+    futures = []
+    for password in passwords:
+        _bulk_slots.acquire()
+        future = _hash_pool.submit(_timed, "password_hash", pwd_context.hash, password)
+        future.add_done_callback(lambda _: _bulk_slots.release())
+        futures.append(future)
+    return [f.result() for f in futures]
 
 def create_access_token(*, data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,24 +99,161 @@ def create_access_token(*, data: dict, expires_delta: Optional[timedelta] = None
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(database.get_session)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-    )
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+USER_CACHE_FIELDS = ("id", "email", "full_name", "hashed_password", "role", "created_at")
+
+
+def invalidate_user(user_id):
+    user_cache.pop(user_id)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_user_on_write(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+def decode_token(token: str):
+    """Return the user id of a valid token, or None. Verified tokens are cached until they expire."""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        return None
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+    exp = payload.get("exp")
+    token_cache.set(token, user_id, ttl=exp - time.time() if exp else None)
+    return user_id
+
+
+def bearer_token(scope):
+    """The bearer token in an ASGI request scope's Authorization header, or None (for middleware)."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            return credentials if scheme.lower() == "bearer" else None
+    return None
+
+
+def _credentials_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+    )
+
+
+def _cached_user(user_id):
+    """A detached User built from the cache, or None on a miss."""
+    cached = user_cache.get(user_id)
+    if cached is None:
+        return None
+    user = models.User(**cached)
+    make_transient_to_detached(user)
+    return user
+
+
+def _remember_user(user):
+    user_cache.set(user.id, {f: getattr(user, f) for f in USER_CACHE_FIELDS})
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(database.get_session)):
+    user_id = decode_token(token)
+    if user_id is None:
+        raise _credentials_exception()
+
+    cached = _cached_user(user_id)
+    if cached is not None:
+        # attach the cached row to this session without a SELECT, so later
+        # session.get(models.User, ...) calls in the request hit the identity map
+        return session.merge(cached, load=False)
+
     user = session.get(models.User, user_id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    _remember_user(user)
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(database.get_async_session)):
+    """get_current_user for routes running on the async session."""
+    user_id = decode_token(token)
+    if user_id is None:
+        raise _credentials_exception()
+
+    cached = _cached_user(user_id)
+    if cached is not None:
+        return await session.merge(cached, load=False)
+
+    user = await session.get(models.User, user_id)
+    if user is None:
+        raise _credentials_exception()
+    _remember_user(user)
     return user
 
+def get_stream_user(token: Optional[str] = Depends(optional_oauth2_scheme), access_token: Optional[str] = Query(None)):
+    """
+    get_current_user for event streams. EventSource cannot send headers, so
+    the token may also come as ?access_token=. The session is closed before
+    returning instead of being held for the life of the stream.
+    """
+    with Session(database.engine) as session:
+        return get_current_user(token or access_token or "", session)
+
 def require_admin(user: models.User = Depends(get_current_user)):
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    return user
\ No newline at end of file
+    return user
+
+async def require_admin_async(user: models.User = Depends(get_current_user_async)):
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return user
+
+# the user and admin dependencies sharing the session of database.get_db
+get_user = get_current_user_async if database.ASYNC_DB else get_current_user
+get_admin = require_admin_async if database.ASYNC_DB else require_admin
@@ -0,0 +1,59 @@
+import os
+from sqlalchemy import inspect
+from sqlmodel import Session, SQLModel, select
+from app import aggregates, database
+from app.auth import get_password_hash
+from app.models import User
+
+# One-time database setup: tables and indexes, the demo admin and the
+# dashboard aggregates. Run it once per deploy with `python -m app.bootstrap`
+# before starting the workers, so each worker does not repeat the DDL
+# checks, the demo-user lookup and its password hash before serving; workers
+# only check that the tables exist. INIT_DB_ON_STARTUP=1 brings back the
+# setup on startup for local development.
+INIT_DB_ON_STARTUP = os.getenv("INIT_DB_ON_STARTUP", "0") == "1"
+
+DEMO_EMAIL = "hire-me@anshumat.org"
+
+
+def seed_demo_user(engine=None):
+    with Session(engine or database.engine) as session:
+        existing = session.exec(select(User).where(User.email == DEMO_EMAIL)).first()
+        if existing:
+            print("✔ Demo user already exists")
+            return
+
+        demo = User(
+            full_name="Hiring Manager",
+            email=DEMO_EMAIL,
+            hashed_password=get_password_hash("HireMe@2025!"),
+            role="admin"
+        )
+        session.add(demo)
+        session.commit()
+        print("🎉 Demo admin user created successfully!")
+
+
+def check_schema(engine=None):
+    """Fail fast at startup when the database has not been set up."""
+    import app.models  # ensure models are imported
+
+    engine = engine or database.engine
+    missing = sorted(set(SQLModel.metadata.tables) - set(inspect(engine).get_table_names()))
+    if missing:
+        raise RuntimeError(
+            f"Database at {database.DATABASE_URL} is missing tables {', '.join(missing)}; "
+            "run `python -m app.bootstrap` first (or start with INIT_DB_ON_STARTUP=1)"
+        )
+
+
+def run(engine=None):
+    engine = engine or database.engine
+    database.init_db(engine)
+    seed_demo_user(engine)  # <-- REQUIRED
+    aggregates.rebuild_if_empty(engine)
+
+
+if __name__ == "__main__":
+    run()
+    print(f"Database ready at {database.DATABASE_URL}")
@@ -0,0 +1,107 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlmodel import Session, select
+from app import models
+
+# Conditional GET for the lists clients poll: an employee's salary slips, an
+# employee's expenses and the pending-expense queue. Each list has a version
+# row (ListVersion) that crud bumps in the same transaction as any change to
+# it. The list routes read that one row first and answer If-None-Match /
+# If-Modified-Since with 304 Not Modified before running the list query.
+#
+# One ETag covers every page of a list, since any change can shift the pages.
+# ETags are weak because gzip may re-encode the body. Last-Modified has
+# one-second resolution; a client that sends both gets the exact ETag check.
+
+PENDING_EXPENSES = "expenses:pending"
+
+
+def salary_slips_of(employee_id):
+    return f"salary_slips:{employee_id}"
+
+
+def expenses_of(employee_id):
+    return f"expenses:{employee_id}"
+
+
+def bump(session: Session, scopes):
+    """Advance the version of each list in `scopes`; call before the commit that changes them."""
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    model = models.ListVersion
+    now = datetime.utcnow()
+    rows = [dict(scope=scope, version=1, updated_at=now) for scope in scopes]
+    dialect = session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        ins = (sqlite.insert if dialect == "sqlite" else postgresql.insert)(model)
+        stmt = ins.on_conflict_do_update(
+            index_elements=["scope"],
+            set_={"version": model.version + 1, "updated_at": ins.excluded.updated_at},
+        )
+        session.execute(stmt, rows)
+    elif dialect in ("mysql", "mariadb"):
+        ins = mysql.insert(model)
+        session.execute(ins.on_duplicate_key_update(version=model.version + 1, updated_at=ins.inserted.updated_at), rows)
+    else:
+        for row in rows:
+            stmt = update(model).where(model.scope == row["scope"]).values(version=model.version + 1, updated_at=now)
+            if session.execute(stmt).rowcount == 0:
+                session.execute(insert(model).values(**row))
+
+
+def current(session: Session, scope):
+    """(version, updated_at) of a list, or None before its first change."""
+    stmt = select(models.ListVersion.version, models.ListVersion.updated_at).where(models.ListVersion.scope == scope)
+    row = session.exec(stmt).first()
+    return tuple(row) if row else None
+
+
+def _etag(scope, state):
+    version, updated_at = state or (0, None)
+    # the update time tells apart lists recreated after a database reset
+    digest = hashlib.blake2b(f"{scope}:{version}:{updated_at}".encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _fresh(request: Request, etag, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored when If-None-Match is present
+        tags = {_opaque(t) for t in if_none_match.split(",")}
+        return "*" in tags or _opaque(etag) in tags
+    since = request.headers.get("if-modified-since")
+    if since and last_modified:
+        try:
+            since = parsedate_to_datetime(since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+def not_modified(request: Request, response: Response, scope, state):
+    """
+    Put the list's validators on `response`, and return a 304 response when
+    the client's copy is current (None when the list has to be sent).
+    """
+    etag = _etag(scope, state)
+    last_modified = state[1].replace(microsecond=0, tzinfo=timezone.utc) if state else None
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    if last_modified:
+        response.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if _fresh(request, etag, last_modified):
+        return Response(status_code=304, headers=dict(response.headers))
+    return None
@@ -0,0 +1,5 @@
+from dotenv import load_dotenv
+
+# The one place .env is read. app/__init__ imports this module, so the
+# environment is populated before any app module reads its settings at import.
+load_dotenv()
@@ -1,16 +1,21 @@
+import json
 from sqlmodel import Session, select
-from app import models, auth
+from pydantic import ValidationError
+from sqlalchemy import delete, func, insert, update
+from app import models, auth, pdf_cache, notifications, schemas, pagination, aggregates, fastjson, events, archive, conditional, audit, search
 from datetime import datetime
 
-def create_user(session: Session, user_in):
-    stmt = select(models.User).where(models.User.email == user_in.email)
-    user = session.exec(stmt).first()
-    if user:
+def get_user_by_email(session: Session, email: str):
+    return session.exec(select(models.User).where(models.User.email == email)).first()
+
+def create_user(session: Session, user_in, hashed_password: str | None = None):
+    """Create a user; pass `hashed_password` when the password was already hashed."""
+    if get_user_by_email(session, user_in.email):
         raise ValueError("Email already registered")
     user = models.User(
         email=user_in.email,
         full_name=user_in.full_name,
-        hashed_password=auth.get_password_hash(user_in.password),
+        hashed_password=hashed_password or auth.get_password_hash(user_in.password),
         role=user_in.role or "employee"
     )
     session.add(user)
@@ -18,13 +23,71 @@ def create_user(session: Session, user_in):
     session.refresh(user)
     return user
 
+def import_users(session: Session, rows):
+    """
+    Bulk-create users from dicts with email, password, full_name and role.
+
+    Rows are validated up front, duplicates are found with one query per
+    chunk of emails, passwords are hashed in parallel and everything is
+    written with one bulk INSERT and one commit. Returns (created, skipped)
+    where skipped holds dicts with line, email and reason.
+    """
+    valid, skipped, seen = [], [], set()
+    for line, row in rows:
+        try:
+            user_in = schemas.UserCreate(**row)
+        except ValidationError as e:
+            skipped.append(dict(line=line, email=row.get("email"), reason=e.errors()[0]["msg"]))
+            continue
+        email = user_in.email.lower()
+        if email in seen:
+            skipped.append(dict(line=line, email=user_in.email, reason="Duplicate email in file"))
+            continue
+        seen.add(email)
+        valid.append((line, user_in))
+
+    # emails are compared without case, in the file and against existing users
+    existing = set()
+    emails = list(seen)
+    for i in range(0, len(emails), 500):
+        stmt = select(func.lower(models.User.email)).where(func.lower(models.User.email).in_(emails[i:i + 500]))
+        existing.update(session.exec(stmt).all())
+    new = []
+    for line, user_in in valid:
+        if user_in.email.lower() in existing:
+            skipped.append(dict(line=line, email=user_in.email, reason="Email already registered"))
+        else:
+            new.append(user_in)
+
+    hashes = auth.hash_passwords([u.password for u in new])
+    now = datetime.utcnow()
+    users = [
+        dict(
+            id=models.gen_id(),
+            email=u.email,
+            full_name=u.full_name,
+            hashed_password=h,
+            role=u.role or "employee",
+            created_at=now,
+        )
+        for u, h in zip(new, hashes)
+    ]
+    if users:
+        session.execute(insert(models.User), users)
+    session.commit()
+    skipped.sort(key=lambda r: r["line"])
+    return len(users), skipped
+
 def authenticate_user(session: Session, email: str, password: str):
-    stmt = select(models.User).where(models.User.email == email)
-    user = session.exec(stmt).first()
-    if not user:
-        return None
-    if not auth.verify_password(password, user.hashed_password):
+    user = get_user_by_email(session, email)
+    return record_login(user, email, user is not None and auth.verify_password(password, user.hashed_password))
+
+def record_login(user, email: str, ok: bool):
+    """Audit a login attempt; returns the user if it succeeded, else None."""
+    if not ok:
+        audit.record("login_failed", "user", user.id if user else None, after={"email": email})
         return None
+    audit.record("login", "user", user.id, after={"email": email}, actor_id=user.id)
     return user
 
 def create_salary_slip(session: Session, slip_in):
@@ -39,25 +102,227 @@ def create_salary_slip(session: Session, slip_in):
         notes=slip_in.notes
     )
     session.add(slip)
+    aggregates.add_slips(session, [aggregates.slip_row(slip)])
+    conditional.bump(session, [conditional.salary_slips_of(slip.employee_id)])
+    employee = session.get(models.User, slip_in.employee_id)
+    if employee:
+        notifications.enqueue(
+            session,
+            employee.email,
+            "New Salary Slip Created",
+            f"A salary slip for {slip.month} has been created."
+        )
     session.commit()
     session.refresh(slip)
+    notifications.wake()
+    events.publish_slip("salary_slip.created", slip)
+    audit.record("create", "salary_slip", slip.id, after=audit.values(slip, audit.SLIP_FIELDS))
     return slip
 
+def _payroll_slip_inputs(session: Session, run_in):
+    """Slip inputs of a payroll run with the employees' emails, validated with one query."""
+    if run_in.slips:
+        slip_ins = [s.dict() for s in run_in.slips]
+        employee_ids = {s["employee_id"] for s in slip_ins}
+        stmt = select(models.User.id, models.User.email).where(models.User.id.in_(employee_ids))
+        employees = dict(session.exec(stmt).all())
+        missing = employee_ids - employees.keys()
+        if missing:
+            raise ValueError(f"Unknown employee ids: {', '.join(sorted(missing))}")
+    elif run_in.month and run_in.template:
+        stmt = select(models.User.id, models.User.email)
+        if run_in.employee_ids:
+            stmt = stmt.where(models.User.id.in_(run_in.employee_ids))
+        else:
+            stmt = stmt.where(models.User.role == "employee")
+        employees = dict(session.exec(stmt).all())
+        if run_in.employee_ids:
+            missing = set(run_in.employee_ids) - employees.keys()
+            if missing:
+                raise ValueError(f"Unknown employee ids: {', '.join(sorted(missing))}")
+        template = run_in.template.dict()
+        slip_ins = [dict(template, employee_id=emp_id, month=run_in.month) for emp_id in employees]
+    else:
+        raise ValueError("Provide either slips, or month and template")
+    if run_in.adjustments:
+        unknown = run_in.adjustments.keys() - {s["employee_id"] for s in slip_ins}
+        if unknown:
+            raise ValueError(f"Adjustments for employees not in the run: {', '.join(sorted(unknown))}")
+    return slip_ins, employees
+
+def _compute_payroll(slip_ins, run_in):
+    from app import payroll  # NumPy is only loaded once a run uses the rules
+
+    adjustments = {emp_id: adj.dict() for emp_id, adj in (run_in.adjustments or {}).items()}
+    return payroll.compute_slips(slip_ins, adjustments)
+
+def preview_payroll_run(session: Session, run_in):
+    """Computed components of a payroll run, without creating anything."""
+    slip_ins, _ = _payroll_slip_inputs(session, run_in)
+    computed, versions = _compute_payroll(slip_ins, run_in)
+    names = list(computed)
+    return [
+        dict(employee_id=s["employee_id"], month=s["month"], rules_version=version, **dict(zip(names, values)))
+        for s, version, values in zip(slip_ins, versions, zip(*computed.values()))
+    ]
+
+def create_payroll_run(session: Session, run_in):
+    """
+    Create a whole payroll run in one transaction.
+
+    All employees are validated with a single query, and the slips and their
+    notifications are written with bulk INSERTs and one commit. With
+    `apply_rules` the amounts are computed by app.payroll for the whole run
+    at once and each slip's components are stored with it.
+    """
+    if run_in.adjustments and not run_in.apply_rules:
+        raise ValueError("adjustments need apply_rules")
+    slip_ins, employees = _payroll_slip_inputs(session, run_in)
+
+    now = datetime.utcnow()
+    rows = [
+        dict(
+            id=models.gen_id(),
+            employee_id=s["employee_id"],
+            month=s["month"],
+            basic=s["basic"],
+            allowances=s["allowances"],
+            deductions=s["deductions"],
+            net_pay=s["basic"] + s["allowances"] - s["deductions"],
+            notes=s["notes"],
+            created_at=now,
+        )
+        for s in slip_ins
+    ]
+    components = []
+    if run_in.apply_rules and rows:
+        from app import payroll
+
+        computed, versions = _compute_payroll(slip_ins, run_in)
+        for i, r in enumerate(rows):
+            r["basic"] = computed["earned_basic"][i]
+            r["allowances"] = computed["earned_allowances"][i] + computed["arrears"][i]
+            r["deductions"] = computed["total_deductions"][i]
+            r["net_pay"] = computed["net_pay"][i]
+        components = payroll.component_rows([r["id"] for r in rows], computed, versions)
+    if rows:
+        session.execute(insert(models.SalarySlip), rows)
+        if components:
+            session.execute(insert(models.SalarySlipComponent), components)
+        aggregates.add_slips(session, rows)
+        conditional.bump(session, [conditional.salary_slips_of(r["employee_id"]) for r in rows])
+    notifications.enqueue_many(session, [
+        (employees[r["employee_id"]], "New Salary Slip Created", f"A salary slip for {r['month']} has been created.")
+        for r in rows
+    ])
+    session.commit()
+    notifications.wake()
+    # one event per employee, and a single summary for the admins
+    for r in rows:
+        events.publish_slip("salary_slip.created", r, admin=False)
+    audit.record_many("create", "salary_slip", ((r["id"], None, audit.values(r, audit.SLIP_FIELDS)) for r in rows))
+
+    summary = dict(
+        created=len(rows),
+        months=sorted({r["month"] for r in rows}),
+        total_basic=sum(r["basic"] for r in rows),
+        total_allowances=sum(r["allowances"] for r in rows),
+        total_deductions=sum(r["deductions"] for r in rows),
+        total_net_pay=sum(r["net_pay"] for r in rows),
+        slip_ids=[r["id"] for r in rows],
+    )
+    if rows:
+        events.publish("payroll_run.created", (events.ADMIN_CHANNEL,), {"created": summary["created"], "months": summary["months"]})
+    return summary
+
 def update_salary_slip(session: Session, slip_id: str, data: dict):
     slip = session.get(models.SalarySlip, slip_id)
     if not slip:
         return None
+    old = aggregates.slip_row(slip)
+    before = audit.values(slip, audit.SLIP_FIELDS)
     for k, v in data.items():
         setattr(slip, k, v)
     slip.net_pay = slip.basic + slip.allowances - slip.deductions
     session.add(slip)
+    # amounts entered by hand replace a computed breakdown
+    session.execute(delete(models.SalarySlipComponent).where(models.SalarySlipComponent.slip_id == slip_id))
+    aggregates.add_slips(session, [old], sign=-1)
+    aggregates.add_slips(session, [aggregates.slip_row(slip)])
+    conditional.bump(session, [conditional.salary_slips_of(before["employee_id"]), conditional.salary_slips_of(slip.employee_id)])
     session.commit()
     session.refresh(slip)
+    pdf_cache.invalidate(slip_id)
+    events.publish_slip("salary_slip.updated", slip)
+    audit.record("update", "salary_slip", slip_id, before, audit.values(slip, audit.SLIP_FIELDS))
+    return slip
+
+def _list_select(model, fields):
+    if fields is None:
+        return select(model)
+    return select(*(getattr(model, name) for name in fields))
+
+def _list_rows(session: Session, stmt, fields):
+    """ORM objects, or with `fields` plain dicts of just those columns (see app.fastjson)."""
+    if fields is None:
+        return session.exec(stmt).all()
+    return fastjson.records(session.execute(stmt), fields)
+
+def get_salary_slips_for_user(session: Session, user_id: str, limit: int | None = None, cursor: str | None = None, fields=None, archived=True):
+    """A page of an employee's slips, newest first; `archived=False` leaves out archived fiscal years."""
+    stmt = _list_select(models.SalarySlip, fields).where(models.SalarySlip.employee_id == user_id)
+    stmt = pagination.keyset(stmt, models.SalarySlip.created_at, models.SalarySlip.id, cursor, limit)
+    slips = _list_rows(session, stmt, fields)
+    if not archived:
+        return slips
+    return archive.merge_history(archive.SLIPS, slips, user_id, limit, cursor, fields)
+
+def get_salary_slip(session: Session, slip_id: str):
+    """A slip from the live table, or a detached copy from the archive of its fiscal year."""
+    slip = session.get(models.SalarySlip, slip_id)
+    if slip is None:
+        row = archive.find(archive.SLIPS, slip_id)
+        if row is not None:
+            slip = models.SalarySlip(**row)
     return slip
 
-def get_salary_slips_for_user(session: Session, user_id: str):
-    stmt = select(models.SalarySlip).where(models.SalarySlip.employee_id == user_id).order_by(models.SalarySlip.created_at.desc())
-    return session.exec(stmt).all()
+def get_salary_slip_components(session: Session, slip_id: str):
+    """The computed breakdown of a live or archived slip; no components for slips entered by hand."""
+    comp = models.SalarySlipComponent
+    stmt = select(comp.name, comp.kind, comp.amount, comp.rules_version).where(comp.slip_id == slip_id)
+    rows = [list(r) for r in session.exec(stmt).all()]
+    if not rows:
+        archived = archive.find(archive.SLIPS, slip_id, ["components"])
+        rows = (archived or {}).get("components") or []
+    from app import payroll
+
+    order = {name: i for i, name in enumerate(payroll.COMPONENTS)}
+    rows.sort(key=lambda r: order.get(r[0], len(order)))
+    return dict(
+        slip_id=slip_id,
+        rules_version=rows[0][3] if rows else None,
+        components=[dict(name=name, kind=kind, amount=amount) for name, kind, amount, _ in rows],
+    )
+
+def get_salary_slips_for_month(session: Session, month: str, employee_ids: list[str] | None = None):
+    """(slip, employee) pairs for a month, archived fiscal years included."""
+    stmt = (
+        select(models.SalarySlip, models.User)
+        .join(models.User, models.User.id == models.SalarySlip.employee_id)
+        .where(models.SalarySlip.month == month)
+    )
+    if employee_ids:
+        stmt = stmt.where(models.SalarySlip.employee_id.in_(employee_ids))
+    pairs = list(session.exec(stmt).all())
+    seen = {slip.id for slip, _ in pairs}
+    archived = [r for r in archive.slips_for_month(month, employee_ids) if r["id"] not in seen]
+    employee_ids = list({r["employee_id"] for r in archived})
+    users = {}
+    for i in range(0, len(employee_ids), BULK_CHUNK_SIZE):
+        stmt = select(models.User).where(models.User.id.in_(employee_ids[i:i + BULK_CHUNK_SIZE]))
+        users.update((u.id, u) for u in session.exec(stmt).all())
+    pairs += [(models.SalarySlip(**r), users[r["employee_id"]]) for r in archived if r["employee_id"] in users]
+    return pairs
 
 def create_expense(session: Session, employee_id: str, exp_in):
     exp = models.Expense(
@@ -67,26 +332,214 @@ def create_expense(session: Session, employee_id: str, exp_in):
         description=exp_in.description
     )
     session.add(exp)
+    aggregates.add_expenses(session, [aggregates.expense_row(exp)])
+    conditional.bump(session, [conditional.expenses_of(employee_id), conditional.PENDING_EXPENSES])
+    employee = session.get(models.User, employee_id)
+    notifications.enqueue(
+        session,
+        "admin@example.com",
+        "New Expense Submitted",
+        f"{employee.email} submitted expense {exp.id} of ₹{exp.amount:.2f}"
+    )
     session.commit()
     session.refresh(exp)
+    notifications.wake()
+    events.publish_expense("expense.created", exp)
+    audit.record("create", "expense", exp.id, after=audit.values(exp, audit.EXPENSE_FIELDS))
     return exp
 
-def get_expenses_for_user(session: Session, user_id: str):
-    stmt = select(models.Expense).where(models.Expense.employee_id == user_id).order_by(models.Expense.date.desc())
-    return session.exec(stmt).all()
+def get_expenses_for_user(session: Session, user_id: str, limit: int | None = None, cursor: str | None = None, fields=None, archived=True):
+    """A page of an employee's expenses, newest first; `archived=False` leaves out archived fiscal years."""
+    stmt = _list_select(models.Expense, fields).where(models.Expense.employee_id == user_id)
+    stmt = pagination.keyset(stmt, models.Expense.date, models.Expense.id, cursor, limit)
+    expenses = _list_rows(session, stmt, fields)
+    if not archived:
+        return expenses
+    return archive.merge_history(archive.EXPENSES, expenses, user_id, limit, cursor, fields)
+
+def get_all_pending_expenses(session: Session, limit: int | None = None, cursor: str | None = None, fields=None):
+    stmt = _list_select(models.Expense, fields).where(models.Expense.status == "pending")
+    stmt = pagination.keyset(stmt, models.Expense.date, models.Expense.id, cursor, limit)
+    return _list_rows(session, stmt, fields)
 
-def get_all_pending_expenses(session: Session):
-    stmt = select(models.Expense).where(models.Expense.status == "pending").order_by(models.Expense.date.desc())
-    return session.exec(stmt).all()
+def get_users(
+    session: Session,
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields=None,
+    q: str | None = None,
+    role: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """
+    Users oldest first, or with a search query `q` the best matches first
+    (see app.search); with `fields`, search results carry their `rank`.
+    """
+    user = models.User
+    where = []
+    if role is not None:
+        where.append(user.role == role)
+    if start is not None:
+        where.append(user.created_at >= start)
+    if end is not None:
+        where.append(user.created_at < end)
+    if q and search.terms(q):
+        stmt, rank = search.match(session, _list_select(user, fields), q, where, cursor, limit)
+        if fields is not None:
+            stmt = stmt.add_columns(rank.label("rank"))
+            fields = (*fields, "rank")
+        return _list_rows(session, stmt, fields)
+    stmt = _list_select(user, fields).where(*where)
+    stmt = pagination.keyset(stmt, user.created_at, user.id, cursor, limit, descending=False)
+    return _list_rows(session, stmt, fields)
+
+def get_audit_log(
+    session: Session,
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields=None,
+    entity: str | None = None,
+    entity_id: str | None = None,
+    actor_id: str | None = None,
+    action: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """Audit entries, newest first; with `fields`, before/after come back decoded."""
+    log = models.AuditLog
+    stmt = _list_select(log, fields)
+    for column, value in ((log.entity, entity), (log.entity_id, entity_id), (log.actor_id, actor_id), (log.action, action)):
+        if value is not None:
+            stmt = stmt.where(column == value)
+    if start is not None:
+        stmt = stmt.where(log.at >= start)
+    if end is not None:
+        stmt = stmt.where(log.at < end)
+    rows = _list_rows(session, pagination.keyset(stmt, log.at, log.id, cursor, limit), fields)
+    if fields is not None:
+        for row in rows:
+            for key in ("before", "after"):
+                if row.get(key) is not None:
+                    row[key] = json.loads(row[key])
+    return rows
 
 def update_expense_status(session: Session, expense_id: str, status: str, admin_comment: str | None = None):
     exp = session.get(models.Expense, expense_id)
     if not exp:
         return None
+    before = audit.values(exp, ("status", "admin_comment"))
+    if exp.status != status:
+        aggregates.add_expenses(session, [aggregates.expense_row(exp)], sign=-1)
+        aggregates.add_expenses(session, [dict(aggregates.expense_row(exp), status=status)])
+    scopes = [conditional.expenses_of(exp.employee_id)]
+    if "pending" in (exp.status, status):
+        scopes.append(conditional.PENDING_EXPENSES)
+    conditional.bump(session, scopes)
     exp.status = status
     if admin_comment:
         exp.admin_comment = admin_comment
     session.add(exp)
+    employee = session.get(models.User, exp.employee_id)
+    if employee:
+        notifications.enqueue(
+            session,
+            employee.email,
+            f"Expense {status}",
+            f"Your expense {exp.id} has been {status}. Comment: {admin_comment or ''}"
+        )
     session.commit()
     session.refresh(exp)
-    return exp
\ No newline at end of file
+    notifications.wake()
+    events.publish_expense("expense.updated", exp)
+    audit.record("update", "expense", expense_id, before, audit.values(exp, ("status", "admin_comment")))
+    return exp
+
+BULK_CHUNK_SIZE = 500
+
+def bulk_update_expense_status(
+    session: Session,
+    status: str,
+    expense_ids: list[str] | None = None,
+    category: str | None = None,
+    max_amount: float | None = None,
+    admin_comment: str | None = None,
+):
+    """
+    Approve or reject many pending expenses at once.
+
+    Expenses are selected by id and/or by category and an amount under
+    `max_amount` (exclusive); only pending ones change. The status is set with set-based UPDATE ... RETURNING
+    statements (chunks of ids on databases without RETURNING), the employees
+    are loaded with one query and the notifications are queued as one batch,
+    all in one transaction. Returns the affected expense rows.
+    """
+    if not expense_ids and category is None and max_amount is None:
+        raise ValueError("Provide expense_ids or a filter (category, max_amount)")
+
+    conditions = [models.Expense.status == "pending"]
+    if category is not None:
+        conditions.append(models.Expense.category == category)
+    if max_amount is not None:
+        conditions.append(models.Expense.amount < max_amount)
+    values = {"status": status}
+    if admin_comment:
+        values["admin_comment"] = admin_comment
+    columns = (models.Expense.id, models.Expense.employee_id, models.Expense.date, models.Expense.category, models.Expense.amount)
+
+    id_chunks = [None]
+    if expense_ids:
+        ids = list(dict.fromkeys(expense_ids))
+        id_chunks = [ids[i:i + BULK_CHUNK_SIZE] for i in range(0, len(ids), BULK_CHUNK_SIZE)]
+
+    changed = []
+    returning = session.get_bind().dialect.update_returning
+    for chunk in id_chunks:
+        where = list(conditions)
+        if chunk is not None:
+            where.append(models.Expense.id.in_(chunk))
+        if returning:
+            stmt = update(models.Expense).where(*where).values(values).returning(*columns)
+            changed += session.execute(stmt, execution_options={"synchronize_session": False}).mappings().all()
+            continue
+        # no RETURNING: lock the matching rows, then update them by id in batches,
+        # still only while pending. Where FOR UPDATE is not supported an expense
+        # may be decided in between; the whole action is then refused, as which
+        # of the batch this update changed cannot be told apart.
+        rows = session.execute(select(*columns).where(*where).with_for_update()).mappings().all()
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            batch = [r["id"] for r in rows[i:i + BULK_CHUNK_SIZE]]
+            stmt = update(models.Expense).where(models.Expense.id.in_(batch), models.Expense.status == "pending").values(values)
+            result = session.execute(stmt, execution_options={"synchronize_session": False})
+            if result.rowcount != len(batch):
+                session.rollback()
+                raise ValueError("Some of these expenses were approved or rejected meanwhile; try again")
+        changed += rows
+
+    if not changed:
+        session.rollback()
+        return []
+
+    old_rows = [dict(r, status="pending") for r in changed]
+    aggregates.add_expenses(session, old_rows, sign=-1)
+    aggregates.add_expenses(session, [dict(r, status=status) for r in old_rows])
+    conditional.bump(session, [conditional.expenses_of(r["employee_id"]) for r in changed] + [conditional.PENDING_EXPENSES])
+
+    employee_ids = {r["employee_id"] for r in changed}
+    emails = dict(session.exec(select(models.User.id, models.User.email).where(models.User.id.in_(employee_ids))).all())
+    notifications.enqueue_many(session, [
+        (
+            emails[r["employee_id"]],
+            f"Expense {status}",
+            f"Your expense {r['id']} has been {status}. Comment: {admin_comment or ''}",
+        )
+        for r in changed
+        if r["employee_id"] in emails
+    ])
+    session.commit()
+    notifications.wake()
+    for r in changed:
+        events.publish_expense("expense.updated", dict(r, status=status))
+    after = dict(status=status, admin_comment=admin_comment) if admin_comment else dict(status=status)
+    audit.record_many("update", "expense", ((r["id"], {"status": "pending"}, after) for r in changed))
+    return changed
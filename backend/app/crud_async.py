@@ -0,0 +1,91 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app import auth, crud, aggregates, archive, conditional
+
+# Awaitable versions of the crud functions used by the I/O-bound routes, so
+# each of those routes is written once, as async def, against database.get_db.
+# With ASYNC_DB the session is an AsyncSession and the sync implementation
+# runs through AsyncSession.run_sync, its database I/O awaited on the event
+# loop; otherwise it is a Session and the call runs on the threadpool as a
+# sync route would. Queries and business rules live in crud.py only.
+#
+# run_sync executes the Python side on the event loop, so reading archived
+# fiscal years (files to decompress) is handed to the threadpool separately.
+#
+# Login and signup await their password hash on the hashing pool (app.auth)
+# between the queries. Functions that do heavy CPU work or touch the PDF cache
+# on disk (import_users, create_payroll_run, update_salary_slip) are
+# deliberately not here: their routes stay sync so that work never blocks
+# the event loop.
+
+
+async def run(session, fn, *args, **kwargs):
+    """Call the sync `fn(session, *args, **kwargs)` with an AsyncSession or a Session."""
+    if isinstance(session, AsyncSession):
+        return await session.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, session, *args, **kwargs)
+
+
+async def _merge_history(table, live, *args):
+    if not archive.archives():
+        return live
+    return await run_in_threadpool(archive.merge_history, table, live, *args)
+
+
+async def create_user(session, user_in):
+    if await run(session, crud.get_user_by_email, user_in.email):
+        raise ValueError("Email already registered")
+    hashed = await auth.get_password_hash_async(user_in.password)
+    return await run(session, crud.create_user, user_in, hashed)
+
+
+async def authenticate_user(session, email: str, password: str):
+    user = await run(session, crud.get_user_by_email, email)
+    ok = user is not None and await auth.verify_password_async(password, user.hashed_password)
+    return crud.record_login(user, email, ok)
+
+
+async def create_salary_slip(session, slip_in):
+    return await run(session, crud.create_salary_slip, slip_in)
+
+
+async def get_salary_slips_for_user(session, user_id: str, limit: int | None = None, cursor: str | None = None, fields=None):
+    slips = await run(session, crud.get_salary_slips_for_user, user_id, limit, cursor, fields, archived=False)
+    return await _merge_history(archive.SLIPS, slips, user_id, limit, cursor, fields)
+
+
+async def create_expense(session, employee_id: str, exp_in):
+    return await run(session, crud.create_expense, employee_id, exp_in)
+
+
+async def get_expenses_for_user(session, user_id: str, limit: int | None = None, cursor: str | None = None, fields=None):
+    expenses = await run(session, crud.get_expenses_for_user, user_id, limit, cursor, fields, archived=False)
+    return await _merge_history(archive.EXPENSES, expenses, user_id, limit, cursor, fields)
+
+
+async def get_all_pending_expenses(session, limit: int | None = None, cursor: str | None = None, fields=None):
+    return await run(session, crud.get_all_pending_expenses, limit, cursor, fields)
+
+
+async def get_users(session, limit: int | None = None, cursor: str | None = None, fields=None, **filters):
+    return await run(session, crud.get_users, limit, cursor, fields, **filters)
+
+
+async def get_audit_log(session, limit: int | None = None, cursor: str | None = None, fields=None, **filters):
+    return await run(session, crud.get_audit_log, limit, cursor, fields, **filters)
+
+
+async def update_expense_status(session, expense_id: str, status: str, admin_comment: str | None = None):
+    return await run(session, crud.update_expense_status, expense_id, status, admin_comment)
+
+
+async def bulk_update_expense_status(session, status: str, **filters):
+    return await run(session, crud.bulk_update_expense_status, status, **filters)
+
+
+async def get_summary(session, month: str | None = None):
+    return await run(session, aggregates.get_summary, month)
+
+
+async def get_list_version(session, scope: str):
+    return await run(session, conditional.current, scope)
@@ -1,16 +1,173 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from app import metrics
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./payroll.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
 
-def init_db():
+# Engine profiles: "sqlite" turns on WAL so readers are not blocked while a
+# payroll run writes, "server" sizes and health-checks the connection pool for
+# PostgreSQL/MySQL, and "default" keeps SQLAlchemy's stock settings. Keep the
+# pool larger than the number of requests in flight: sync routes close their
+# session on the same threadpool that waits for connections.
+DB_PROFILE = os.getenv("DB_PROFILE", "sqlite" if DATABASE_URL.startswith("sqlite") else "server")
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", 256))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", 64))
+
+# I/O-bound routes run on an AsyncSession when ASYNC_DB=1. The async URL is
+# derived from DATABASE_URL unless ASYNC_DATABASE_URL is set.
+ASYNC_DB = os.getenv("ASYNC_DB", "1") == "1"
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+
+def _set_connection_pragmas(cursor):
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    # a negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL is stored in the database file; the rest is per connection
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # with WAL, NORMAL only syncs at checkpoints and cannot corrupt the database
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    _set_connection_pragmas(cursor)
+    cursor.close()
+
+
+def _set_sqlite_read_only_pragmas(dbapi_connection, connection_record):
+    # replicas are opened as they are: switching to WAL would be a write
+    cursor = dbapi_connection.cursor()
+    _set_connection_pragmas(cursor)
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def _engine_options(url, profile):
+    """create_engine keyword arguments for a profile, and whether to apply the SQLite pragmas."""
+    is_sqlite = url.startswith("sqlite")
+    connect_args = {"check_same_thread": False} if is_sqlite else {}
+
+    if profile == "default":
+        return dict(connect_args=connect_args), False
+
+    if profile == "sqlite":
+        if not is_sqlite:
+            raise ValueError(f"DB_PROFILE=sqlite needs a sqlite:// DATABASE_URL, got {url}")
+        connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+        options = dict(connect_args=connect_args)
+        if make_url(url).database not in (None, "", ":memory:"):
+            # file databases get a QueuePool; in-memory ones keep their special pool
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        return options, True
+
+    if profile == "server":
+        return dict(
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        ), False
+
+    raise ValueError(f"Unknown DB_PROFILE {profile!r} (expected default, sqlite or server)")
+
+
+def make_engine(url=DATABASE_URL, profile=None, read_only=False):
+    """Build an engine for `url` using one of the named profiles."""
+    options, pragmas = _engine_options(url, profile or DB_PROFILE)
+    engine = create_engine(url, **options)
+    if pragmas:
+        event.listen(engine, "connect", _set_sqlite_read_only_pragmas if read_only else _set_sqlite_pragmas)
+    metrics.instrument_engine(engine)
+    return engine
+
+
+engine = make_engine()
+
+def init_db(bind=None):
     import app.models  # ensure models are imported
-    SQLModel.metadata.create_all(engine)
+    bind = bind or engine
+    SQLModel.metadata.create_all(bind)
+    # create_all skips tables that already exist, so add indexes introduced
+    # after a database was first created
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+    # the employee search index and its triggers are not in the metadata
+    from app import search
+    search.install(bind)
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def async_url(url=DATABASE_URL):
+    """Swap the driver of a sync database URL for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.drivername == ASYNC_DRIVERS.get(backend) or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def make_async_engine(url=None, profile=None, read_only=False):
+    """The asyncio version of make_engine, with the same profiles."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = url or ASYNC_DATABASE_URL or async_url(DATABASE_URL)
+    options, pragmas = _engine_options(url, profile or DB_PROFILE)
+    engine = create_async_engine(url, **options)
+    if pragmas:
+        event.listen(engine.sync_engine, "connect", _set_sqlite_read_only_pragmas if read_only else _set_sqlite_pragmas)
+    metrics.instrument_engine(engine.sync_engine)
+    return engine
+
+
+# created on first use so the async driver is only needed when ASYNC_DB is on
+async_engine = None
+
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        async_engine = make_async_engine()
+    return async_engine
+
+
+async def dispose_async_engine():
+    global async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+
+
+async def get_async_session():
+    # objects stay loaded after commit; an expired attribute cannot lazy-load
+    # outside the session's greenlet
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+# the session of the database-bound async routes: an AsyncSession with
+# ASYNC_DB, else a Session; app.crud_async runs crud on either
+get_db = get_async_session if ASYNC_DB else get_session
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import threading
+import uuid
+from collections import deque
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from app import fastjson
+
+# Change events pushed to dashboards over server-sent events instead of
+# having them poll the list endpoints. crud publishes after each commit to
+# the employee's channel ("user:<id>") and to "admin". Every subscriber is a
+# bounded asyncio queue fed from whichever thread published; recent events
+# stay in a replay buffer so a client reconnecting with Last-Event-ID gets
+# what it missed. A subscriber that falls EVENTS_QUEUE_SIZE events behind is
+# disconnected and catches up from the buffer when it reconnects.
+#
+# The broker is per process. A multi-process backend (Redis pub/sub,
+# PostgreSQL LISTEN/NOTIFY) would implement the same publish/subscribe
+# methods and assign the event ids centrally.
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", 10000))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 256))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+# streams end after this long and the client reconnects with Last-Event-ID;
+# this also bounds how long an open stream can hold up a graceful shutdown
+EVENTS_STREAM_SECONDS = float(os.getenv("EVENTS_STREAM_SECONDS", 300))
+
+ADMIN_CHANNEL = "admin"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+class Event:
+    __slots__ = ("id", "type", "channels", "data", "_encoded")
+
+    def __init__(self, id, type, channels, data):
+        self.id, self.type, self.channels, self.data = id, type, channels, data
+        self._encoded = None
+
+    def encode(self, epoch):
+        # encoded once however many subscribers receive it
+        if self._encoded is None:
+            head = f"id: {epoch}-{self.id}\nevent: {self.type}\ndata: ".encode()
+            self._encoded = head + fastjson.dumps(self.data) + b"\n\n"
+        return self._encoded
+
+
+class Subscription:
+    def __init__(self, channels, loop):
+        self.channels = channels
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broker:
+    """In-process publish/subscribe with a bounded replay buffer."""
+
+    def __init__(self, replay_size=None):
+        # event ids are "<epoch>-<sequence>"; a new epoch per broker means an
+        # id from before a restart is recognised instead of misread
+        self.epoch = uuid.uuid4().hex[:8]
+        self._last_id = 0
+        self._buffer = deque(maxlen=replay_size or EVENTS_REPLAY_SIZE)
+        self._subscribers = {}  # channel -> set of Subscription
+        self._lock = threading.Lock()
+
+    def publish(self, type, channels, data):
+        """Record an event and hand it to the subscribers of any of `channels`. Thread-safe."""
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, type, tuple(channels), data)
+            self._buffer.append(event)
+            targets = set()
+            for channel in event.channels:
+                targets.update(self._subscribers.get(channel, ()))
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:  # the subscriber's loop has closed
+                pass
+        return event
+
+    def subscribe(self, channels, last_event_id=None):
+        """
+        Register a subscriber on the running loop. Returns the subscription
+        and the buffered events after `last_event_id` on its channels, or
+        None instead of that list when those events can no longer be
+        replayed and the client has to refetch.
+        """
+        sub = Subscription(frozenset(channels), asyncio.get_running_loop())
+        with self._lock:
+            for channel in sub.channels:
+                self._subscribers.setdefault(channel, set()).add(sub)
+            if not last_event_id:
+                return sub, []
+            epoch, _, seq = last_event_id.partition("-")
+            oldest = self._buffer[0].id if self._buffer else self._last_id + 1
+            if epoch != self.epoch or not seq.isdigit() or not oldest - 1 <= int(seq) <= self._last_id:
+                return sub, None
+            seq = int(seq)
+            missed = [e for e in self._buffer if e.id > seq and sub.channels.intersection(e.channels)]
+        return sub, missed
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for channel in sub.channels:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({sub for subs in self._subscribers.values() for sub in subs})
+
+
+broker = Broker()
+
+# events carry just enough to update a row in place or decide to refetch
+EXPENSE_EVENT_FIELDS = ("id", "employee_id", "category", "amount", "status")
+SLIP_EVENT_FIELDS = ("id", "employee_id", "month", "net_pay")
+
+
+def publish(type, channels, data):
+    return broker.publish(type, channels, data)
+
+
+def _pick(row, fields):
+    if isinstance(row, dict):
+        return {name: row[name] for name in fields}
+    return {name: getattr(row, name) for name in fields}
+
+
+def publish_expense(type, expense):
+    """Publish an expense (model or row dict) to its employee and the admins."""
+    data = _pick(expense, EXPENSE_EVENT_FIELDS)
+    publish(type, (user_channel(data["employee_id"]), ADMIN_CHANNEL), data)
+
+
+def publish_slip(type, slip, admin=True):
+    data = _pick(slip, SLIP_EVENT_FIELDS)
+    channels = (user_channel(data["employee_id"]), ADMIN_CHANNEL) if admin else (user_channel(data["employee_id"]),)
+    publish(type, channels, data)
+
+
+async def stream(channels, last_event_id=None, heartbeat=None):
+    """SSE body for a subscriber: missed events, then live ones, with comment heartbeats."""
+    heartbeat = heartbeat or EVENTS_HEARTBEAT_SECONDS
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + EVENTS_STREAM_SECONDS
+    sub, missed = broker.subscribe(channels, last_event_id)
+    try:
+        # tell the browser how long to wait before reconnecting
+        yield b"retry: 3000\n\n"
+        if missed is None:
+            # too far behind for the buffer: the client refetches its lists
+            yield b"event: reset\ndata: {}\n\n"
+        else:
+            for event in missed:
+                yield event.encode(broker.epoch)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield event.encode(broker.epoch)
+            if sub.overflowed and sub.queue.empty():
+                # events were dropped; end the stream so the client resumes
+                # from its Last-Event-ID through the replay buffer
+                return
+    finally:
+        broker.unsubscribe(sub)
+
+
+def response(request: Request, channels):
+    """StreamingResponse for `channels`, resuming after the Last-Event-ID header (or ?last_event_id=)."""
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    return StreamingResponse(
+        stream(channels, last_event_id),
+        media_type="text/event-stream",
+        # no caching, and no buffering by a reverse proxy
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,220 @@
+import csv
+import heapq
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from sqlmodel import Session, select
+from app import archive, database, models
+
+# Exports stream straight from a server-side cursor: rows are fetched
+# EXPORT_CHUNK_ROWS at a time as plain column tuples (no ORM objects, no
+# pydantic), encoded and handed to the response before the next chunk is read,
+# so memory stays flat however many rows match.
+#
+# Rows of archived fiscal years (app.archive) are merged in, in the same
+# order; those are read and sorted one fiscal year at a time.
+EXPORT_CHUNK_ROWS = 5000
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+SLIP_COLUMNS = (
+    ("id", models.SalarySlip.id),
+    ("employee_id", models.SalarySlip.employee_id),
+    ("employee_email", models.User.email),
+    ("month", models.SalarySlip.month),
+    ("basic", models.SalarySlip.basic),
+    ("allowances", models.SalarySlip.allowances),
+    ("deductions", models.SalarySlip.deductions),
+    ("net_pay", models.SalarySlip.net_pay),
+    ("notes", models.SalarySlip.notes),
+    ("created_at", models.SalarySlip.created_at),
+)
+
+EXPENSE_COLUMNS = (
+    ("id", models.Expense.id),
+    ("employee_id", models.Expense.employee_id),
+    ("employee_email", models.User.email),
+    ("date", models.Expense.date),
+    ("category", models.Expense.category),
+    ("amount", models.Expense.amount),
+    ("description", models.Expense.description),
+    ("status", models.Expense.status),
+    ("admin_comment", models.Expense.admin_comment),
+)
+
+
+def month_bounds(month: str):
+    """First instant of `month` (YYYY-MM) and of the month after it."""
+    try:
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise ValueError("month must be YYYY-MM")
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+def salary_slips_query(month=None, from_month=None, to_month=None):
+    stmt = select(*(col for _, col in SLIP_COLUMNS)).join(
+        models.User, models.User.id == models.SalarySlip.employee_id
+    )
+    if month:
+        stmt = stmt.where(models.SalarySlip.month == month)
+    if from_month:
+        stmt = stmt.where(models.SalarySlip.month >= from_month)
+    if to_month:
+        stmt = stmt.where(models.SalarySlip.month <= to_month)
+    return stmt.order_by(models.SalarySlip.month, models.SalarySlip.id)
+
+
+def expenses_query(month=None, start_date: date | None = None, end_date: date | None = None, status=None):
+    stmt = select(*(col for _, col in EXPENSE_COLUMNS)).join(
+        models.User, models.User.id == models.Expense.employee_id
+    )
+    if month:
+        start, end = month_bounds(month)
+        stmt = stmt.where(models.Expense.date >= start, models.Expense.date < end)
+    if start_date:
+        stmt = stmt.where(models.Expense.date >= datetime.combine(start_date, time.min))
+    if end_date:
+        # the end date is inclusive
+        stmt = stmt.where(models.Expense.date < datetime.combine(end_date + timedelta(days=1), time.min))
+    if status:
+        stmt = stmt.where(models.Expense.status == status)
+    return stmt.order_by(models.Expense.date, models.Expense.id)
+
+
+class ArchivedRows:
+    """
+    The archived rows of an export, as column tuples ordered by (`key`, id).
+
+    `low` and `high` bound the key (high exclusive) so that only the fiscal
+    years and column blocks holding candidates are decoded; `keep` is any
+    further filter on the row dict.
+    """
+
+    def __init__(self, table, columns, key, low=None, high=None, keep=None):
+        self.table = table
+        self.columns = columns
+        self.key = key
+        self.position = [name for name, _ in columns].index(key)
+        self.low, self.high = low, high
+        self.keep = keep
+
+    def _in_range(self, value):
+        return (self.low is None or value >= self.low) and (self.high is None or value < self.high)
+
+    def _overlaps(self, year):
+        start, end = archive.fiscal_year_bounds(year)
+        if isinstance(self.low or self.high, str):
+            start, end = f"{start:%Y-%m}", f"{end:%Y-%m}"
+        return (self.low is None or self.low < end) and (self.high is None or self.high > start)
+
+    def _matching(self, part):
+        fields = [name for name, _ in self.columns if name != "employee_email"]
+        for start in range(0, part.rows, part.block_rows):
+            stop = min(start + part.block_rows, part.rows)
+            if not any(map(self._in_range, part.values(self.key, start, stop, cache=False))):
+                continue
+            for row in part.records(start, stop, fields, cache=False):
+                if self._in_range(row[self.key]) and (self.keep is None or self.keep(row)):
+                    yield row
+
+    def rows(self, session):
+        emails = {}
+        for arc in sorted(archive.archives(), key=lambda arc: arc.fiscal_year):
+            part = arc.tables.get(self.table)
+            if part is None or not self._overlaps(arc.fiscal_year):
+                continue
+            found = sorted(self._matching(part), key=lambda row: (row[self.key], row["id"]))
+            _add_emails(session, emails, {row["employee_id"] for row in found})
+            for row in found:
+                # as the join with the user table drops the rows of deleted users
+                if emails[row["employee_id"]] is not None:
+                    row["employee_email"] = emails[row["employee_id"]]
+                    yield tuple(row[name] for name, _ in self.columns)
+
+
+def _add_emails(session, emails, employee_ids):
+    """Look up the emails of the employees not already in `emails`; ids of deleted users stay absent."""
+    employee_ids = [e for e in employee_ids if e not in emails]
+    for e in employee_ids:
+        emails[e] = None
+    for i in range(0, len(employee_ids), archive.DELETE_CHUNK):
+        chunk = employee_ids[i:i + archive.DELETE_CHUNK]
+        emails.update(session.execute(select(models.User.id, models.User.email).where(models.User.id.in_(chunk))).all())
+
+
+def archived_salary_slips(month=None, from_month=None, to_month=None):
+    low, high = month or from_month, month or to_month
+    if high:
+        high = f"{month_bounds(high)[1]:%Y-%m}"
+    return ArchivedRows(archive.SLIPS, SLIP_COLUMNS, "month", low, high)
+
+
+def archived_expenses(month=None, start_date: date | None = None, end_date: date | None = None, status=None):
+    low = high = None
+    if month:
+        low, high = month_bounds(month)
+    if start_date:
+        low = max(low or datetime.min, datetime.combine(start_date, time.min))
+    if end_date:
+        end = datetime.combine(end_date + timedelta(days=1), time.min)
+        high = min(high or datetime.max, end)
+    keep = (lambda row: row["status"] == status) if status else None
+    return ArchivedRows(archive.EXPENSES, EXPENSE_COLUMNS, "date", low, high, keep)
+
+
+def _merged(archived, live, position):
+    """Merge archived and live rows in (key, id) order; a live row replaces an archived one with the same id."""
+    last = None
+    for row, _ in heapq.merge(((r, 1) for r in archived), ((r, 0) for r in live), key=lambda item: (item[0][position], item[0][0], item[1])):
+        if last is None or last[0] != row[0]:
+            yield row
+        last = row
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(header, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(header)
+    writer.writerows([[_plain(v) for v in row] for row in rows])
+    return buf.getvalue().encode()
+
+
+def encode_ndjson(header, rows):
+    lines = [json.dumps(dict(zip(header, map(_plain, row))), ensure_ascii=False) for row in rows]
+    return ("\n".join(lines) + "\n").encode() if lines else b""
+
+
+def stream_rows(stmt, columns, fmt, engine=None, chunk_rows=None, archived=None):
+    """
+    Yield the encoded export chunk by chunk, merging in the `archived` rows
+    (an ArchivedRows) when there are archives.
+
+    The generator opens its own session: a streaming response is sent after
+    the request's session dependency has been closed.
+    """
+    names = [name for name, _ in columns]
+    chunk_rows = chunk_rows or EXPORT_CHUNK_ROWS
+    if fmt == "csv":
+        yield encode_csv(names, [])
+    with Session(engine or database.engine) as session:
+        result = session.execute(stmt.execution_options(stream_results=True, yield_per=chunk_rows))
+        if archived is not None and archive.archives():
+            merged = _merged(archived.rows(session), result, archived.position)
+            partitions = iter(lambda: list(islice(merged, chunk_rows)), [])
+        else:
+            partitions = result.partitions()
+        for rows in partitions:
+            if fmt == "csv":
+                yield encode_csv(None, rows)
+            else:
+                yield encode_ndjson(names, rows)
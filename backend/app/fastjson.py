@@ -0,0 +1,91 @@
+import json
+import os
+from datetime import date
+from fastapi import Response
+from starlette.middleware.gzip import GZipMiddleware as _GZipMiddleware
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder produces the same bytes, only slower
+    orjson = None
+
+# Large list endpoints skip response_model validation: they select only the
+# response fields as row tuples, turn them into dicts and encode those
+# directly. Field names come from the response schema, so keys, order and
+# values match what FastAPI would have produced. JSON bodies of at least
+# GZIP_MIN_BYTES are gzip-compressed by the middleware set up in main. PDFs
+# and ZIP archives are already compressed and are sent as they are, so their
+# ETags describe the bytes on the wire.
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+GZIP_SKIP_TYPES = ("application/pdf", "application/zip")
+
+
+def _default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    # the same settings as starlette's JSONResponse
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def fields_of(schema):
+    """Names of the fields a schema (or SQLModel table) serializes, in output order."""
+    return tuple(schema.model_fields)
+
+
+def records(result, fields):
+    """Rows of a column select as dicts keyed by `fields`."""
+    return [dict(zip(fields, row)) for row in result]
+
+
+def respond(response: Response, items):
+    """Encode `items`, keeping headers set on the route's injected response (e.g. the page cursor)."""
+    return FastJSONResponse(items, headers=dict(response.headers))
+
+
+class GZipMiddleware:
+    """starlette's GZipMiddleware, passing GZIP_SKIP_TYPES responses through untouched."""
+
+    _MARK = (b"content-encoding", b"identity")
+
+    def __init__(self, app, **options):
+        self.app = app
+        self.gzip = _GZipMiddleware(self._marked, **options)
+
+    async def _marked(self, scope, receive, send):
+        # starlette leaves responses that already have a Content-Encoding alone
+        async def mark(message):
+            if message["type"] == "http.response.start":
+                content_type = dict(message["headers"]).get(b"content-type", b"").decode("latin-1")
+                if content_type.startswith(GZIP_SKIP_TYPES):
+                    message["headers"] = [*message["headers"], self._MARK]
+            await send(message)
+
+        await self.app(scope, receive, mark)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def unmark(message):
+            if message["type"] == "http.response.start" and self._MARK in message["headers"]:
+                message["headers"] = [h for h in message["headers"] if h != self._MARK]
+            await send(message)
+
+        await self.gzip(scope, receive, unmark)
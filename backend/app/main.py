@@ -1,14 +1,7 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-
-load_dotenv()
-
-from sqlmodel import Session, select
-from app.models import User
-from app.auth import get_password_hash
-
-from app import database
+from app import admission, audit, bootstrap, database, fastjson, pdf_batch, pdf_cache, notifications, pagination, metrics, replicas
 from app.routes_auth import router as auth_router
 from app.routes_admin import router as admin_router
 from app.routes_employee import router as employee_router
@@ -20,37 +13,55 @@ app = FastAPI(title="Payroll Management API")
 def home():
     return {"message": "Backend is connected"}
 
-def seed_demo_user():
-    with Session(database.engine) as session:
-        existing = session.exec(select(User).where(User.email == "hire-me@anshumat.org")).first()
-        if existing:
-            print("✔ Demo user already exists")
-            return
-        
-        demo = User(
-            full_name="Hiring Manager",
-            email="hire-me@anshumat.org",
-            hashed_password=get_password_hash("HireMe@2025!"),
-            role="admin"
-        )
-        session.add(demo)
-        session.commit()
-        print("🎉 Demo admin user created successfully!")
-
 
+# innermost, so 503s from a full queue still get the CORS headers
+if admission.ADMISSION_CONTROL:
+    app.add_middleware(admission.AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER, "Retry-After"],
 )
+app.add_middleware(fastjson.GZipMiddleware, minimum_size=fastjson.GZIP_MIN_BYTES, compresslevel=fastjson.GZIP_LEVEL)
+if replicas.replicas:
+    app.add_middleware(replicas.StickyReadsMiddleware)
+if audit.AUDIT_LOG:
+    app.add_middleware(audit.AuditContextMiddleware)
+# outermost, so the latency includes CORS handling and compression
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.on_event("startup")
 def on_startup():
-    database.init_db()
-    seed_demo_user()  # <-- REQUIRED
+    if bootstrap.INIT_DB_ON_STARTUP:
+        bootstrap.run()
+    else:
+        bootstrap.check_schema()
+    pdf_cache.open_cache()
+    notifications.start_worker(database.engine)
+    audit.start_writer(database.engine)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    audit.stop_writer()
+    notifications.stop_worker()
+    pdf_batch.shutdown()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await database.dispose_async_engine()
+    for replica in replicas.replicas:
+        await replica.dispose_async_engine()
 
 
 app.include_router(auth_router)
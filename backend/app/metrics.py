@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# In-process metrics rendered in the Prometheus text format on /metrics:
+# per-route latency and status counts from an ASGI middleware, queries and SQL
+# time per request from engine events, and timings of the CPU-heavy
+# operations (PDF rendering, password hashing). Everything is a few dict
+# updates under a lock, cheap enough to leave on. Each worker process keeps
+# its own numbers, as with any multiprocess Prometheus client.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# the same SQL statement run this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+logger = logging.getLogger(__name__)
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[n] for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels[n] for n in self.labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.buckets = tuple(buckets)
+        # per label set: [bucket counts..., +Inf count], sum
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[n] for n in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_label_str(self.labels + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {cumulative}")
+        return lines
+
+
+http_requests = Counter(
+    "payroll_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram(
+    "payroll_http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+request_queries = Histogram(
+    "payroll_request_db_queries", "SQL statements executed per request.", ("route",), QUERY_COUNT_BUCKETS)
+request_sql_time = Histogram(
+    "payroll_request_db_seconds", "Time spent in SQL per request.", ("route",))
+db_queries = Counter(
+    "payroll_db_queries_total", "SQL statements executed, including background work.")
+db_time = Counter(
+    "payroll_db_seconds_total", "Time spent executing SQL, including background work.")
+n_plus_one = Counter(
+    "payroll_n_plus_one_total", "Requests that ran one SQL statement N_PLUS_ONE_THRESHOLD or more times.", ("route",))
+operation_latency = Histogram(
+    "payroll_operation_duration_seconds", "Duration of CPU-heavy operations.", ("operation",))
+audit_entries = Counter(
+    "payroll_audit_entries_total", "Audit entries written, or dropped on a full queue or failed write.", ("result",))
+admission_wait = Histogram(
+    "payroll_admission_wait_seconds", "Time admitted requests waited for a slot, by admission class.", ("route_class",))
+admission_rejected = Counter(
+    "payroll_admission_rejected_total", "Requests turned away with 503 by admission control.", ("route_class", "reason"))
+
+REGISTRY = [
+    http_requests, http_latency, request_queries, request_sql_time,
+    db_queries, db_time, n_plus_one, operation_latency, audit_entries,
+    admission_wait, admission_rejected,
+]
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def timed(operation):
+    """Record how long the block takes under payroll_operation_duration_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        operation_latency.observe(time.perf_counter() - start, operation=operation)
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements = {}
+
+
+# set by the middleware; the threadpool and AsyncSession.run_sync copy the
+# context, so queries made anywhere in the request land on the same object
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+_reported = set()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_queries.inc()
+    db_time.inc(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+def instrument_engine(engine):
+    """Count and time every statement run through `engine` (a sync Engine)."""
+    if METRICS_ENABLED and not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_name(scope):
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _record_request(scope, status, elapsed, stats):
+    route = _route_name(scope)
+    method = scope["method"]
+    http_requests.inc(method=method, route=route, status=status)
+    http_latency.observe(elapsed, method=method, route=route)
+    request_queries.observe(stats.queries, route=route)
+    request_sql_time.observe(stats.sql_seconds, route=route)
+    repeated = [s for s, n in stats.statements.items() if n >= N_PLUS_ONE_THRESHOLD]
+    if repeated:
+        n_plus_one.inc(route=route)
+        for statement in repeated:
+            key = (route, statement)
+            if key not in _reported:
+                _reported.add(key)
+                logger.warning("possible N+1 on %s %s: %dx %s", method, route, stats.statements[statement], statement[:200])
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are not buffered."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            _record_request(scope, status, time.perf_counter() - start, stats)
@@ -1,12 +1,17 @@
 from datetime import datetime
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from uuid import uuid4
 
 def gen_id():
     return str(uuid4())
 
 class User(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_user_created", "created_at", "id"),
+    )
+
     id: str = Field(default_factory=gen_id, primary_key=True)
     email: str = Field(index=True, nullable=False)
     full_name: Optional[str] = None
@@ -18,6 +23,11 @@ class User(SQLModel, table=True):
     expenses: List["Expense"] = Relationship(back_populates="employee")
 
 class SalarySlip(SQLModel, table=True):
+    # (employee_id, created_at, id) serves the keyset-paginated slip history
+    __table_args__ = (
+        Index("ix_salaryslip_employee_created", "employee_id", "created_at", "id"),
+    )
+
     id: str = Field(default_factory=gen_id, primary_key=True)
     employee_id: str = Field(foreign_key="user.id")
     month: str
@@ -30,7 +40,20 @@ class SalarySlip(SQLModel, table=True):
 
     employee: Optional[User] = Relationship(back_populates="salary_slips")
 
+class SalarySlipComponent(SQLModel, table=True):
+    # breakdown of slips computed by app.payroll; slips entered by hand have none
+    slip_id: str = Field(foreign_key="salaryslip.id", primary_key=True)
+    name: str = Field(primary_key=True)
+    kind: str
+    amount: float
+    rules_version: str
+
 class Expense(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_expense_employee_date", "employee_id", "date", "id"),
+        Index("ix_expense_status_date", "status", "date", "id"),
+    )
+
     id: str = Field(default_factory=gen_id, primary_key=True)
     employee_id: str = Field(foreign_key="user.id")
     date: datetime = Field(default_factory=datetime.utcnow)
@@ -40,4 +63,57 @@ class Expense(SQLModel, table=True):
     status: str = Field(default="pending")
     admin_comment: Optional[str] = None
 
-    employee: Optional[User] = Relationship(back_populates="expenses")
\ No newline at end of file
+    employee: Optional[User] = Relationship(back_populates="expenses")
+
+class NotificationOutbox(SQLModel, table=True):
+    id: str = Field(default_factory=gen_id, primary_key=True)
+    to_email: str
+    subject: str
+    body: str
+    status: str = Field(default="pending", index=True)
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: Optional[datetime] = None
+
+class PayrollMonthTotal(SQLModel, table=True):
+    # running totals kept by crud in the same transaction as the slips
+    month: str = Field(primary_key=True)
+    slip_count: int = 0
+    basic: float = 0.0
+    allowances: float = 0.0
+    deductions: float = 0.0
+    net_pay: float = 0.0
+
+class ExpenseTotal(SQLModel, table=True):
+    # month is the expense date as YYYY-MM
+    month: str = Field(primary_key=True)
+    category: str = Field(primary_key=True)
+    status: str = Field(primary_key=True)
+    expense_count: int = 0
+    amount: float = 0.0
+
+class ListVersion(SQLModel, table=True):
+    # scope is a polled list, e.g. "expenses:<employee id>"; bumped by crud
+    # with every change to it (app.conditional)
+    scope: str = Field(primary_key=True)
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class AuditLog(SQLModel, table=True):
+    # append-only, written in batches by app.audit; before/after hold JSON
+    __table_args__ = (
+        Index("ix_auditlog_at", "at", "id"),
+        Index("ix_auditlog_entity", "entity", "entity_id", "at", "id"),
+    )
+
+    id: str = Field(default_factory=gen_id, primary_key=True)
+    at: datetime = Field(default_factory=datetime.utcnow)
+    actor_id: Optional[str] = None
+    ip: Optional[str] = None
+    action: str
+    entity: str
+    entity_id: Optional[str] = None
+    before: Optional[str] = None
+    after: Optional[str] = None
@@ -0,0 +1,254 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+from app import models, utils
+
+# Notifications are written to the outbox table in the same transaction as the
+# change that caused them and delivered later by a background worker, so API
+# responses never wait on SMTP.
+NOTIFY_BACKEND = os.getenv("NOTIFY_BACKEND", "console")  # console | smtp
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+OUTBOX_WORKER = os.getenv("OUTBOX_WORKER", "1") == "1"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 200))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 2))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", 30))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", 3600))
+# A worker claims a batch (status "sending") before delivering it; a claim
+# left by a worker that died is taken over after OUTBOX_CLAIM_SECONDS, and
+# the messages it sent since its last commit (at most OUTBOX_COMMIT_EVERY)
+# go out again.
+OUTBOX_CLAIM_SECONDS = float(os.getenv("OUTBOX_CLAIM_SECONDS", 300))
+OUTBOX_COMMIT_EVERY = int(os.getenv("OUTBOX_COMMIT_EVERY", 25))
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(session: Session, to_email: str, subject: str, body: str):
+    """Add a notification to the current transaction; the caller commits."""
+    session.add(models.NotificationOutbox(to_email=to_email, subject=subject, body=body))
+
+
+def enqueue_many(session: Session, messages):
+    """Bulk-insert (to_email, subject, body) tuples into the current transaction."""
+    now = datetime.utcnow()
+    rows = [
+        dict(
+            id=models.gen_id(),
+            to_email=to_email,
+            subject=subject,
+            body=body,
+            status="pending",
+            attempts=0,
+            next_attempt_at=now,
+            created_at=now,
+        )
+        for to_email, subject, body in messages
+    ]
+    if rows:
+        session.execute(insert(models.NotificationOutbox), rows)
+
+
+class ConsoleTransport:
+    """Prints notifications, as the app did before SMTP was configured."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send(self, to_email, subject, body):
+        utils.send_notification_email(to_email, subject, body)
+
+
+class SmtpTransport:
+    """One authenticated SMTP connection reused for a whole batch."""
+
+    def __init__(self, host=None, port=None, user=None, password=None, from_email=None, starttls=None):
+        self.host = host or utils.SMTP_HOST
+        self.port = port or utils.SMTP_PORT
+        self.user = user if user is not None else utils.SMTP_USER
+        self.password = password if password is not None else utils.SMTP_PASS
+        self.from_email = from_email or utils.FROM_EMAIL or "noreply@localhost"
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self._smtp = None
+
+    def _connect(self):
+        import smtplib  # only the smtp backend needs it; keeps it off the startup path
+
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            smtp.starttls()
+        if self.user:
+            smtp.login(self.user, self.password)
+        self._smtp = smtp
+
+    def __enter__(self):
+        self._connect()
+        return self
+
+    def __exit__(self, *exc):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except OSError:  # smtplib.SMTPException is an OSError
+                pass
+            self._smtp = None
+        return False
+
+    def send(self, to_email, subject, body):
+        import smtplib
+        from email.mime.text import MIMEText
+
+        msg = MIMEText(body)
+        msg["Subject"] = subject
+        msg["From"] = self.from_email
+        msg["To"] = to_email
+        try:
+            self._smtp.sendmail(self.from_email, [to_email], msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            self._connect()
+            self._smtp.sendmail(self.from_email, [to_email], msg.as_string())
+
+
+def make_transport():
+    if NOTIFY_BACKEND == "smtp":
+        return SmtpTransport()
+    return ConsoleTransport()
+
+
+def backoff(attempts):
+    return min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+def claim(session: Session, now, limit):
+    """
+    Mark up to `limit` due notifications as being sent by this worker and
+    commit; returns the ids it won. A row another worker claimed first is
+    skipped, and one whose claim has expired (its worker died) is due again.
+    """
+    outbox = models.NotificationOutbox
+    due = (outbox.status.in_(("pending", "sending")), outbox.next_attempt_at <= now)
+    candidates = session.exec(select(outbox.id).where(*due).order_by(outbox.next_attempt_at).limit(limit)).all()
+    if not candidates:
+        return []
+    # while sending, next_attempt_at is when the claim expires
+    values = dict(status="sending", next_attempt_at=now + timedelta(seconds=OUTBOX_CLAIM_SECONDS))
+    if session.get_bind().dialect.update_returning:
+        stmt = update(outbox).where(outbox.id.in_(candidates), *due).values(values).returning(outbox.id)
+        won = list(session.execute(stmt).scalars())
+    else:
+        won = [
+            msg_id for msg_id in candidates
+            if session.execute(update(outbox).where(outbox.id == msg_id, *due).values(values)).rowcount == 1
+        ]
+    session.commit()
+    return won
+
+
+def deliver_pending(engine, transport=None, limit=None):
+    """
+    Send one batch of due notifications over a single connection. The batch
+    is claimed first, so concurrent workers never send the same message, and
+    outcomes are committed every OUTBOX_COMMIT_EVERY messages and at the end,
+    whatever went wrong. Returns the number of rows processed.
+    """
+    now = datetime.utcnow()
+    with Session(engine, expire_on_commit=False) as session:
+        ids = claim(session, now, limit or OUTBOX_BATCH_SIZE)
+        if not ids:
+            return 0
+        batch = session.exec(
+            select(models.NotificationOutbox)
+            .where(models.NotificationOutbox.id.in_(ids))
+            .order_by(models.NotificationOutbox.created_at)
+        ).all()
+
+        try:
+            with (transport or make_transport()) as conn:
+                for done, msg in enumerate(batch, 1):
+                    try:
+                        conn.send(msg.to_email, msg.subject, msg.body)
+                    except Exception as e:  # includes smtplib.SMTPException; one bad message must not stop the batch
+                        _mark_failed(msg, e, now)
+                    else:
+                        msg.status = "sent"
+                        msg.sent_at = datetime.utcnow()
+                    if done % OUTBOX_COMMIT_EVERY == 0:
+                        session.commit()
+        except Exception as e:
+            # could not connect or authenticate: retry the rest of the batch later
+            logger.warning("outbox delivery interrupted: %s", e)
+            for msg in batch:
+                if msg.status == "sending":
+                    _mark_failed(msg, e, now)
+        finally:
+            session.commit()
+        return len(batch)
+
+
+def _mark_failed(msg, error, now):
+    msg.attempts += 1
+    msg.last_error = str(error)[:500]
+    if msg.attempts >= OUTBOX_MAX_ATTEMPTS:
+        msg.status = "failed"
+    else:
+        msg.status = "pending"
+        msg.next_attempt_at = now + timedelta(seconds=backoff(msg.attempts))
+
+
+class OutboxWorker(threading.Thread):
+    """Background thread that drains the outbox until stopped."""
+
+    def __init__(self, engine, transport_factory=make_transport, poll_seconds=OUTBOX_POLL_SECONDS):
+        super().__init__(name="outbox-worker", daemon=True)
+        self.engine = engine
+        self.transport_factory = transport_factory
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        self._wake.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                while not self._stopping.is_set() and deliver_pending(self.engine, self.transport_factory()) == OUTBOX_BATCH_SIZE:
+                    pass
+            except Exception:
+                logger.exception("outbox worker error")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+
+_worker = None
+
+
+def start_worker(engine):
+    global _worker
+    if OUTBOX_WORKER and _worker is None:
+        _worker = OutboxWorker(engine)
+        _worker.start()
+
+
+def stop_worker():
+    global _worker
+    if _worker is not None:
+        _worker.stop()
+        _worker = None
+
+
+def wake():
+    """Hint the worker that new messages were committed."""
+    if _worker is not None:
+        _worker.wake()
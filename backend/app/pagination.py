@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_
+
+# Keyset pagination: pages are ordered by (sort column, id) and the cursor
+# holds the last row's values, so fetching page N costs the same as page 1.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+        return sort_value, row_id
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset(stmt, sort_col, id_col, cursor=None, limit=None, descending=True):
+    """Order `stmt` by (sort_col, id_col) and start after `cursor`."""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        # a row-value comparison lets the (..., sort_col, id) index seek straight
+        # to the cursor; the equivalent OR expression scans from the top
+        key, start = tuple_(sort_col, id_col), tuple_(sort_value, row_id)
+        stmt = stmt.where(key < start if descending else key > start)
+    if descending:
+        stmt = stmt.order_by(sort_col.desc(), id_col.desc())
+    else:
+        stmt = stmt.order_by(sort_col, id_col)
+    if limit:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+class PageParams:
+    """Query parameters shared by paginated list endpoints."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = Query(None),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def set_next_cursor(response: Response, items, page: PageParams, sort_attr):
+    """Send the cursor for the next page in a response header when the page is full.
+
+    `items` are ORM objects or the dicts returned for app.fastjson responses.
+    """
+    if len(items) == page.limit:
+        last = items[-1]
+        if isinstance(last, dict):
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last[sort_attr], last["id"])
+        else:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_attr), last.id)
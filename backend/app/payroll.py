@@ -0,0 +1,171 @@
+import calendar
+from bisect import bisect_right
+import numpy as np
+from app.payroll_rules import RULES
+
+# Payroll engine: turns contractual pay plus loss-of-pay days and arrears into
+# earned pay, provident fund, professional tax, income tax (TDS) and net pay
+# using the versioned rules in app.payroll_rules. Every component is computed
+# for a whole run at once with NumPy array operations; the only Python loops
+# are over rule slabs and over the distinct months in a run. Statutory
+# deductions are rounded to whole rupees and earned pay to paise, halves up
+# (away from zero), as PF and TDS are rounded.
+
+# component -> kind, in the order breakdowns are listed
+COMPONENTS = {
+    "earned_basic": "earning",
+    "earned_allowances": "earning",
+    "arrears": "earning",
+    "provident_fund": "deduction",
+    "professional_tax": "deduction",
+    "income_tax": "deduction",
+    "other_deductions": "deduction",
+}
+# components plus the totals derived from them
+RESULT_FIELDS = tuple(COMPONENTS) + ("gross", "total_deductions", "net_pay")
+
+_RULES = sorted(RULES, key=lambda r: r["effective_from"])
+_EFFECTIVE = [r["effective_from"] for r in _RULES]
+
+
+def rules_for(month: str):
+    """The rule version in force for a YYYY-MM month."""
+    i = bisect_right(_EFFECTIVE, month) - 1
+    if i < 0:
+        raise ValueError(f"No payroll rules in effect for {month}")
+    return _RULES[i]
+
+
+def days_in_month(month: str) -> int:
+    try:
+        year, mon = int(month[:4]), int(month[5:7])
+        return calendar.monthrange(year, mon)[1]
+    except ValueError:
+        raise ValueError("month must be YYYY-MM")
+
+
+def annual_income_tax(income, rules):
+    """Tax with cess on annual taxable income (after the standard deduction)."""
+    income = np.asarray(income, dtype=float)
+    slabs = rules["slabs"]
+    uppers = [lower for lower, _ in slabs[1:]] + [np.inf]
+    tax = np.zeros_like(income)
+    for (lower, rate), upper in zip(slabs, uppers):
+        tax += rate * np.clip(income - lower, 0.0, upper - lower)
+    limit = rules.get("rebate_limit")
+    if limit:
+        # full rebate up to the limit; just above it, the tax may not exceed
+        # the income above the limit
+        tax = np.where(income <= limit, 0.0, np.minimum(tax, income - limit))
+    return tax * (1 + rules["cess"])
+
+
+def round_half_up(amounts, decimals=0):
+    """
+    Round to `decimals` places, halves away from zero. Amounts are first
+    rounded to a millionth of a rupee, so that binary noise such as
+    1000.4999999999999 for 8337.5 * 0.12 counts as the half it stands for.
+    """
+    scale = 10.0 ** decimals
+    scaled = np.round(np.asarray(amounts, dtype=float) * scale, 6 - decimals)
+    return np.copysign(np.floor(np.abs(scaled) + 0.5), scaled) / scale
+
+
+def monthly_income_tax(monthly_pay, arrears, rules):
+    """
+    TDS for the month: a twelfth of the tax on the pay projected over the
+    year, plus all of the extra tax the arrears cause.
+    """
+    deduction = rules["standard_deduction"]
+    regular = np.maximum(monthly_pay * 12 - deduction, 0.0)
+    with_arrears = np.maximum(monthly_pay * 12 + arrears - deduction, 0.0)
+    base = annual_income_tax(regular, rules)
+    return round_half_up(base / 12 + (annual_income_tax(with_arrears, rules) - base))
+
+
+def professional_tax(gross, month, rules):
+    slabs = rules.get("month_overrides", {}).get(month[5:7], rules["slabs"])
+    thresholds = np.array([above for above, _ in slabs], dtype=float)
+    amounts = np.array([amount for _, amount in slabs], dtype=float)
+    slab = np.searchsorted(thresholds, gross, side="left") - 1
+    return amounts[np.maximum(slab, 0)]
+
+
+def compute(month, basic, allowances=0.0, deductions=0.0, lop_days=0.0, arrears=0.0, rules=None):
+    """
+    Components for any number of employees paid for the same month.
+
+    The pay arguments are arrays (or scalars, broadcast); returns a dict of
+    arrays keyed by RESULT_FIELDS plus the rule version used.
+    """
+    rules = rules or rules_for(month)
+    basic, allowances, deductions, lop_days, arrears = (
+        np.asarray(a, dtype=float) for a in np.broadcast_arrays(basic, allowances, deductions, lop_days, arrears)
+    )
+
+    proration = rules["proration"]
+    days = proration["days"] if proration["basis"] == "fixed_days" else days_in_month(month)
+    paid = np.clip(days - lop_days, 0.0, days) / days
+    earned_basic = round_half_up(basic * paid, 2)
+    earned_allowances = round_half_up(allowances * paid, 2)
+    gross = earned_basic + earned_allowances + arrears
+
+    pf = rules["provident_fund"]
+    pf_wage = earned_basic if pf.get("wage_ceiling") is None else np.minimum(earned_basic, pf["wage_ceiling"])
+    provident_fund = round_half_up(pf_wage * pf["rate"])
+    ptax = professional_tax(gross, month, rules["professional_tax"])
+    income_tax = monthly_income_tax(basic + allowances, arrears, rules["income_tax"])
+
+    total_deductions = provident_fund + ptax + income_tax + deductions
+    return {
+        "rules_version": rules["version"],
+        "earned_basic": earned_basic,
+        "earned_allowances": earned_allowances,
+        "arrears": arrears,
+        "provident_fund": provident_fund,
+        "professional_tax": ptax,
+        "income_tax": income_tax,
+        "other_deductions": deductions,
+        "gross": gross,
+        "total_deductions": total_deductions,
+        "net_pay": round_half_up(gross - total_deductions, 2),
+    }
+
+
+def compute_slips(slips, adjustments=None):
+    """
+    Compute a run of slip inputs (mappings with employee_id, month, basic,
+    allowances, deductions). `adjustments` maps employee ids to their
+    lop_days and arrears. Returns a dict of value lists keyed by
+    RESULT_FIELDS, in the order of `slips`, and the rule version of each slip.
+    """
+    adjustments = adjustments or {}
+    n = len(slips)
+    months = np.array([s["month"] for s in slips], dtype=object)
+    basic = np.fromiter((s["basic"] for s in slips), float, n)
+    allowances = np.fromiter((s["allowances"] for s in slips), float, n)
+    deductions = np.fromiter((s["deductions"] for s in slips), float, n)
+    lop_days = np.fromiter((adjustments.get(s["employee_id"], {}).get("lop_days", 0.0) for s in slips), float, n)
+    arrears = np.fromiter((adjustments.get(s["employee_id"], {}).get("arrears", 0.0) for s in slips), float, n)
+
+    columns = {name: np.empty(n) for name in RESULT_FIELDS}
+    versions = np.empty(n, dtype=object)
+    for month in sorted(set(months.tolist())):
+        idx = np.flatnonzero(months == month)
+        part = compute(month, basic[idx], allowances[idx], deductions[idx], lop_days[idx], arrears[idx])
+        for name in RESULT_FIELDS:
+            columns[name][idx] = part[name]
+        versions[idx] = part["rules_version"]
+    return {name: values.tolist() for name, values in columns.items()}, versions.tolist()
+
+
+def component_rows(slip_ids, computed, versions):
+    """SalarySlipComponent rows for computed slips; zero components are left out."""
+    rows = []
+    for name, kind in COMPONENTS.items():
+        rows += [
+            dict(slip_id=slip_id, name=name, kind=kind, amount=amount, rules_version=version)
+            for slip_id, amount, version in zip(slip_ids, computed[name], versions)
+            if amount
+        ]
+    return rows
@@ -0,0 +1,78 @@
+import json
+import os
+
+# Statutory payroll rules used by app.payroll, one entry per version. A slip
+# is computed with the latest version whose `effective_from` month is not
+# after the slip's month, so a new financial year's rates are added as a new
+# entry and older months keep computing the way they did. Set
+# PAYROLL_RULES_FILE to a JSON file with the same structure to replace them.
+#
+# proration        loss-of-pay days are taken off calendar days in the month,
+#                  or off a fixed number of days ({"basis": "fixed_days", "days": 30})
+# provident_fund   employee contribution: `rate` of earned basic, capped at
+#                  `wage_ceiling` (null for no cap)
+# professional_tax [above, amount] slabs on monthly gross (gross strictly
+#                  above `above` pays `amount`), with per-month overrides
+# income_tax       new-regime slabs as [lower bound, rate] on projected annual
+#                  income less the standard deduction; no tax up to the rebate
+#                  limit, and at most the income above it just past the limit
+#                  (marginal relief); cess on top. Surcharge is not modelled.
+#
+# The values below are the central new-regime income tax and Maharashtra's
+# professional tax.
+PAYROLL_RULES_FILE = os.getenv("PAYROLL_RULES_FILE")
+
+_PROFESSIONAL_TAX_MH = {
+    "slabs": [[0, 0], [7500, 175], [10000, 200]],
+    # the February deduction makes up the annual 2,500
+    "month_overrides": {"02": [[0, 0], [7500, 175], [10000, 300]]},
+}
+
+RULES = [
+    {
+        "version": "FY2023-24",
+        "effective_from": "2023-04",
+        "proration": {"basis": "calendar_days"},
+        "provident_fund": {"rate": 0.12, "wage_ceiling": 15000},
+        "professional_tax": _PROFESSIONAL_TAX_MH,
+        "income_tax": {
+            "standard_deduction": 50000,
+            "slabs": [[0, 0.0], [300000, 0.05], [600000, 0.10], [900000, 0.15], [1200000, 0.20], [1500000, 0.30]],
+            "rebate_limit": 700000,
+            "cess": 0.04,
+        },
+    },
+    {
+        "version": "FY2024-25",
+        "effective_from": "2024-04",
+        "proration": {"basis": "calendar_days"},
+        "provident_fund": {"rate": 0.12, "wage_ceiling": 15000},
+        "professional_tax": _PROFESSIONAL_TAX_MH,
+        "income_tax": {
+            "standard_deduction": 75000,
+            "slabs": [[0, 0.0], [300000, 0.05], [700000, 0.10], [1000000, 0.15], [1200000, 0.20], [1500000, 0.30]],
+            "rebate_limit": 700000,
+            "cess": 0.04,
+        },
+    },
+    {
+        "version": "FY2025-26",
+        "effective_from": "2025-04",
+        "proration": {"basis": "calendar_days"},
+        "provident_fund": {"rate": 0.12, "wage_ceiling": 15000},
+        "professional_tax": _PROFESSIONAL_TAX_MH,
+        "income_tax": {
+            "standard_deduction": 75000,
+            "slabs": [
+                [0, 0.0], [400000, 0.05], [800000, 0.10], [1200000, 0.15],
+                [1600000, 0.20], [2000000, 0.25], [2400000, 0.30],
+            ],
+            "rebate_limit": 1200000,
+            "cess": 0.04,
+        },
+    },
+]
+
+if PAYROLL_RULES_FILE:
+    with open(PAYROLL_RULES_FILE) as f:
+        RULES = json.load(f)
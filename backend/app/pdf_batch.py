@@ -0,0 +1,120 @@
+import os
+import threading
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from types import SimpleNamespace
+from app import utils
+
+# ReportLab drawing is pure Python and CPU-bound, so batches are rendered in a
+# process pool. The number of queued renders is bounded so a month of payslips
+# never sits in memory at once.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 2))
+PDF_MAX_IN_FLIGHT = int(os.getenv("PDF_MAX_IN_FLIGHT", PDF_WORKERS * 2))
+
+SLIP_FIELDS = ("id", "month", "basic", "allowances", "deductions", "net_pay", "notes")
+USER_FIELDS = ("email", "full_name")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn instead of fork: the server process is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def make_job(slip, user):
+    """Reduce a slip and its employee to a small picklable payload."""
+    return (
+        {f: getattr(slip, f) for f in SLIP_FIELDS},
+        {f: getattr(user, f) for f in USER_FIELDS},
+    )
+
+
+def archive_name(job):
+    slip, user = job
+    return f"salary_{slip['month']}_{user['email']}_{slip['id'][:8]}.pdf"
+
+
+def render_job(job):
+    slip, user = job
+    buffer = utils.generate_salary_pdf(SimpleNamespace(**slip), SimpleNamespace(**user))
+    return buffer.getvalue()
+
+
+def iter_rendered(jobs, pool=None, max_in_flight=None):
+    """
+    Yield (job, pdf_bytes) in completion order.
+
+    Passing pool=None renders serially in the calling thread.
+    """
+    if pool is None:
+        for job in jobs:
+            yield job, render_job(job)
+        return
+
+    max_in_flight = max_in_flight or PDF_MAX_IN_FLIGHT
+    jobs = iter(jobs)
+    pending = {}
+    try:
+        for job in jobs:
+            pending[pool.submit(render_job, job)] = job
+            if len(pending) >= max_in_flight:
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = pending.pop(future)
+                yield job, future.result()
+                nxt = next(jobs, None)
+                if nxt is not None:
+                    pending[pool.submit(render_job, nxt)] = nxt
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class _ChunkWriter:
+    """Write-only file object that collects what ZipFile writes."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(jobs, pool=None, max_in_flight=None):
+    """Yield a ZIP archive of rendered slips chunk by chunk as PDFs finish."""
+    out = _ChunkWriter()
+    # PDFs are already compressed, deflating them again is wasted CPU
+    with zipfile.ZipFile(out, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for job, pdf in iter_rendered(jobs, pool=pool, max_in_flight=max_in_flight):
+            zf.writestr(archive_name(job), pdf)
+            yield out.drain()
+    yield out.drain()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from fastapi import Response
+from app import utils
+
+# Rendered slips are cached under "<slip id>-<content hash>", so an edited slip
+# (or a renamed employee) never matches a stale entry even in another worker.
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "payroll-pdf-cache"))
+PDF_CACHE_MEMORY_ITEMS = int(os.getenv("PDF_CACHE_MEMORY_ITEMS", 256))
+PDF_CACHE_DISK_BYTES = int(os.getenv("PDF_CACHE_DISK_MB", 512)) * 1024 * 1024
+
+# Bump when the PDF layout changes so previously cached files are not served.
+RENDER_VERSION = "2"
+
+SLIP_FIELDS = ("id", "month", "basic", "allowances", "deductions", "net_pay", "notes")
+USER_FIELDS = ("email", "full_name")
+
+
+def content_hash(slip, user):
+    payload = [RENDER_VERSION]
+    payload += [getattr(slip, f) for f in SLIP_FIELDS]
+    payload += [getattr(user, f) for f in USER_FIELDS]
+    raw = json.dumps(payload, default=str).encode()
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+class PdfCache:
+    """Two-tier cache of rendered PDFs: an in-memory LRU over a size-capped directory."""
+
+    def __init__(self, directory, memory_items, disk_bytes):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_used = None
+
+    def open(self):
+        """Create the cache directory and measure what it holds; called at startup, and by the first put otherwise."""
+        with self._lock:
+            if self._disk_used is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._disk_used = sum(e.stat().st_size for e in os.scandir(self.directory) if e.name.endswith(".pdf"))
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the PDF bytes from memory or disk, or None on a miss."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        path = self._path(key)
+        try:
+            # read now rather than hand out the path: eviction or invalidation
+            # may remove the file at any moment
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # refresh mtime so disk eviction is least-recently-used
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self.open()
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._lock:
+            # two requests may render the same slip: count its file once
+            if not os.path.exists(path):
+                self._disk_used += len(data)
+            os.replace(tmp, path)
+            self._remember(key, data)
+            if self._disk_used > self.disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        entries = sorted(
+            (e for e in os.scandir(self.directory) if e.name.endswith(".pdf")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        used = sum(e.stat().st_size for e in entries)
+        # trim to 90% so we do not rescan the directory on every put
+        target = self.disk_bytes * 0.9
+        for entry in entries:
+            if used <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                used -= size
+            except FileNotFoundError:
+                pass
+        self._disk_used = used
+
+    def invalidate(self, slip_id):
+        prefix = f"{slip_id}-"
+        with self._lock:
+            for key in [k for k in self._memory if k.startswith(prefix)]:
+                del self._memory[key]
+        self.open()
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(prefix):
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                    with self._lock:
+                        self._disk_used -= size
+                except FileNotFoundError:
+                    pass
+
+
+cache = PdfCache(PDF_CACHE_DIR, PDF_CACHE_MEMORY_ITEMS, PDF_CACHE_DISK_BYTES)
+
+
+def open_cache():
+    cache.open()
+
+
+def invalidate(slip_id):
+    cache.invalidate(slip_id)
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def salary_pdf_response(request, slip, user):
+    """
+    Serve a slip PDF from the cache with a strong ETag, answering
+    If-None-Match with 304 before anything is rendered or read.
+    """
+    key = f"{slip.id}-{content_hash(slip, user)}"
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename=salary_{slip.month}.pdf",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    data = cache.get(key)
+    if data is None:
+        data = utils.generate_salary_pdf(slip, user).getvalue()
+        cache.put(key, data)
+    return Response(content=data, media_type="application/pdf", headers=headers)
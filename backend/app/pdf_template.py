@@ -0,0 +1,263 @@
+import os
+import copy
+import logging
+import threading
+from io import BytesIO
+import reportlab
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.boxstuff import aspectRatioFix
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+
+# The salary slip layout is split into a static part (header band, logo,
+# company details, table chrome, signature blocks, footer) and the per-slip
+# fields. The static part is drawn once onto a prototype canvas and its PDF
+# content-stream operators are replayed into every new document, and the logo
+# is decoded and Flate-encoded once instead of on every render.
+#
+# Replaying relies on private canvas internals (_code, _doc, _setXObjects,
+# _formsinuse, _currentPageHasImages). They were checked against the ReportLab
+# release below, which requirements.txt pins; if compiling or rendering with
+# the template fails, slips are drawn in full instead.
+CHECKED_REPORTLAB_VERSION = "4.4.5"
+
+LOGO_PATH = os.path.join(os.path.dirname(__file__), "static", "logo.png")
+
+WIDTH, HEIGHT = A4
+BLUE = colors.HexColor("#004c97")
+LIGHT_BLUE = colors.HexColor("#e5f0ff")
+
+LEFT_X = 30
+RIGHT_X = WIDTH - 30
+TABLE_TOP = HEIGHT - 255
+ROW_HEIGHT = 24
+ROW_LABELS = ("Basic Salary", "Allowances", "Deductions", "Net Pay")
+TABLE_BOTTOM = TABLE_TOP - ROW_HEIGHT * (len(ROW_LABELS) + 1)
+NOTES_Y = TABLE_BOTTOM - 40
+SIG_Y = 120
+
+# where both renderers put the logo: drawImage with width 130, no height
+# (so the image's own height) and the aspect ratio preserved
+LOGO_X, LOGO_Y, LOGO_WIDTH = 30, HEIGHT - 80, 130
+
+logger = logging.getLogger(__name__)
+
+
+class _LogoImage:
+    """The logo as a ready-made image XObject that can be attached to any canvas."""
+
+    name = "SlipLogo"
+
+    def __init__(self, path):
+        xobj = pdfdoc.PDFImageXObject(self.name)
+        xobj.mask = "auto"
+        with open(path, "rb") as f:
+            # raw Flate stream, no ASCII85 step: smaller and far cheaper to build
+            xobj.loadImageFromRaw(f)
+        if getattr(xobj, "_smask", None) is not None:
+            raise ValueError("logo with an alpha channel is not supported by the template")
+        self.xobj = xobj
+        # placed the way drawImage places it, whatever the image's size
+        self.box = aspectRatioFix(True, "c", LOGO_X, LOGO_Y, LOGO_WIDTH, None, xobj.width, xobj.height)[:4]
+
+    def register(self, c):
+        """Attach the image to the canvas' document, as canvas.drawImage does."""
+        reg_name = c._doc.getXObjectName(self.name)
+        if reg_name not in c._doc.idToObject:
+            xobj = copy.copy(self.xobj)
+            c._setXObjects(xobj)
+            c._doc.Reference(xobj, reg_name)
+            c._doc.addForm(self.name, xobj)
+        c._currentPageHasImages = 1
+        # lists the image in the page's XObject resources
+        c._formsinuse.append(self.name)
+        return reg_name
+
+    def draw(self, c):
+        x, y, w, h = self.box
+        reg_name = self.register(c)
+        c.saveState()
+        c.translate(x, y)
+        c.scale(w, h)
+        c._code.append(f"/{reg_name} Do")
+        c.restoreState()
+
+
+def draw_static(c, logo=None):
+    """Everything on the slip that does not depend on the slip or employee."""
+    c.setFillColor(BLUE)
+    c.rect(0, HEIGHT - 90, WIDTH, 90, fill=1, stroke=0)
+
+    if logo is not None:
+        logo.draw(c)
+    elif os.path.exists(LOGO_PATH):
+        try:
+            c.drawImage(LOGO_PATH, LOGO_X, LOGO_Y, width=LOGO_WIDTH, preserveAspectRatio=True, mask="auto")
+        except Exception:
+            # if logo fails, just skip
+            pass
+
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica-Bold", 18)
+    c.drawRightString(WIDTH - 30, HEIGHT - 40, "Anshumat Solutions")
+
+    c.setFont("Helvetica", 9)
+    c.drawRightString(WIDTH - 30, HEIGHT - 58, "+01 (977) 2599 12")
+    c.drawRightString(WIDTH - 30, HEIGHT - 70, "contact@anshumat.org")
+    c.drawRightString(WIDTH - 30, HEIGHT - 82, "Durgapur, West Bengal 713363, India")
+
+    c.setFillColor(BLUE)
+    c.setFont("Helvetica-Bold", 20)
+    c.drawString(30, HEIGHT - 120, "Salary Slip")
+
+    c.setStrokeColor(BLUE)
+    c.setLineWidth(1)
+    c.line(30, HEIGHT - 130, WIDTH - 30, HEIGHT - 130)
+
+    c.setFont("Helvetica-Bold", 11)
+    c.setFillColor(colors.black)
+    c.drawString(30, HEIGHT - 155, "Employee Details")
+    c.drawString(30, HEIGHT - 235, "Salary Breakdown")
+
+    # table header and row labels
+    c.setFillColor(LIGHT_BLUE)
+    c.rect(LEFT_X, TABLE_TOP - ROW_HEIGHT, RIGHT_X - LEFT_X, ROW_HEIGHT, fill=1, stroke=0)
+    c.setFillColor(BLUE)
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(LEFT_X + 8, TABLE_TOP - ROW_HEIGHT + 7, "Component")
+    c.drawRightString(RIGHT_X - 8, TABLE_TOP - ROW_HEIGHT + 7, "Amount (₹)")
+
+    c.setFillColor(colors.black)
+    y = TABLE_TOP - ROW_HEIGHT * 2
+    for label in ROW_LABELS:
+        if label == "Net Pay":
+            c.setFont("Helvetica-Bold", 11)
+        else:
+            c.setFont("Helvetica", 10)
+        c.drawString(LEFT_X + 8, y + 6, label)
+        y -= ROW_HEIGHT
+
+    c.setStrokeColor(BLUE)
+    c.setLineWidth(0.8)
+    c.rect(LEFT_X, TABLE_BOTTOM, RIGHT_X - LEFT_X, (TABLE_TOP - ROW_HEIGHT) - TABLE_BOTTOM)
+
+    c.setFont("Helvetica-Bold", 11)
+    c.setFillColor(BLUE)
+    c.drawString(30, NOTES_Y, "Notes:")
+
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 10)
+    c.drawString(40, SIG_Y + 25, "____________________________")
+    c.drawString(40, SIG_Y + 10, "HR Manager")
+    c.drawString(40, SIG_Y - 5, "Anshumat Solutions")
+    c.drawRightString(WIDTH - 40, SIG_Y + 25, "____________________________")
+    c.drawRightString(WIDTH - 40, SIG_Y + 10, "Employee Signature")
+
+    c.setFillColor(colors.grey)
+    c.setFont("Helvetica", 8)
+    c.drawString(
+        30,
+        40,
+        "This is a computer-generated document and does not require a physical signature."
+    )
+
+
+def draw_fields(c, slip, user):
+    """The per-slip text: employee details, amounts, notes and signature name."""
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 10)
+    c.drawString(40, HEIGHT - 175, f"Name: {user.full_name or user.email}")
+    c.drawString(40, HEIGHT - 190, f"Email: {user.email}")
+    c.drawString(40, HEIGHT - 205, f"Month: {slip.month}")
+
+    y = TABLE_TOP - ROW_HEIGHT * 2
+    for value in (slip.basic, slip.allowances, slip.deductions):
+        c.drawRightString(RIGHT_X - 8, y + 6, f"{value:,.2f}")
+        y -= ROW_HEIGHT
+    c.setFont("Helvetica-Bold", 11)
+    c.drawRightString(RIGHT_X - 8, y + 6, f"{slip.net_pay:,.2f}")
+
+    c.setFont("Helvetica", 10)
+    c.drawString(40, NOTES_Y - 18, slip.notes if slip.notes else "-")
+    c.drawRightString(WIDTH - 40, SIG_Y - 5, user.full_name or user.email)
+
+
+class SalarySlipTemplate:
+    """
+    Salary slip renderer with the static layout compiled once.
+
+    With precompiled=False every document draws the full layout and embeds the
+    logo from disk, which is what generate_salary_pdf used to do; it is kept for
+    the benchmark and as a fallback.
+    """
+
+    def __init__(self, precompiled=True):
+        self.logo = None
+        self.fonts = []
+        self.ops = None
+        if precompiled:
+            self.logo = _LogoImage(LOGO_PATH) if os.path.exists(LOGO_PATH) else None
+            self._compile()
+
+    def _compile(self):
+        proto = canvas.Canvas(BytesIO(), pagesize=A4)
+        start = len(proto._code)
+        draw_static(proto, self.logo)
+        self.ops = list(proto._code[start:])
+        # internal font names (/F1, /F2, ...) are handed out in order of first
+        # use, so register the same fonts in the same order before replaying
+        self.fonts = list(proto._doc.fontMapping)
+        self.state = (proto._fontname, proto._fontsize, proto._leading)
+
+    def _replay_static(self, c):
+        for font in self.fonts:
+            c._doc.getInternalFontName(font)
+        if self.logo is not None:
+            self.logo.register(c)
+        c._code.extend(self.ops)
+        c._fontname, c._fontsize, c._leading = self.state
+
+    def render(self, slip, user):
+        if self.ops is not None:
+            try:
+                return self._render(slip, user, self._replay_static)
+            except Exception:
+                logger.warning("precompiled salary slip failed, drawing it in full", exc_info=True)
+                buffer = self._render(slip, user, draw_static)
+                # the full drawing works, so the template is what is broken
+                self.ops = None
+                return buffer
+        return self._render(slip, user, draw_static)
+
+    def _render(self, slip, user, draw):
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        draw(c)
+        draw_fields(c, slip, user)
+        c.showPage()
+        c.save()
+        buffer.seek(0)
+        return buffer
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_template():
+    global _template
+    with _template_lock:
+        if _template is None:
+            if reportlab.Version != CHECKED_REPORTLAB_VERSION:
+                logger.warning(
+                    "salary slip template was checked against ReportLab %s, found %s",
+                    CHECKED_REPORTLAB_VERSION, reportlab.Version,
+                )
+            try:
+                _template = SalarySlipTemplate()
+            except Exception:
+                # unexpected ReportLab internals: fall back to full drawing
+                logger.warning("salary slip template did not compile, drawing slips in full", exc_info=True)
+                _template = SalarySlipTemplate(precompiled=False)
+        return _template
@@ -0,0 +1,208 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import auth, database
+
+# Optional read replicas for the heavy read endpoints. READ_REPLICA_URLS is a
+# comma-separated list of database URLs; reads rotate between them through
+# get_read_session / get_async_read_session and everything else stays on the
+# primary. After a client commits a write, its reads go to the primary for
+# REPLICA_STICKY_SECONDS so it sees its own change despite replica lag. A
+# replica that cannot be reached is skipped for REPLICA_RETRY_SECONDS and
+# reads fall back to the next one, then to the primary; one that fails
+# during a request is skipped the same way, and the failed statement and
+# the rest of the request run on the primary. The write marks are kept per
+# worker process and dropped once expired. SQLite replicas should be opened read-only, e.g.
+# sqlite:///file:replica.db?mode=ro&uri=true, so a missing file is reported
+# instead of created.
+READ_REPLICA_URLS = [url.strip() for url in os.getenv("READ_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 10))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    def __init__(self, url):
+        self.url = url
+        self.engine = database.make_engine(url, read_only=True)
+        self.down_until = 0.0
+        self._async_engine = None
+
+    def get_async_engine(self):
+        if self._async_engine is None:
+            self._async_engine = database.make_async_engine(database.async_url(self.url), read_only=True)
+        return self._async_engine
+
+    async def dispose_async_engine(self):
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+            self._async_engine = None
+
+    def available(self, now):
+        return self.down_until <= now
+
+    def mark_down(self, error):
+        self.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        logger.warning(
+            "read replica %s unavailable, skipping it for %.0fs: %s",
+            make_url(self.url).render_as_string(), REPLICA_RETRY_SECONDS, error.orig,
+        )
+
+
+replicas = [Replica(url) for url in READ_REPLICA_URLS]
+_rotation = itertools.count()
+
+# user id -> monotonic time until which that user's reads go to the primary;
+# expired marks are swept out every REPLICA_STICKY_SECONDS
+_recent_writers = {}
+_writers_lock = threading.Lock()
+_next_sweep = 0.0
+# the bearer token of the request being served, set by StickyReadsMiddleware
+_request_token: ContextVar[str | None] = ContextVar("request_token", default=None)
+
+
+def _request_user_id():
+    token = _request_token.get()
+    return auth.decode_token(token) if token else None
+
+
+def _mark_write(conn):
+    global _next_sweep
+    user_id = _request_user_id()
+    if user_id is None:
+        return
+    now = time.monotonic()
+    with _writers_lock:
+        if now >= _next_sweep:
+            for expired in [u for u, until in _recent_writers.items() if until <= now]:
+                del _recent_writers[expired]
+            _next_sweep = now + REPLICA_STICKY_SECONDS
+        _recent_writers[user_id] = now + REPLICA_STICKY_SECONDS
+
+
+def _wrote_recently(now):
+    user_id = _request_user_id()
+    if user_id is None:
+        return False
+    with _writers_lock:
+        until = _recent_writers.get(user_id)
+        if until is not None and until <= now:
+            del _recent_writers[user_id]
+            until = None
+    return until is not None
+
+
+def candidates():
+    """Replicas to try for this request, in order; empty means use the primary."""
+    now = time.monotonic()
+    if not replicas or _wrote_recently(now):
+        return []
+    start = next(_rotation) % len(replicas)
+    ordered = replicas[start:] + replicas[:start]
+    return [replica for replica in ordered if replica.available(now)]
+
+
+class ReplicaSession(Session):
+    """
+    A session bound to a replica connection that, when a statement fails
+    there, skips the replica and runs the statement again, and every later
+    one, on the primary. Read sessions never write, so nothing is lost by
+    starting over.
+    """
+
+    def __init__(self, *args, replica=None, primary=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+        self.primary = primary
+
+    def _on_replica(self, run):
+        if self.replica is None:
+            return run()
+        try:
+            return run()
+        except exc.DBAPIError as e:
+            # e.g. the replica went away or its file was being replaced
+            self.replica.mark_down(e)
+            self.replica = None
+            self.rollback()
+            self.bind = self.primary
+            return run()
+
+    def execute(self, *args, **kwargs):
+        return self._on_replica(lambda: super(ReplicaSession, self).execute(*args, **kwargs))
+
+    def exec(self, *args, **kwargs):
+        return self._on_replica(lambda: super(ReplicaSession, self).exec(*args, **kwargs))
+
+
+def get_read_session():
+    """Session for read-only endpoints: a replica when one is usable, else the primary."""
+    for replica in candidates():
+        try:
+            conn = replica.engine.connect()
+        except exc.DBAPIError as e:
+            replica.mark_down(e)
+            continue
+        try:
+            with ReplicaSession(bind=conn, replica=replica, primary=database.engine) as session:
+                yield session
+        finally:
+            conn.close()
+        return
+    yield from database.get_session()
+
+
+async def get_async_read_session():
+    """get_read_session for routes running on the async session."""
+    for replica in candidates():
+        try:
+            conn = await replica.get_async_engine().connect()
+        except exc.DBAPIError as e:
+            replica.mark_down(e)
+            continue
+        primary = database.get_async_engine().sync_engine
+        try:
+            async with AsyncSession(
+                bind=conn, expire_on_commit=False, sync_session_class=ReplicaSession, replica=replica, primary=primary
+            ) as session:
+                yield session
+        finally:
+            await conn.close()
+        return
+    async with AsyncSession(database.get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+# the read session matching database.get_db
+get_read_db = get_async_read_session if database.ASYNC_DB else get_read_session
+
+
+class StickyReadsMiddleware:
+    """Makes the request's bearer token visible to the commit hook and the read session."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reset = _request_token.set(auth.bearer_token(scope))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_token.reset(reset)
+
+
+if replicas:
+    # every commit on a primary connection marks the requesting user; replica
+    # sessions never commit
+    event.listen(Engine, "commit", _mark_write)
@@ -1,30 +1,59 @@
-from fastapi import APIRouter, Depends, Response
+import csv
+import io
+from datetime import date, datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from fastapi.responses import StreamingResponse
-from sqlmodel import Session, select
-from app import database, auth, crud, schemas, models, utils
+from sqlmodel import Session
+from app import database, auth, conditional, crud, crud_async, events, exports, fastjson, schemas, models, pdf_batch, pdf_cache, pagination, replicas, search
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# list endpoints return only these columns, encoded by app.fastjson; the
+# pending list has always returned every expense column
+PENDING_EXPENSE_FIELDS = fastjson.fields_of(models.Expense)
+EMPLOYEE_FIELDS = fastjson.fields_of(schemas.EmployeeRead)
+AUDIT_FIELDS = fastjson.fields_of(schemas.AuditEntryRead)
+
 
 # -------------------------------
-# CREATE SALARY SLIP (WITH EMAIL)
+# CREATE SALARY SLIP (EMAIL VIA OUTBOX)
 # -------------------------------
 @router.post("/salary-slip", response_model=schemas.SalarySlipRead)
-def create_salary_slip(
+async def create_salary_slip(
     slip_in: schemas.SalarySlipCreate,
+    session=Depends(database.get_db),
+    admin=Depends(auth.get_admin)
+):
+    return await crud_async.create_salary_slip(session, slip_in)
+
+# -------------------------------
+# BULK PAYROLL RUN
+# -------------------------------
+@router.post("/payroll-runs", response_model=schemas.PayrollRunSummary)
+def create_payroll_run(
+    run_in: schemas.PayrollRunCreate,
     session: Session = Depends(database.get_session),
     admin=Depends(auth.require_admin)
 ):
-    slip = crud.create_salary_slip(session, slip_in)
-    employee = session.get(models.User, slip.employee_id)
+    try:
+        return crud.create_payroll_run(session, run_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    utils.send_notification_email(
-        employee.email,
-        "New Salary Slip Created",
-        f"A salary slip for {slip.month} has been created."
-    )
 
-    return slip
+@router.post("/payroll-runs/preview", response_model=List[schemas.PayrollPreviewItem])
+def preview_payroll_run(
+    run_in: schemas.PayrollRunCreate,
+    response: Response,
+    session: Session = Depends(database.get_session),
+    admin=Depends(auth.require_admin)
+):
+    """The components `apply_rules` would compute for a run, without creating any slips."""
+    try:
+        return fastjson.respond(response, crud.preview_payroll_run(session, run_in))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # -------------------------------
@@ -47,43 +76,83 @@ def update_salary_slip(
 # LIST ALL PENDING EXPENSES
 # -------------------------------
 @router.get("/expenses/pending")
-def list_pending_expenses(
-    session: Session = Depends(database.get_session),
-    admin=Depends(auth.require_admin)
+async def list_pending_expenses(
+    request: Request,
+    response: Response,
+    page: pagination.PageParams = Depends(),
+    session=Depends(replicas.get_read_db),
+    admin=Depends(auth.get_admin)
 ):
-    return crud.get_all_pending_expenses(session)
-
+    state = await crud_async.get_list_version(session, conditional.PENDING_EXPENSES)
+    cached = conditional.not_modified(request, response, conditional.PENDING_EXPENSES, state)
+    if cached:
+        return cached
+    expenses = await crud_async.get_all_pending_expenses(session, page.limit, page.cursor, PENDING_EXPENSE_FIELDS)
+    pagination.set_next_cursor(response, expenses, page, "date")
+    return fastjson.respond(response, expenses)
 
 # -------------------------------
 # APPROVE / REJECT AN EXPENSE
 # -------------------------------
 @router.post("/expenses/{expense_id}/action")
-def approve_reject_expense(
+async def approve_reject_expense(
     expense_id: str,
     action: str,
     comment: str | None = None,
-    session: Session = Depends(database.get_session),
-    admin=Depends(auth.require_admin)
+    session=Depends(database.get_db),
+    admin=Depends(auth.get_admin)
 ):
     if action not in ("approve", "reject"):
         return {"error": "action must be 'approve' or 'reject'"}
 
     status = "approved" if action == "approve" else "rejected"
 
-    exp = crud.update_expense_status(session, expense_id, status, admin_comment=comment)
+    exp = await crud_async.update_expense_status(session, expense_id, status, admin_comment=comment)
     if not exp:
         return {"error": "not found"}
 
-    user = session.get(models.User, exp.employee_id)
+    return exp
 
-    utils.send_notification_email(
-        user.email,
-        f"Expense {status}",
-        f"Your expense {exp.id} has been {status}. Comment: {comment or ''}"
+# -------------------------------
+# BULK APPROVE / REJECT EXPENSES
+# -------------------------------
+def _bulk_action_args(body: schemas.ExpenseBulkAction):
+    if body.action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="action must be 'approve' or 'reject'")
+    status = "approved" if body.action == "approve" else "rejected"
+    filters = dict(
+        expense_ids=body.expense_ids,
+        category=body.category,
+        max_amount=body.max_amount,
+        admin_comment=body.comment,
     )
+    return status, filters
 
-    return exp
 
+@router.post("/expenses/bulk-action", response_model=schemas.ExpenseBulkActionResult)
+async def bulk_approve_reject_expenses(
+    body: schemas.ExpenseBulkAction,
+    session=Depends(database.get_db),
+    admin=Depends(auth.get_admin)
+):
+    status, filters = _bulk_action_args(body)
+    try:
+        changed = await crud_async.bulk_update_expense_status(session, status, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": status, "updated": len(changed), "expense_ids": [r["id"] for r in changed]}
+
+# -------------------------------
+# DASHBOARD SUMMARY
+# -------------------------------
+@router.get("/summary", response_model=schemas.DashboardSummary)
+async def get_summary(
+    month: Optional[str] = None,
+    session=Depends(replicas.get_read_db),
+    admin=Depends(auth.get_admin)
+):
+    """Payroll totals by month and expense totals by month, category and status."""
+    return await crud_async.get_summary(session, month)
 
 # -------------------------------
 # GENERATE SLIP PDF
@@ -91,30 +160,191 @@ def approve_reject_expense(
 @router.get("/salary-slip/{slip_id}/pdf")
 def get_salary_pdf(
     slip_id: str,
-    session: Session = Depends(database.get_session),
+    request: Request,
+    session: Session = Depends(replicas.get_read_session),
     admin=Depends(auth.require_admin)
 ):
-    slip = session.get(models.SalarySlip, slip_id)
+    slip = crud.get_salary_slip(session, slip_id)
     if not slip:
         return {"error": "not found"}
 
     employee = session.get(models.User, slip.employee_id)
 
-    pdf_buffer = utils.generate_salary_pdf(slip, employee)
+    return pdf_cache.salary_pdf_response(request, slip, employee)
+
+
+# -------------------------------
+# SLIP COMPONENT BREAKDOWN
+# -------------------------------
+@router.get("/salary-slip/{slip_id}/components", response_model=schemas.SlipBreakdown)
+def get_salary_slip_components(
+    slip_id: str,
+    session: Session = Depends(replicas.get_read_session),
+    admin=Depends(auth.require_admin)
+):
+    if not crud.get_salary_slip(session, slip_id):
+        raise HTTPException(status_code=404, detail="Salary slip not found")
+    return crud.get_salary_slip_components(session, slip_id)
+
 
+# -------------------------------
+# BATCH PDF ARCHIVE FOR A MONTH
+# -------------------------------
+@router.get("/salary-slips/pdf-archive")
+def get_salary_pdf_archive(
+    month: str,
+    employee_ids: Optional[List[str]] = Query(None),
+    session: Session = Depends(replicas.get_read_session),
+    admin=Depends(auth.require_admin)
+):
+    jobs = [pdf_batch.make_job(slip, user) for slip, user in crud.get_salary_slips_for_month(session, month, employee_ids)]
+    if not jobs:
+        raise HTTPException(status_code=404, detail="No salary slips for that month")
+
+    return StreamingResponse(
+        pdf_batch.stream_zip(jobs, pool=pdf_batch.get_pool()),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=salary_slips_{month}.zip"}
+    )
+
+
+# -------------------------------
+# STREAMING EXPORTS (CSV / NDJSON)
+# -------------------------------
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+FORMAT_PATTERN = "^(csv|ndjson)$"
+
+
+def _export_response(stmt, columns, fmt, name, archived):
     return StreamingResponse(
-        pdf_buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=salary_{slip.month}.pdf"}
+        exports.stream_rows(stmt, columns, fmt, archived=archived),
+        media_type=exports.FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"}
     )
 
 
+@router.get("/export/salary-slips")
+def export_salary_slips(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    from_month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    to_month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    admin=Depends(auth.require_admin)
+):
+    """Salary slips for a month or an inclusive range of months, streamed as CSV or NDJSON."""
+    stmt = exports.salary_slips_query(month, from_month, to_month)
+    archived = exports.archived_salary_slips(month, from_month, to_month)
+    return _export_response(stmt, exports.SLIP_COLUMNS, format, f"salary_slips_{month or 'export'}", archived)
+
+
+@router.get("/export/expenses")
+def export_expenses(
+    format: str = Query("csv", pattern=FORMAT_PATTERN),
+    month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    status: Optional[str] = None,
+    admin=Depends(auth.require_admin)
+):
+    """Expenses dated in a month or between two dates (inclusive), streamed as CSV or NDJSON."""
+    try:
+        stmt = exports.expenses_query(month, start_date, end_date, status)
+        archived = exports.archived_expenses(month, start_date, end_date, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _export_response(stmt, exports.EXPENSE_COLUMNS, format, f"expenses_{month or 'export'}", archived)
+
+
+# -------------------------------
+# AUDIT TRAIL
+# -------------------------------
+class AuditFilters:
+    """Optional filters of the audit trail; `start` and `end` bound the entry time (end exclusive)."""
+
+    def __init__(
+        self,
+        entity: Optional[str] = None,
+        entity_id: Optional[str] = None,
+        actor_id: Optional[str] = None,
+        action: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ):
+        self.values = dict(entity=entity, entity_id=entity_id, actor_id=actor_id, action=action, start=start, end=end)
+
+
+@router.get("/audit", response_model=List[schemas.AuditEntryRead])
+async def get_audit_log(
+    response: Response,
+    page: pagination.PageParams = Depends(),
+    filters: AuditFilters = Depends(),
+    session=Depends(replicas.get_read_db),
+    admin=Depends(auth.get_admin)
+):
+    entries = await crud_async.get_audit_log(session, page.limit, page.cursor, AUDIT_FIELDS, **filters.values)
+    pagination.set_next_cursor(response, entries, page, "at")
+    return fastjson.respond(response, entries)
+
+# -------------------------------
+# CHANGE EVENTS (SERVER-SENT EVENTS)
+# -------------------------------
+@router.get("/events")
+async def admin_events(request: Request, user=Depends(auth.get_stream_user)):
+    """Expense submissions and status changes, slips and payroll runs, pushed as they commit."""
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return events.response(request, [events.ADMIN_CHANNEL])
+
+
 # -------------------------------
-# LIST ALL EMPLOYEES
+# LIST AND SEARCH EMPLOYEES
 # -------------------------------
-@router.get("/employees")
-def list_employees(
+class EmployeeFilters:
+    """
+    Optional filters of the employee list. `q` searches names and emails
+    (app.search) and orders by rank; `start` and `end` bound the creation
+    time (end exclusive).
+    """
+
+    def __init__(
+        self,
+        q: Optional[str] = Query(None, max_length=200),
+        role: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ):
+        self.values = dict(q=q, role=role, start=start, end=end)
+        self.sort_attr = "rank" if q and search.terms(q) else "created_at"
+
+
+@router.get("/employees", response_model=List[schemas.EmployeeSearchResult])
+async def list_employees(
+    response: Response,
+    page: pagination.PageParams = Depends(),
+    filters: EmployeeFilters = Depends(),
+    session=Depends(replicas.get_read_db),
+    admin=Depends(auth.get_admin)
+):
+    employees = await crud_async.get_users(session, page.limit, page.cursor, EMPLOYEE_FIELDS, **filters.values)
+    pagination.set_next_cursor(response, employees, page, filters.sort_attr)
+    return fastjson.respond(response, employees)
+
+# -------------------------------
+# BULK IMPORT EMPLOYEES FROM CSV
+# -------------------------------
+@router.post("/employees/import", response_model=schemas.EmployeeImportSummary)
+def import_employees(
+    file: UploadFile = File(...),
     session: Session = Depends(database.get_session),
     admin=Depends(auth.require_admin)
 ):
-    return session.exec(select(models.User)).all()
+    """CSV with an `email,password,full_name,role` header; full_name and role are optional."""
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig"))
+    if not reader.fieldnames or not {"email", "password"} <= set(reader.fieldnames):
+        raise HTTPException(status_code=400, detail="CSV must have email and password columns")
+    rows = (
+        (line, {k: v for k, v in row.items() if k and v not in (None, "")})
+        for line, row in enumerate(reader, start=2)
+    )
+    created, skipped = crud.import_users(session, rows)
+    return {"created": created, "skipped": skipped}
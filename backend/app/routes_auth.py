@@ -1,26 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
-from app import crud, schemas, database, auth
+from app import crud_async, schemas, database, auth
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# both wait for a password hash; they await it on the event loop rather than
+# holding a threadpool thread (app.auth)
 @router.post("/signup", response_model=schemas.UserRead)
-def signup(user_in: schemas.UserCreate, session: Session = Depends(database.get_session)):
+async def signup(user_in: schemas.UserCreate, session = Depends(database.get_db)):
     try:
-        user = crud.create_user(session, user_in)
+        user = await crud_async.create_user(session, user_in)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except auth.HashPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     return user
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(database.get_session)):
-    user = crud.authenticate_user(session, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session = Depends(database.get_db)):
+    try:
+        user = await crud_async.authenticate_user(session, form_data.username, form_data.password)
+    except auth.HashPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     token = auth.create_access_token(data={"sub": user.id, "role": user.role})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.UserRead)
-def read_me(current_user = Depends(auth.get_current_user)):
-    return current_user
\ No newline at end of file
+async def read_me(current_user = Depends(auth.get_user)):
+    return current_user
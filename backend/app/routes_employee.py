@@ -1,32 +1,60 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session
 from typing import List
-from app import database, auth, crud, schemas, utils
-from app import models
+from app import database, auth, conditional, crud, crud_async, events, schemas, pdf_cache, pagination, fastjson, replicas
 
 
 router = APIRouter(prefix="/employee", tags=["employee"])
 
+# list endpoints return only these columns, encoded by app.fastjson
+SLIP_FIELDS = fastjson.fields_of(schemas.SalarySlipRead)
+EXPENSE_FIELDS = fastjson.fields_of(schemas.ExpenseRead)
+
+# listing and submitting are pure database I/O, so with ASYNC_DB they run on
+# the event loop instead of the threadpool (app.crud_async). The lists answer
+# conditional GETs from their version row before querying (app.conditional).
 @router.get("/salary-slip", response_model=List[schemas.SalarySlipRead])
-def view_salary_slips(session: Session = Depends(database.get_session), user = Depends(auth.get_current_user)):
-    slips = crud.get_salary_slips_for_user(session, user.id)
-    return slips
+async def view_salary_slips(request: Request, response: Response, page: pagination.PageParams = Depends(), session = Depends(replicas.get_read_db), user = Depends(auth.get_user)):
+    scope = conditional.salary_slips_of(user.id)
+    cached = conditional.not_modified(request, response, scope, await crud_async.get_list_version(session, scope))
+    if cached:
+        return cached
+    slips = await crud_async.get_salary_slips_for_user(session, user.id, page.limit, page.cursor, SLIP_FIELDS)
+    pagination.set_next_cursor(response, slips, page, "created_at")
+    return fastjson.respond(response, slips)
 
 @router.post("/expense", response_model=schemas.ExpenseRead)
-def submit_expense(exp_in: schemas.ExpenseCreate, session: Session = Depends(database.get_session), user = Depends(auth.get_current_user)):
-    exp = crud.create_expense(session, user.id, exp_in)
-    utils.send_notification_email("admin@example.com", "New Expense Submitted", f"{user.email} submitted expense {exp.id} of ₹{exp.amount:.2f}")
-    return exp
+async def submit_expense(exp_in: schemas.ExpenseCreate, session = Depends(database.get_db), user = Depends(auth.get_user)):
+    return await crud_async.create_expense(session, user.id, exp_in)
 
 @router.get("/expense", response_model=List[schemas.ExpenseRead])
-def view_expenses(session: Session = Depends(database.get_session), user = Depends(auth.get_current_user)):
-    return crud.get_expenses_for_user(session, user.id)
+async def view_expenses(request: Request, response: Response, page: pagination.PageParams = Depends(), session = Depends(replicas.get_read_db), user = Depends(auth.get_user)):
+    scope = conditional.expenses_of(user.id)
+    cached = conditional.not_modified(request, response, scope, await crud_async.get_list_version(session, scope))
+    if cached:
+        return cached
+    expenses = await crud_async.get_expenses_for_user(session, user.id, page.limit, page.cursor, EXPENSE_FIELDS)
+    pagination.set_next_cursor(response, expenses, page, "date")
+    return fastjson.respond(response, expenses)
+
 
 @router.get("/salary-slip/{slip_id}/pdf")
-def download_salary_pdf(slip_id: str, session: Session = Depends(database.get_session), user = Depends(auth.get_current_user)):
-    slip = session.get(models.SalarySlip, slip_id)
+def download_salary_pdf(slip_id: str, request: Request, session: Session = Depends(replicas.get_read_session), user = Depends(auth.get_current_user)):
+    slip = crud.get_salary_slip(session, slip_id)
     if not slip or slip.employee_id != user.id:
         return {"error": "not found or unauthorized"}
-    pdf_buffer = utils.generate_salary_pdf(slip, user)
-    from fastapi.responses import StreamingResponse
-    return StreamingResponse(pdf_buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=salary_{slip.month}.pdf"})
\ No newline at end of file
+    return pdf_cache.salary_pdf_response(request, slip, user)
+
+
+@router.get("/salary-slip/{slip_id}/components", response_model=schemas.SlipBreakdown)
+def view_salary_slip_components(slip_id: str, session: Session = Depends(replicas.get_read_session), user = Depends(auth.get_current_user)):
+    slip = crud.get_salary_slip(session, slip_id)
+    if not slip or slip.employee_id != user.id:
+        raise HTTPException(status_code=404, detail="Salary slip not found")
+    return crud.get_salary_slip_components(session, slip_id)
+
+
+@router.get("/events")
+async def employee_events(request: Request, user = Depends(auth.get_stream_user)):
+    """Server-sent events for changes to the user's own expenses and salary slips."""
+    return events.response(request, [events.user_channel(user.id)])
@@ -1,5 +1,5 @@
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from typing import Dict, Optional, List
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 
 class Token(BaseModel):
@@ -25,6 +25,13 @@ class UserRead(BaseModel):
     class Config:
         orm_mode = True
 
+class EmployeeRead(UserRead):
+    created_at: datetime
+
+class EmployeeSearchResult(EmployeeRead):
+    # only in search results; lower ranks are better matches
+    rank: Optional[float] = None
+
 class SalarySlipCreate(BaseModel):
     employee_id: str
     month: str
@@ -53,4 +60,120 @@ class ExpenseRead(ExpenseCreate):
     admin_comment: Optional[str]
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ExpenseBulkAction(BaseModel):
+    # pending expenses matching the ids and/or the filter are updated
+    action: str
+    expense_ids: Optional[List[str]] = None
+    category: Optional[str] = None
+    max_amount: Optional[float] = None  # exclusive: amounts under it
+    comment: Optional[str] = None
+
+class ExpenseBulkActionResult(BaseModel):
+    status: str
+    updated: int
+    expense_ids: List[str]
+
+class SalarySlipTemplate(BaseModel):
+    basic: float
+    allowances: float = 0.0
+    deductions: float = 0.0
+    notes: Optional[str] = None
+
+class PayrollAdjustment(BaseModel):
+    lop_days: float = Field(0.0, ge=0)
+    arrears: float = Field(0.0, ge=0)
+
+class PayrollRunCreate(BaseModel):
+    # Either an explicit list of slips, or a month plus a template applied to
+    # `employee_ids` (all employees when omitted).
+    slips: Optional[List[SalarySlipCreate]] = None
+    month: Optional[str] = None
+    template: Optional[SalarySlipTemplate] = None
+    employee_ids: Optional[List[str]] = None
+    # compute earned pay and statutory deductions with app.payroll; basic and
+    # allowances are then the monthly contractual amounts and deductions any
+    # other deductions. Loss-of-pay days and arrears are given per employee id.
+    apply_rules: bool = False
+    adjustments: Optional[Dict[str, PayrollAdjustment]] = None
+
+class PayrollRunSummary(BaseModel):
+    created: int
+    months: List[str]
+    total_basic: float
+    total_allowances: float
+    total_deductions: float
+    total_net_pay: float
+    slip_ids: List[str]
+
+class ImportRowError(BaseModel):
+    line: int
+    email: Optional[str] = None
+    reason: str
+
+class EmployeeImportSummary(BaseModel):
+    created: int
+    skipped: List[ImportRowError]
+
+class PayrollMonthTotalRead(BaseModel):
+    month: str
+    slip_count: int
+    basic: float
+    allowances: float
+    deductions: float
+    net_pay: float
+
+    class Config:
+        orm_mode = True
+
+class ExpenseTotalRead(BaseModel):
+    month: str
+    category: str
+    status: str
+    expense_count: int
+    amount: float
+
+    class Config:
+        orm_mode = True
+
+class DashboardSummary(BaseModel):
+    payroll: List[PayrollMonthTotalRead]
+    expenses: List[ExpenseTotalRead]
+
+class SlipComponent(BaseModel):
+    name: str
+    kind: str
+    amount: float
+
+class SlipBreakdown(BaseModel):
+    slip_id: str
+    # None for slips entered by hand
+    rules_version: Optional[str] = None
+    components: List[SlipComponent]
+
+class PayrollPreviewItem(BaseModel):
+    employee_id: str
+    month: str
+    rules_version: str
+    earned_basic: float
+    earned_allowances: float
+    arrears: float
+    provident_fund: float
+    professional_tax: float
+    income_tax: float
+    other_deductions: float
+    gross: float
+    total_deductions: float
+    net_pay: float
+
+class AuditEntryRead(BaseModel):
+    id: str
+    at: datetime
+    actor_id: Optional[str] = None
+    ip: Optional[str] = None
+    action: str
+    entity: str
+    entity_id: Optional[str] = None
+    before: Optional[dict] = None
+    after: Optional[dict] = None
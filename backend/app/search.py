@@ -0,0 +1,187 @@
+import logging
+from sqlalchemy import case, column, func, literal, literal_column, or_, table
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session
+from app import models, pagination
+
+# Employee search on /admin/employees: every word of the query must occur in
+# the name or the email, anywhere (substring), case-insensitively. On SQLite
+# the words are looked up in `user_search`, an FTS5 index with the trigram
+# tokenizer over the user table's own rows (an external-content table, so
+# names and emails are not stored twice), which triggers on the user table
+# keep in step with every insert, update and delete, bulk imports and
+# scripts included. On PostgreSQL a pg_trgm GIN index on the name and email
+# serves the same LIKE patterns. Other databases, SQLite builds without FTS5
+# trigrams, and queries whose words are all shorter than three characters
+# scan the table.
+#
+# Matches are ranked by tier: the query equal to the name or the email, a
+# prefix of either, a prefix of a word of the name, then anywhere; within a
+# tier, shorter names and emails (closer matches) come first. The rank is
+# one number, lower first, so results page with the usual keyset cursor.
+#
+# The SQLite index refers to users by `search_rowid`, an integer column that
+# install() adds to the user table (the models do not map it) and the insert
+# trigger numbers. The table's implicit rowid would not do: the primary key
+# is a string, so VACUUM may renumber rowids. `python -m app.search`
+# rebuilds the index from the user table should it ever be damaged.
+
+MIN_TRIGRAM = 3
+MAX_TERMS = 8
+
+_SQLITE_COLUMN = 'ALTER TABLE "user" ADD COLUMN search_rowid INTEGER'
+_SQLITE_DDL = (
+    'UPDATE "user" SET search_rowid = rowid + (SELECT coalesce(max(search_rowid), 0) FROM "user") WHERE search_rowid IS NULL',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ix_user_search_rowid ON "user" (search_rowid)',
+    """
+    CREATE VIRTUAL TABLE user_search USING fts5(
+        full_name, email, content='user', content_rowid='search_rowid', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER user_search_insert AFTER INSERT ON "user" BEGIN
+        UPDATE "user" SET search_rowid = (SELECT coalesce(max(search_rowid), 0) + 1 FROM "user")
+            WHERE rowid = new.rowid AND search_rowid IS NULL;
+        INSERT INTO user_search(rowid, full_name, email)
+            SELECT search_rowid, full_name, email FROM "user" WHERE rowid = new.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER user_search_update AFTER UPDATE OF full_name, email ON "user" BEGIN
+        INSERT INTO user_search(user_search, rowid, full_name, email) VALUES ('delete', old.search_rowid, old.full_name, old.email);
+        INSERT INTO user_search(rowid, full_name, email) VALUES (new.search_rowid, new.full_name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER user_search_delete AFTER DELETE ON "user" BEGIN
+        INSERT INTO user_search(user_search, rowid, full_name, email) VALUES ('delete', old.search_rowid, old.full_name, old.email);
+    END
+    """,
+)
+# a damaged index, or one from before search_rowid keyed on the implicit rowid
+_SQLITE_DROP_OLD = (
+    "DROP TRIGGER IF EXISTS user_search_insert",
+    "DROP TRIGGER IF EXISTS user_search_update",
+    "DROP TRIGGER IF EXISTS user_search_delete",
+    "DROP TABLE IF EXISTS user_search",
+)
+user_search = table("user_search", column("rowid"))
+_REBUILD = "INSERT INTO user_search(user_search) VALUES ('rebuild')"
+_PG_DOCUMENT = "lower(coalesce(full_name, '') || ' ' || email)"
+
+_EXISTS = {
+    "sqlite": "SELECT 1 FROM sqlite_master WHERE name = 'user_search' AND sql LIKE '%content_rowid=''search_rowid''%'",
+    "postgresql": "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_user_search'",
+}
+# database URL -> whether the index exists, looked up once per database
+_indexed = {}
+
+logger = logging.getLogger(__name__)
+
+
+def install(engine):
+    """Create the search index and its triggers if missing, filling it from the existing users."""
+    try:
+        if engine.dialect.name == "sqlite":
+            with engine.begin() as conn:
+                if conn.exec_driver_sql(_EXISTS["sqlite"]).first():
+                    return
+                for statement in _SQLITE_DROP_OLD:
+                    conn.exec_driver_sql(statement)
+                if not conn.exec_driver_sql("SELECT 1 FROM pragma_table_info('user') WHERE name = 'search_rowid'").first():
+                    conn.exec_driver_sql(_SQLITE_COLUMN)
+                for statement in _SQLITE_DDL + (_REBUILD,):
+                    conn.exec_driver_sql(statement)
+        elif engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                conn.exec_driver_sql(
+                    f'CREATE INDEX IF NOT EXISTS ix_user_search ON "user" USING gin (({_PG_DOCUMENT}) gin_trgm_ops)'
+                )
+    except DBAPIError as e:
+        logger.warning("employee search index not created, searches will scan: %s", e)
+    finally:
+        _indexed.pop(str(engine.url), None)
+
+
+def rebuild(session: Session):
+    """Re-read every user into the SQLite index. The caller commits."""
+    if session.get_bind().dialect.name == "sqlite" and _has_index(session):
+        session.connection().exec_driver_sql(_REBUILD)
+
+
+def _has_index(session: Session):
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _indexed:
+        query = _EXISTS.get(bind.dialect.name)
+        _indexed[key] = bool(query and session.connection().exec_driver_sql(query).first())
+    return _indexed[key]
+
+
+def terms(q):
+    """The lower-cased words of a query, at most MAX_TERMS of them."""
+    return q.lower().split()[:MAX_TERMS]
+
+
+def _like(word, prefix="%"):
+    escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{prefix}{escaped}%"
+
+
+def _rank(name, email, q, nocase=False):
+    if nocase:
+        exact = or_(name.collate("NOCASE") == q, email.collate("NOCASE") == q)
+    else:
+        exact = or_(name == q, email == q)
+    tier = case(
+        (exact, 0),
+        (or_(name.like(_like(q, ""), escape="\\"), email.like(_like(q, ""), escape="\\")), 1),
+        (name.like(_like(q, "% "), escape="\\"), 2),
+        else_=3,
+    )
+    # in [0, 1), growing with the length of the name and email
+    closeness = literal(1.0) - literal(1.0) / (literal(1.0) + func.length(name) + func.length(email))
+    return tier + closeness
+
+
+def match(session: Session, stmt, q, where=(), cursor=None, limit=None):
+    """
+    Restrict `stmt`, a select of user columns, to the users matching `q` and
+    the `where` clauses, best match first, one page as with
+    pagination.keyset. Returns the statement and its rank expression.
+    """
+    user = models.User
+    words = terms(q)
+    dialect = session.get_bind().dialect.name
+    name, email = func.coalesce(user.full_name, ""), user.email
+    if dialect != "sqlite":
+        # SQLite's LIKE already ignores case, and lower() would double the cost of ranking
+        name, email = func.lower(name), func.lower(email)
+    conditions = [or_(name.like(_like(w), escape="\\"), email.like(_like(w), escape="\\")) for w in words]
+
+    if dialect == "sqlite" and any(len(w) >= MIN_TRIGRAM for w in words) and _has_index(session):
+        # the index finds the rows holding the long words; only the short
+        # ones are left to LIKE
+        expression = " AND ".join('"' + w.replace('"', '""') + '"' for w in words if len(w) >= MIN_TRIGRAM)
+        stmt = stmt.join(user_search, user_search.c.rowid == literal_column('"user".search_rowid'))
+        conditions = [literal_column("user_search").op("MATCH")(expression)] + [
+            c for w, c in zip(words, conditions) if len(w) < MIN_TRIGRAM
+        ]
+    elif dialect == "postgresql" and _has_index(session):
+        document = literal_column(_PG_DOCUMENT)
+        conditions = [document.like(_like(w), escape="\\") for w in words]
+
+    rank = _rank(name, email, " ".join(words), nocase=dialect == "sqlite")
+    stmt = stmt.where(*conditions, *where)
+    return pagination.keyset(stmt, rank, user.id, cursor, limit, descending=False), rank
+
+
+if __name__ == "__main__":
+    from app import database
+
+    database.init_db()
+    with Session(database.engine) as session:
+        rebuild(session)
+        session.commit()
+    print("Employee search index rebuilt")
@@ -0,0 +1,36 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database. Import this module before
+anything from `app` so DATABASE_URL points at the temporary file.
+Run them from the backend directory, e.g. `python -m benchmarks.bench_payroll_run`.
+"""
+import os
+import tempfile
+
+if "BENCH_DATABASE_URL" in os.environ:
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    _fd, _path = tempfile.mkstemp(prefix="payroll-bench-", suffix=".db")
+    os.close(_fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_path}"
+
+
+def make_employees(session, count, prefix="bench"):
+    """Insert `count` employees directly (no password hashing) and return their ids."""
+    from sqlalchemy import insert
+    from app import models
+
+    rows = [
+        dict(
+            id=models.gen_id(),
+            email=f"{prefix}{i}@example.com",
+            full_name=f"Employee {i}",
+            hashed_password="x",
+            role="employee",
+        )
+        for i in range(count)
+    ]
+    session.execute(insert(models.User), rows)
+    session.commit()
+    return [r["id"] for r in rows]
@@ -0,0 +1,157 @@
+"""
+Payday load test for admission control (app.admission): many clients
+download salary slip PDFs as fast as they can while one employee keeps
+calling /auth/me and listing their slips. Runs one uvicorn worker with
+ADMISSION_CONTROL=0 and then =1 and reports the cheap requests' latency
+(alone, then under the PDF load), how many failed or took over --timeout
+seconds, and the PDF throughput and 503s. Every download is a different
+slip, so each one is rendered. Uses the sync routes unless --async-db is
+given. ADMISSION_* variables set for the script reach the server. The
+clients run in this process; on a small machine they share the CPU with the
+server, which caps the load they can generate. Needs httpx.
+
+    python -m benchmarks.bench_admission --pdf-clients 64 --seconds 15
+    ADMISSION_PDF_QUEUE=16 python -m benchmarks.bench_admission
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks._common import make_employees
+
+import httpx
+from sqlmodel import Session, select
+from app import auth, database, models
+from benchmarks.bench_async_routes import free_port
+from benchmarks.bench_db_profiles import percentile, seed_slips
+
+CHEAP = ("/auth/me", "/employee/salary-slip")
+
+
+async def start_server(port, admission, async_db, pdf_clients):
+    env = dict(
+        os.environ,
+        ADMISSION_CONTROL="1" if admission else "0",
+        ASYNC_DB="1" if async_db else "0",
+        OUTBOX_WORKER="0",
+        DB_POOL_SIZE=str(pdf_clients + 10),
+        # a fresh cache per server, so every download renders
+        PDF_CACHE_DIR=tempfile.mkdtemp(prefix="payroll-bench-pdf-"),
+        PDF_CACHE_MEMORY_ITEMS="0",
+    )
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+        "--log-level", "warning", "--no-access-log", "--timeout-graceful-shutdown", "1",
+        env=env, stdout=asyncio.subprocess.DEVNULL,
+    )
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            try:
+                await client.get(f"http://127.0.0.1:{port}/")
+                return proc
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def probe(client, headers, seconds, timeout):
+    """Cheap requests one after another; returns (latencies in ms, failures)."""
+    latencies, failed = [], 0
+    deadline = time.perf_counter() + seconds
+    for path in itertools.cycle(CHEAP):
+        if time.perf_counter() >= deadline:
+            break
+        start = time.perf_counter()
+        try:
+            r = await client.get(path, headers=headers, timeout=timeout)
+            ok = r.status_code == 200
+        except httpx.TimeoutException:
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            failed += 1
+        await asyncio.sleep(0.02)
+    return latencies, failed
+
+
+async def run_mode(admission, args, slips, tokens, probe_token):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = await start_server(port, admission, args.async_db, args.pdf_clients)
+    try:
+        # a client per downloader: one shared pool of many connections costs
+        # this process more CPU than the requests themselves
+        async with httpx.AsyncClient(base_url=base) as client:
+            employee = {"Authorization": f"Bearer {probe_token}"}
+            await probe(client, employee, 1, args.timeout)
+            idle, _ = await probe(client, employee, args.seconds / 3, args.timeout)
+
+            todo = iter(slips)
+            rendered, busy = 0, 0
+            stop = time.perf_counter() + args.seconds
+
+            async def download():
+                nonlocal rendered, busy
+                async with httpx.AsyncClient(base_url=base, timeout=120) as downloader:
+                    while time.perf_counter() < stop:
+                        slip_id, employee_id = next(todo)
+                        r = await downloader.get(f"/employee/salary-slip/{slip_id}/pdf", headers={"Authorization": f"Bearer {tokens[employee_id]}"})
+                        if r.status_code == 503:
+                            busy += 1
+                            await asyncio.sleep(float(r.headers.get("retry-after", 1)))
+                        else:
+                            r.raise_for_status()
+                            rendered += 1
+
+            downloads = [asyncio.create_task(download()) for _ in range(args.pdf_clients)]
+            await asyncio.sleep(1)  # let the queue fill
+            loaded, failed = await probe(client, employee, args.seconds - 2, args.timeout)
+            await asyncio.gather(*downloads)
+    finally:
+        proc.terminate()
+        await proc.wait()
+    return dict(idle=idle, loaded=loaded, failed=failed, pdf_rate=rendered / args.seconds, busy=busy)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf-clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--timeout", type=float, default=2, help="cheap requests slower than this count as failed")
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--async-db", action="store_true")
+    args = parser.parse_args()
+
+    database.init_db()
+    with Session(database.engine) as session:
+        employee_ids = make_employees(session, args.employees)
+        seed_slips(session, employee_ids, 24)
+        slips = session.exec(select(models.SalarySlip.id, models.SalarySlip.employee_id)).all()
+    tokens = {eid: auth.create_access_token(data={"sub": eid, "role": "employee"}) for eid in employee_ids}
+    # the probing employee's slips are not downloaded
+    probe_id = employee_ids[0]
+    slips = [s for s in slips if s.employee_id != probe_id]
+    half = len(slips) // 2
+
+    results = {}
+    for admission, mode_slips in ((False, slips[:half]), (True, slips[half:])):
+        results[admission] = asyncio.run(run_mode(admission, args, mode_slips, tokens, tokens[probe_id]))
+
+    print(f"{args.pdf_clients} clients downloading PDFs for {args.seconds:g}s, "
+          f"{'async' if args.async_db else 'sync'} routes; /auth/me and slip list latency in ms\n")
+    print(f"{'admission':<10}{'idle p50':>9}{'p99':>8}{'loaded p50':>12}{'p95':>8}{'p99':>8}"
+          f"{'failed':>8}{'PDFs/s':>8}{'503s':>7}")
+    for admission, r in results.items():
+        print(f"{'on' if admission else 'off':<10}{percentile(r['idle'], 50):>9.1f}{percentile(r['idle'], 99):>8.1f}"
+              f"{percentile(r['loaded'], 50):>12.1f}{percentile(r['loaded'], 95):>8.1f}{percentile(r['loaded'], 99):>8.1f}"
+              f"{r['failed']:>8}{r['pdf_rate']:>8.1f}{r['busy']:>7}")
+
+
+if __name__ == "__main__":
+    main()
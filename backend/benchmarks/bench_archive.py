@@ -0,0 +1,175 @@
+"""
+Live-table size and query latency before and after moving closed fiscal
+years into archive files (app.archive). Seeds `--years` of monthly slips and
+expenses ending last month, measures, archives every closed year but the
+latest, compacts the database and measures again, then times reads that
+fall through to the archives.
+
+    python -m benchmarks.bench_archive --employees 1000 --years 6 --expenses-per-month 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import make_employees
+
+os.environ["ARCHIVE_DIR"] = tempfile.mkdtemp(prefix="payroll-bench-archive-")
+
+from sqlalchemy import insert
+from sqlmodel import Session, func, select
+from app import aggregates, archive, crud, database, fastjson, models, pagination, schemas
+
+SLIP_FIELDS = fastjson.fields_of(schemas.SalarySlipRead)
+EXPENSE_FIELDS = fastjson.fields_of(schemas.ExpenseRead)
+
+
+def months_back(count, today):
+    year, month = today.year, today.month
+    out = []
+    for _ in range(count):
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+        out.append((year, month))
+    return out[::-1]
+
+
+def seed(session, employee_ids, months, expenses_per_month):
+    rng = random.Random(7)
+    recent = months[-2:]
+    slips, expenses = [], []
+
+    def flush():
+        if slips:
+            session.execute(insert(models.SalarySlip), slips)
+        if expenses:
+            session.execute(insert(models.Expense), expenses)
+        slips.clear()
+        expenses.clear()
+
+    for year, month in months:
+        for employee_id in employee_ids:
+            slips.append(dict(
+                id=models.gen_id(), employee_id=employee_id, month=f"{year}-{month:02d}",
+                basic=50000.0, allowances=2500.0, deductions=1200.0, net_pay=51300.0,
+                created_at=datetime(year, month, 28, 9) + timedelta(seconds=rng.randrange(3600)),
+            ))
+            for _ in range(expenses_per_month):
+                expenses.append(dict(
+                    id=models.gen_id(), employee_id=employee_id,
+                    date=datetime(year, month, rng.randint(1, 28), rng.randrange(24)),
+                    category=rng.choice(("travel", "food", "internet")), amount=round(rng.uniform(50, 5000), 2),
+                    description="client visit",
+                    status="pending" if (year, month) in recent and rng.random() < 0.5 else rng.choice(("approved", "rejected")),
+                ))
+        if len(expenses) > 50000:
+            flush()
+    flush()
+    aggregates.rebuild(session)
+    session.commit()
+
+
+def db_path():
+    return database.engine.url.database
+
+
+def backup_seconds():
+    fd, target = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    start = time.perf_counter()
+    src, dst = sqlite3.connect(db_path()), sqlite3.connect(target)
+    src.backup(dst)
+    dst.close()
+    src.close()
+    elapsed = time.perf_counter() - start
+    os.remove(target)
+    return elapsed
+
+
+def median_ms(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def measure(session, employees, recent_month, rounds):
+    sample = [(e,) for e in random.Random(1).choices(employees, k=rounds)]
+    with database.engine.connect() as conn:
+        live = conn.exec_driver_sql("SELECT (SELECT count(*) FROM salaryslip), (SELECT count(*) FROM expense)").one()
+    results = {
+        "live slip rows": live[0],
+        "live expense rows": live[1],
+        "database MB": os.path.getsize(db_path()) / 1024 / 1024,
+        "backup s": backup_seconds(),
+        "slip page (12) ms": median_ms(lambda e: crud.get_salary_slips_for_user(session, e, 12, None, SLIP_FIELDS), sample),
+        "expense page (50) ms": median_ms(lambda e: crud.get_expenses_for_user(session, e, 50, None, EXPENSE_FIELDS), sample),
+        "pending page (100) ms": median_ms(lambda: crud.get_all_pending_expenses(session, 100, None, EXPENSE_FIELDS), [()] * 20),
+        "slips of a month ms": median_ms(lambda: crud.get_salary_slips_for_month(session, recent_month), [()] * 5),
+    }
+    session.expunge_all()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=6)
+    parser.add_argument("--expenses-per-month", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=200, help="employees sampled per page measurement")
+    args = parser.parse_args()
+
+    database.init_db()
+    months = months_back(args.years * 12, datetime.utcnow())
+    recent_month = f"{months[-1][0]}-{months[-1][1]:02d}"
+    with Session(database.engine) as session:
+        employees = make_employees(session, args.employees)
+        started = time.perf_counter()
+        seed(session, employees, months, args.expenses_per_month)
+        print(f"seeded {args.years} years for {args.employees} employees in {time.perf_counter() - started:.1f}s")
+        archive.vacuum(database.engine)
+        before = measure(session, employees, recent_month, args.rounds)
+
+        started = time.perf_counter()
+        for year in archive.closed_fiscal_years(session, keep=1):
+            archive.archive_fiscal_year(session, year)
+        archive.vacuum(database.engine)
+        elapsed = time.perf_counter() - started
+        after = measure(session, employees, recent_month, args.rounds)
+
+        print(f"\n{'':<24}{'before':>12}{'after':>12}")
+        for name in before:
+            print(f"{name:<24}{before[name]:>12.2f}{after[name]:>12.2f}" if isinstance(before[name], float)
+                  else f"{name:<24}{before[name]:>12}{after[name]:>12}")
+
+        files = archive.archives()
+        size = sum(os.path.getsize(a.path) for a in files) / 1024 / 1024
+        rows = sum(part.rows for a in files for part in a.tables.values())
+        print(f"\narchived {rows} rows into {len(files)} files, {size:.2f} MB, in {elapsed:.1f}s (vacuum included)")
+
+        # reads that fall through to the archives
+        rng = random.Random(2)
+        deep, ids = [], []
+        oldest = files[-1].tables[archive.SLIPS]
+        for employee_id in rng.choices(employees, k=args.rounds):
+            start, stop = oldest.employee_range(employee_id)
+            row = oldest.records(start + (stop - start) // 2, start + (stop - start) // 2 + 1, ["created_at", "id"])[0]
+            deep.append((employee_id, pagination.encode_cursor(row["created_at"], row["id"])))
+            ids.append((row["id"],))
+        print(f"{'archived slip page (12)':<24}{median_ms(lambda e, c: crud.get_salary_slips_for_user(session, e, 12, c, SLIP_FIELDS), deep):>10.2f} ms")
+        print(f"{'archived slip by id':<24}{median_ms(lambda i: crud.get_salary_slip(session, i), ids):>10.2f} ms")
+        old_month = f"{months[0][0]}-{months[0][1]:02d}"
+        print(f"{'archived month of slips':<24}{median_ms(lambda: crud.get_salary_slips_for_month(session, old_month), [()] * 5):>10.2f} ms")
+        total = session.exec(select(func.sum(models.PayrollMonthTotal.slip_count))).one()
+        print(f"\nsummary still counts {total} slips")
+
+
+if __name__ == "__main__":
+    main()
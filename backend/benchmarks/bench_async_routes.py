@@ -0,0 +1,113 @@
+"""
+Load test of the employee slip listing with the sync routes (threadpool) and
+the async routes (ASYNC_DB=1), each served by one uvicorn worker.
+
+Many concurrent clients page through their salary slips; the script reports
+requests per second and latency percentiles for both modes. Needs httpx.
+
+    python -m benchmarks.bench_async_routes --concurrency 200 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks._common import make_employees
+
+import httpx
+from sqlmodel import Session
+from app import auth, database
+from benchmarks.bench_db_profiles import percentile, seed_slips
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, async_db, concurrency):
+    env = dict(
+        os.environ,
+        ASYNC_DB="1" if async_db else "0",
+        OUTBOX_WORKER="0",
+        # the same pool for both modes, large enough for every client: a sync
+        # server with fewer connections than requests in flight can stall,
+        # because session cleanup waits for the threadpool the waiters occupy
+        DB_POOL_SIZE=str(concurrency),
+        DB_MAX_OVERFLOW="0",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def load(base_url, tokens, concurrency, seconds, page_size):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def client_loop(n):
+            nonlocal errors
+            headers = {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                r = await client.get("/employee/salary-slip", params={"limit": page_size}, headers=headers)
+                if r.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    database.init_db()
+    with Session(database.engine) as session:
+        employee_ids = make_employees(session, args.employees)
+        seed_slips(session, employee_ids, 24)
+    tokens = [auth.create_access_token(data={"sub": eid, "role": "employee"}) for eid in employee_ids]
+
+    print(f"{'mode':<6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for async_db in (False, True):
+        port = free_port()
+        proc = start_server(port, async_db, args.concurrency)
+        try:
+            # one short warm-up pass so both modes start with loaded caches
+            asyncio.run(load(f"http://127.0.0.1:{port}", tokens, 10, 1, args.page_size))
+            rps, latencies, errors = asyncio.run(
+                load(f"http://127.0.0.1:{port}", tokens, args.concurrency, args.seconds, args.page_size)
+            )
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{'async' if async_db else 'sync':<6} {rps:>8.0f} {percentile(latencies, 50):>7.1f}ms "
+              f"{percentile(latencies, 95):>7.1f}ms {percentile(latencies, 99):>7.1f}ms {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Write latency added by the audit trail (app.audit). The same requests run
+three ways: with the audit writer stopped, with entries queued for the
+group-commit writer (the default), and with each entry inserted and committed
+inline as it is recorded, which is what a synchronous audit insert would
+cost. Covers single slip edits and expense decisions, a bulk approval and a
+payroll run. The queue is drained between phases, so each phase starts with
+an idle writer; the last column is the total time spent waiting for it.
+
+    python -m benchmarks.bench_audit --requests 300 --bulk 5000
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import make_employees
+
+os.environ["ASYNC_DB"] = "0"
+os.environ.setdefault("OUTBOX_WORKER", "0")
+os.environ["AUDIT_LOG"] = "1"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+from app import audit, database, models
+from app.main import app
+
+MODES = ("off", "queued", "inline")
+
+
+class InlineWriter:
+    """Stands in for the writer thread: every entry is inserted and committed as it is recorded."""
+
+    def __init__(self, engine):
+        self.queue = self
+        self._writer = audit.AuditWriter(engine)
+
+    def put_nowait(self, entry):
+        self._writer.write([entry])
+
+    def flush(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def set_mode(mode):
+    audit.stop_writer()
+    if mode == "queued":
+        audit.start_writer(database.engine)
+    elif mode == "inline":
+        audit._writer = InlineWriter(database.engine)
+
+
+def seed(session, employee_ids, mode, requests, bulk):
+    now = datetime.utcnow()
+    slips = [
+        dict(id=models.gen_id(), employee_id=employee_ids[i % len(employee_ids)], month="2025-01",
+             basic=1000.0, allowances=0.0, deductions=0.0, net_pay=1000.0, created_at=now)
+        for i in range(requests)
+    ]
+    expenses = [
+        dict(id=models.gen_id(), employee_id=employee_ids[i % len(employee_ids)], date=now - timedelta(seconds=i),
+             category=f"bulk-{mode}" if i >= requests else "single", amount=10.0, description="x", status="pending")
+        for i in range(requests + bulk)
+    ]
+    session.execute(insert(models.SalarySlip), slips)
+    session.execute(insert(models.Expense), expenses)
+    session.commit()
+    return [s["id"] for s in slips], [e["id"] for e in expenses[:requests]]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300, help="single edits and decisions per mode")
+    parser.add_argument("--bulk", type=int, default=5000, help="expenses in the bulk approval")
+    parser.add_argument("--run-employees", type=int, default=2000, help="employees in the payroll run")
+    args = parser.parse_args()
+
+    results = {}
+    with TestClient(app) as client:
+        token = client.post("/auth/login", data={"username": "hire-me@anshumat.org", "password": "HireMe@2025!"}).json()["access_token"]
+        admin = {"Authorization": f"Bearer {token}"}
+        with Session(database.engine) as session:
+            employee_ids = make_employees(session, args.run_employees)
+            data = {mode: seed(session, employee_ids, mode, args.requests, args.bulk) for mode in MODES}
+
+        for n, mode in enumerate(MODES):
+            set_mode(mode)
+            slip_ids, expense_ids = data[mode]
+            drain = 0.0
+            edits = [
+                timed(lambda: client.put(f"/admin/salary-slip/{slip_id}", headers=admin, json=dict(
+                    employee_id=employee_ids[i % len(employee_ids)], month="2025-01", basic=1500, notes="corrected")))
+                for i, slip_id in enumerate(slip_ids)
+            ]
+            drain += timed(audit.flush)
+            decisions = [
+                timed(lambda: client.post(f"/admin/expenses/{expense_id}/action", params={"action": "approve"}, headers=admin))
+                for expense_id in expense_ids
+            ]
+            drain += timed(audit.flush)
+            bulk = timed(lambda: client.post("/admin/expenses/bulk-action", headers=admin, json={"action": "approve", "category": f"bulk-{mode}"}))
+            drain += timed(audit.flush)
+            run = timed(lambda: client.post("/admin/payroll-runs", headers=admin, json=dict(
+                month=f"2030-{n + 1:02d}", template={"basic": 1000}, employee_ids=employee_ids)))
+            drain += timed(audit.flush)
+            results[mode] = dict(
+                edit=statistics.median(edits), edit_p95=statistics.quantiles(edits, n=20)[-1],
+                decision=statistics.median(decisions), decision_p95=statistics.quantiles(decisions, n=20)[-1],
+                bulk=bulk, run=run, drain=drain,
+            )
+        set_mode("off")
+        with Session(database.engine) as session:
+            entries = session.exec(select(func.count()).select_from(models.AuditLog)).one()
+
+    print(f"{args.requests} slip edits and expense decisions, bulk approval of {args.bulk}, payroll run of {args.run_employees}\n")
+    print(f"{'audit':<8}{'edit ms':>9}{'p95':>8}{'decide ms':>11}{'p95':>8}{'bulk ms':>10}{'run ms':>10}{'drain ms':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['edit']:>9.2f}{r['edit_p95']:>8.2f}{r['decision']:>11.2f}{r['decision_p95']:>8.2f}"
+              f"{r['bulk']:>10.1f}{r['run']:>10.1f}{r['drain']:>10.1f}")
+    print(f"\n{entries} audit entries written")
+
+
+if __name__ == "__main__":
+    main()
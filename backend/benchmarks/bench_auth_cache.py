@@ -0,0 +1,70 @@
+"""
+Per-request latency and SQL query count of the /employee/* routes and
+/auth/me with the token/user cache in auth disabled and enabled.
+
+    python -m benchmarks.bench_auth_cache --requests 500
+"""
+import argparse
+import os
+import time
+
+from benchmarks import _common  # noqa: F401  (points DATABASE_URL at a temp db)
+
+os.environ.setdefault("OUTBOX_WORKER", "0")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import auth, database
+from app.main import app
+
+ROUTES = ("/auth/me", "/employee/salary-slip", "/employee/expense")
+
+
+def run(client, headers, requests, queries):
+    results = {}
+    for route in ROUTES:
+        client.get(route, headers=headers)
+        queries[0] = 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get(route, headers=headers)
+        elapsed = time.perf_counter() - start
+        results[route] = (elapsed / requests * 1000, queries[0] / requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    queries = [0]
+
+    def count(*_):
+        queries[0] += 1
+
+    with TestClient(app) as client:
+        client.post("/auth/signup", json={"email": "bench@example.com", "password": "bench", "full_name": "Bench"})
+        token = client.post("/auth/login", data={"username": "bench@example.com", "password": "bench"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        # with ASYNC_DB (the default) these routes query through the async engine
+        engines = [database.engine] + ([database.get_async_engine().sync_engine] if database.ASYNC_DB else [])
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", count)
+
+        ttl = auth.token_cache.ttl
+        auth.token_cache.ttl = auth.user_cache.ttl = 0
+        auth.token_cache.clear()
+        auth.user_cache.clear()
+        uncached = run(client, headers, args.requests, queries)
+        auth.token_cache.ttl = auth.user_cache.ttl = ttl
+        cached = run(client, headers, args.requests, queries)
+
+    print(f"{'route':<24}{'uncached':>22}{'cached':>22}")
+    for route in ROUTES:
+        (u_ms, u_q), (c_ms, c_q) = uncached[route], cached[route]
+        print(f"{route:<24}{u_ms:9.2f} ms {u_q:4.1f} queries{c_ms:9.2f} ms {c_q:4.1f} queries")
+
+
+if __name__ == "__main__":
+    main()
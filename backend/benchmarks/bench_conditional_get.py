@@ -0,0 +1,116 @@
+"""
+A dashboard polling the employee slip and expense lists and the admin
+pending-expense queue, with and without conditional GETs (app.conditional).
+Each round fetches the three lists once; every `--change-every` rounds the
+employee submits an expense, which changes two of them. The plain client
+downloads every list every time; the conditional client sends back the last
+ETag and mostly gets 304 Not Modified. Reports database queries, bytes
+received (as sent on the wire, gzip included) and latency per poll.
+
+    python -m benchmarks.bench_conditional_get --rounds 300 --change-every 20
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import make_employees
+
+os.environ["ASYNC_DB"] = "0"
+os.environ.setdefault("OUTBOX_WORKER", "0")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from sqlmodel import Session
+from app import aggregates, auth, database, models
+from app.main import app
+
+LISTS = ("/employee/salary-slip", "/employee/expense", "/admin/expenses/pending")
+
+
+def seed(session, employee_id, others, slips, expenses, pending):
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1)
+    slip_rows = [
+        dict(id=models.gen_id(), employee_id=employee_id, month=f"{2020 + i // 12}-{i % 12 + 1:02d}",
+             basic=50000.0, allowances=2500.0, deductions=1200.0, net_pay=51300.0, created_at=start + timedelta(days=30 * i))
+        for i in range(slips)
+    ]
+    expense_rows = [
+        dict(id=models.gen_id(), employee_id=employee_id if i < expenses else rng.choice(others),
+             date=start + timedelta(hours=i), category=rng.choice(("travel", "food", "internet")),
+             amount=round(rng.uniform(50, 5000), 2), description="client visit",
+             status="pending" if i >= expenses else rng.choice(("approved", "rejected", "pending")))
+        for i in range(expenses + pending)
+    ]
+    session.execute(insert(models.SalarySlip), slip_rows)
+    session.execute(insert(models.Expense), expense_rows)
+    aggregates.rebuild(session)
+    session.commit()
+
+
+def poll(client, conditional, rounds, change_every, employee_headers, admin_headers, counter):
+    etags = {}
+    queries, wire, latencies, not_modified = 0, 0, [], 0
+    for i in range(rounds):
+        if i and i % change_every == 0:
+            client.post("/employee/expense", json={"category": "food", "amount": 42.0, "description": "lunch"}, headers=employee_headers)
+        for path in LISTS:
+            headers = dict(admin_headers if path.startswith("/admin") else employee_headers)
+            if conditional and path in etags:
+                headers["If-None-Match"] = etags[path]
+            counter[0] = 0
+            start = time.perf_counter()
+            r = client.get(path, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            queries += counter[0]
+            wire += r.num_bytes_downloaded + sum(len(k) + len(v) + 4 for k, v in r.headers.items())
+            if r.status_code == 304:
+                not_modified += 1
+            else:
+                r.raise_for_status()
+                etags[path] = r.headers["etag"]
+    polls = rounds * len(LISTS)
+    return dict(
+        queries=queries / polls,
+        kb=wire / polls / 1024,
+        ms=statistics.median(latencies),
+        p95=statistics.quantiles(latencies, n=20)[-1],
+        hits=not_modified / polls * 100,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--change-every", type=int, default=20, help="rounds between expense submissions")
+    parser.add_argument("--slips", type=int, default=36)
+    parser.add_argument("--expenses", type=int, default=300, help="the polling employee's expense history")
+    parser.add_argument("--pending", type=int, default=2000, help="other employees' pending expenses")
+    args = parser.parse_args()
+
+    counter = [0]
+    with TestClient(app) as client:
+        event.listen(database.engine, "before_cursor_execute", lambda *a: counter.__setitem__(0, counter[0] + 1))
+        with Session(database.engine) as session:
+            employee_id, *others = make_employees(session, 50)
+            seed(session, employee_id, others, args.slips, args.expenses, args.pending)
+        employee = {"Authorization": "Bearer " + auth.create_access_token(data={"sub": employee_id, "role": "employee"})}
+        token = client.post("/auth/login", data={"username": "hire-me@anshumat.org", "password": "HireMe@2025!"}).json()["access_token"]
+        admin = {"Authorization": f"Bearer {token}"}
+
+        results = {
+            "plain": poll(client, False, args.rounds, args.change_every, employee, admin, counter),
+            "conditional": poll(client, True, args.rounds, args.change_every, employee, admin, counter),
+        }
+
+    print(f"{args.rounds} rounds of {len(LISTS)} lists, a change every {args.change_every} rounds\n")
+    print(f"{'client':<14}{'304 %':>8}{'queries/poll':>14}{'KB/poll':>10}{'median ms':>11}{'p95 ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['hits']:>8.1f}{r['queries']:>14.2f}{r['kb']:>10.2f}{r['ms']:>11.2f}{r['p95']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Mixed read/write concurrency on SQLite with the "default" engine profile
+(rollback journal) and the "sqlite" profile (WAL and tuned pragmas).
+
+Reader threads page through slip histories while writer threads insert
+payroll-run sized batches, each profile against its own fresh database file.
+
+    python -m benchmarks.bench_db_profiles --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks._common import make_employees
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel
+from app import crud, database, models
+
+
+def seed_slips(session, employee_ids, per_employee):
+    now = datetime.utcnow()
+    rows = [
+        dict(
+            id=models.gen_id(), employee_id=eid, month=f"2024-{i % 12 + 1:02d}",
+            basic=1000.0, allowances=0.0, deductions=0.0, net_pay=1000.0, created_at=now,
+        )
+        for eid in employee_ids
+        for i in range(per_employee)
+    ]
+    session.execute(insert(models.SalarySlip), rows)
+    session.commit()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile, args):
+    fd, path = tempfile.mkstemp(prefix=f"payroll-bench-{profile}-", suffix=".db")
+    os.close(fd)
+    engine = database.make_engine(f"sqlite:///{path}", profile)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        employee_ids = make_employees(session, args.employees)
+        seed_slips(session, employee_ids, 24)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    read_ms, write_ms = [], []
+    errors = {"read": 0, "write": 0}
+
+    def reader(n):
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    crud.get_salary_slips_for_user(session, employee_ids[i % len(employee_ids)], limit=50)
+            except OperationalError:
+                with lock:
+                    errors["read"] += 1
+                continue
+            with lock:
+                read_ms.append((time.perf_counter() - start) * 1000)
+            i += args.readers
+
+    def writer(n):
+        while not stop.is_set():
+            now = datetime.utcnow()
+            rows = [
+                dict(
+                    id=models.gen_id(), employee_id=eid, month="2025-01",
+                    basic=1000.0, allowances=0.0, deductions=0.0, net_pay=1000.0, created_at=now,
+                )
+                for eid in employee_ids[: args.batch]
+            ]
+            start = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    session.execute(insert(models.SalarySlip), rows)
+                    session.commit()
+            except OperationalError:
+                with lock:
+                    errors["write"] += 1
+                continue
+            with lock:
+                write_ms.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    with engine.connect() as conn:
+        journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    return {
+        "profile": profile,
+        "journal": journal,
+        "reads/s": len(read_ms) / args.seconds,
+        "writes/s": len(write_ms) / args.seconds,
+        "read p50": percentile(read_ms, 50),
+        "read p99": percentile(read_ms, 99),
+        "write p50": percentile(write_ms, 50),
+        "errors": errors["read"] + errors["write"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500, help="slips inserted per write transaction")
+    args = parser.parse_args()
+
+    print(f"{'profile':<8} {'journal':<8} {'reads/s':>9} {'writes/s':>9} "
+          f"{'read p50':>9} {'read p99':>9} {'write p50':>10} {'errors':>7}")
+    for profile in ("default", "sqlite"):
+        r = run_profile(profile, args)
+        print(f"{r['profile']:<8} {r['journal']:<8} {r['reads/s']:>9.0f} {r['writes/s']:>9.1f} "
+              f"{r['read p50']:>7.1f}ms {r['read p99']:>7.1f}ms {r['write p50']:>8.1f}ms {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Employee search (app.search) over many users: latency of a first page of
+results for several kinds of query, served from the trigram index and by
+scanning the user table with LIKE, as a database without the index would.
+Also reports what keeping the index in step costs when users are inserted.
+
+    python -m benchmarks.bench_employee_search --users 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks import _common  # noqa: F401  (points DATABASE_URL at a temp db)
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+from app import crud, database, models, search
+
+FIRST = (
+    "aarav anand arjun deepa divya farhan gaurav ishita kabir kavya lakshmi manish meera naveen neha "
+    "nikhil pooja priya rahul rajesh ravi rohan sakshi sanjay shreya suresh tanvi varun vikram zoya "
+    "alice bob carlos diana elena felix grace hiro ingrid jamal kenji lucia mateo nora omar paula"
+).split()
+LAST = (
+    "sharma verma iyer kumar reddy nair gupta mehta joshi rao das bose menon pillai chopra kapoor "
+    "malhotra bhat sinha mishra pandey saxena agarwal chatterjee banerjee mukherjee kulkarni desai "
+    "patel shah smith garcia müller rossi tanaka kowalski novak silva cohen haddad olsen dubois"
+).split()
+DOMAINS = ("acme.com", "acme.co.in", "contractors.acme.com")
+
+QUERIES = (
+    ("exact email", None),
+    ("full name", "priya sharma"),
+    ("name prefix", "kul"),
+    ("substring", "arma"),
+    ("two words", "ravi men"),
+    ("no match", "zzqx"),
+    ("short (scans)", "bo"),
+    ("every user", "acme"),
+)
+
+
+def user_rows(count, rng):
+    rows = []
+    for i in range(count):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        rows.append(dict(
+            id=models.gen_id(), email=f"{first}.{last}{i}@{rng.choice(DOMAINS)}",
+            full_name=f"{first.title()} {last.title()}", hashed_password="x",
+            role="admin" if i % 50 == 0 else "employee",
+        ))
+    return rows
+
+
+def insert_seconds(engine, rows):
+    start = time.perf_counter()
+    with Session(engine) as session:
+        for offset in range(0, len(rows), 10000):
+            session.execute(insert(models.User), rows[offset:offset + 10000])
+        session.commit()
+    return time.perf_counter() - start
+
+
+def latency(session, q, page_size, repeat):
+    times, rows = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = crud.get_users(session, page_size, None, ("id", "email", "full_name"), q=q)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), max(times), rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=21)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    rows = user_rows(args.users, rng)
+    queries = [(name, q or rows[args.users // 2]["email"]) for name, q in QUERIES]
+
+    database.init_db()
+    indexed_insert = insert_seconds(database.engine, rows)
+    # the same rows into a database without the index or its triggers
+    fd, path = tempfile.mkstemp(prefix="payroll-bench-search-", suffix=".db")
+    os.close(fd)
+    plain = database.make_engine(f"sqlite:///{path}", "sqlite")
+    SQLModel.metadata.create_all(plain)
+    plain_insert = insert_seconds(plain, rows)
+
+    results = []
+    with Session(database.engine) as session:
+        url = str(database.engine.url)
+        for name, q in queries:
+            search._indexed[url] = True
+            indexed = latency(session, q, args.page_size, args.repeat)
+            search._indexed[url] = False
+            scan = latency(session, q, args.page_size, max(args.repeat // 4, 3))
+            results.append((name, q, indexed, scan))
+        search._indexed.pop(url)
+        matches = {q: len(crud.get_users(session, None, None, ("id",), q=q)) for _, q in queries}
+
+    print(f"{args.users} users, first page of {args.page_size}, median (max) ms\n")
+    print(f"{'query':<15}{'text':<30}{'matches':>9}{'index':>16}{'scan':>16}")
+    for name, q, (ms, worst, found), (scan_ms, scan_worst, _) in results:
+        print(f"{name:<15}{q[:29]:<30}{matches[q]:>9}{f'{ms:.2f} ({worst:.2f})':>16}{f'{scan_ms:.1f} ({scan_worst:.1f})':>16}")
+        assert found or name == "no match", name
+    print(f"\ninserting {args.users} users: {indexed_insert:.2f}s with the index, {plain_insert:.2f}s without")
+
+
+if __name__ == "__main__":
+    main()
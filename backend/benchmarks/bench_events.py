@@ -0,0 +1,143 @@
+"""
+Cost of keeping many admin dashboards up to date: N idle server-sent event
+streams against N clients polling /admin/expenses/pending, served by one
+uvicorn worker. Reports the server's CPU use and memory over the same
+window, and how long one change takes to reach every open stream.
+The clients all run in this process; on a small machine they compete with
+the server for CPU, so the delivery time is an upper bound. Reads the
+server's CPU time from /proc, so Linux only. Needs httpx.
+
+    python -m benchmarks.bench_events --clients 1000 --seconds 20 --poll-interval 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+from benchmarks.bench_async_routes import free_port
+
+TICKS = os.sysconf("SC_CLK_TCK")
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / TICKS
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * PAGE / 1024 / 1024
+
+
+async def start_server(port, clients):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tempfile.mkdtemp(prefix='payroll-bench-events-')}/bench.db",
+        OUTBOX_WORKER="0",
+        DB_POOL_SIZE=str(min(clients, 200)),
+        EVENTS_STREAM_SECONDS="3600",
+    )
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+        "--log-level", "warning", "--no-access-log", "--timeout-graceful-shutdown", "1",
+        env=env, stdout=asyncio.subprocess.DEVNULL,
+    )
+    async with httpx.AsyncClient() as client:
+        for _ in range(300):
+            try:
+                await client.get(f"http://127.0.0.1:{port}/")
+                return proc
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def measure(pid, seconds):
+    cpu, start = cpu_seconds(pid), time.perf_counter()
+    await asyncio.sleep(seconds)
+    return (cpu_seconds(pid) - cpu) / (time.perf_counter() - start) * 100, rss_mb(pid)
+
+
+async def run(args):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = await start_server(port, args.clients)
+    limits = httpx.Limits(max_connections=args.clients + 10, max_keepalive_connections=args.clients + 10)
+    try:
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+            r = await client.post("/auth/login", data={"username": "hire-me@anshumat.org", "password": "HireMe@2025!"})
+            admin = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            await client.post("/auth/signup", json={"email": "bench@example.com", "password": "pw"})
+            r = await client.post("/auth/login", data={"username": "bench@example.com", "password": "pw"})
+            employee = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+            idle_cpu, base_rss = await measure(proc.pid, 2)
+            print(f"{'mode':<28} {'server CPU %':>12} {'RSS MB':>8}")
+            print(f"{'no clients':<28} {idle_cpu:>12.1f} {base_rss:>8.1f}")
+
+            # N open streams, waiting for one event each
+            connected, received = asyncio.Event(), []
+            ready = 0
+
+            async def listen():
+                nonlocal ready
+                async with client.stream("GET", "/admin/events", headers=admin) as resp:
+                    lines = resp.aiter_lines()
+                    await lines.__anext__()  # the retry: line
+                    ready += 1
+                    if ready == args.clients:
+                        connected.set()
+                    async for line in lines:
+                        if line.startswith("data:"):
+                            received.append(time.perf_counter())
+                            return
+
+            listeners = [asyncio.create_task(listen()) for _ in range(args.clients)]
+            await asyncio.wait_for(connected.wait(), 120)
+            sse_cpu, sse_rss = await measure(proc.pid, args.seconds)
+            print(f"{f'{args.clients} idle SSE streams':<28} {sse_cpu:>12.1f} {sse_rss:>8.1f}")
+
+            sent = time.perf_counter()
+            await client.post("/employee/expense", json={"category": "travel", "amount": 10}, headers=employee)
+            await asyncio.wait_for(asyncio.gather(*listeners), 120)
+            delays = sorted((t - sent) * 1000 for t in received)
+
+            # the same dashboards refreshing on a timer instead
+            stop = time.perf_counter() + args.seconds + 1
+
+            async def poll(offset):
+                await asyncio.sleep(offset)
+                while time.perf_counter() < stop:
+                    await client.get("/admin/expenses/pending", headers=admin)
+                    await asyncio.sleep(args.poll_interval)
+
+            pollers = asyncio.gather(*(poll(i * args.poll_interval / args.clients) for i in range(args.clients)))
+            await asyncio.sleep(args.poll_interval)
+            poll_cpu, poll_rss = await measure(proc.pid, args.seconds - args.poll_interval)
+            await pollers
+            print(f"{f'{args.clients} polling every {args.poll_interval:g}s':<28} {poll_cpu:>12.1f} {poll_rss:>8.1f}")
+            print(f"\none change reached {len(delays)} streams: median {statistics.median(delays):.1f} ms, "
+                  f"last {delays[-1]:.1f} ms")
+    finally:
+        proc.terminate()
+        await proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--poll-interval", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
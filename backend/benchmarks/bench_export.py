@@ -0,0 +1,99 @@
+"""
+Peak memory and throughput of the streaming exports compared with building
+the same document from the list endpoint approach (ORM objects validated
+into pydantic models).
+
+The export is run for one month and for the whole history; the streaming
+peak should not grow with the row count.
+
+    python -m benchmarks.bench_export --rows 240000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks._common import make_employees
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from app import database, exports, models, schemas
+
+
+def seed(session, employee_ids, rows, months):
+    now = datetime.utcnow()
+    batch = []
+    for i in range(rows):
+        batch.append(dict(
+            id=models.gen_id(), employee_id=employee_ids[i % len(employee_ids)],
+            month=f"2024-{i % months + 1:02d}", basic=1000.0 + i % 7, allowances=100.0,
+            deductions=50.0, net_pay=1050.0 + i % 7, notes="regular", created_at=now,
+        ))
+        if len(batch) == 50000:
+            session.execute(insert(models.SalarySlip), batch)
+            batch = []
+    if batch:
+        session.execute(insert(models.SalarySlip), batch)
+    session.commit()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size, rows = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, size, rows
+
+
+def streamed(fmt, **filters):
+    def run():
+        size = lines = 0
+        for chunk in exports.stream_rows(exports.salary_slips_query(**filters), exports.SLIP_COLUMNS, fmt):
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+        return size, lines - (fmt == "csv")
+    return run
+
+
+def list_endpoint(**filters):
+    def run():
+        with Session(database.engine) as session:
+            stmt = select(models.SalarySlip)
+            if filters.get("month"):
+                stmt = stmt.where(models.SalarySlip.month == filters["month"])
+            slips = [
+                schemas.SalarySlipRead.model_validate(s, from_attributes=True).model_dump(mode="json")
+                for s in session.exec(stmt).all()
+            ]
+        body = json.dumps(slips).encode()
+        return len(body), len(slips)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=240000)
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    database.init_db()
+    with Session(database.engine) as session:
+        employee_ids = make_employees(session, 1000)
+        seed(session, employee_ids, args.rows, args.months)
+
+    print(f"{'method':<22} {'scope':<10} {'rows':>9} {'MB out':>8} {'peak MB':>8} {'rows/s':>10}")
+    for scope, filters in (("one month", {"month": "2024-01"}), ("all", {})):
+        for name, fn in (
+            ("stream csv", streamed("csv", **filters)),
+            ("stream ndjson", streamed("ndjson", **filters)),
+            ("list + pydantic json", list_endpoint(**filters)),
+        ):
+            elapsed, peak, size, rows = measure(fn)
+            print(f"{name:<22} {scope:<10} {rows:>9} {size / 1024 / 1024:>8.1f} {peak:>8.1f} {rows / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
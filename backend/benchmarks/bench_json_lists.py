@@ -0,0 +1,143 @@
+"""
+Latency of the large list endpoints on the fast JSON path (column tuples
+encoded by app.fastjson, gzip above GZIP_MIN_BYTES) compared with the
+previous routes, which returned ORM objects through response_model
+validation and the standard JSON encoder. Both run in-process on sync
+sessions, so the difference is the serialization. Every response is checked
+to decode to the same JSON as before; the last column says whether the bytes
+match too (the pending list used to emit keys in ORM load order rather than
+field order). Needs httpx.
+
+    python -m benchmarks.bench_json_lists --rows 1000 --iterations 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from benchmarks._common import make_employees
+
+# compare the serialization only: both apps use the sync session
+os.environ["ASYNC_DB"] = "0"
+os.environ.setdefault("OUTBOX_WORKER", "0")
+
+import httpx
+from fastapi import Depends, FastAPI, Response
+from sqlalchemy import insert
+from sqlmodel import Session
+from app import auth, crud, database, models, pagination, schemas
+from app.main import app
+
+
+def reference_app():
+    """The list routes as they were before app.fastjson."""
+    ref = FastAPI()
+
+    @ref.get("/employee/salary-slip", response_model=List[schemas.SalarySlipRead])
+    def view_salary_slips(response: Response, page: pagination.PageParams = Depends(), session: Session = Depends(database.get_session), user=Depends(auth.get_current_user)):
+        slips = crud.get_salary_slips_for_user(session, user.id, page.limit, page.cursor)
+        pagination.set_next_cursor(response, slips, page, "created_at")
+        return slips
+
+    @ref.get("/employee/expense", response_model=List[schemas.ExpenseRead])
+    def view_expenses(response: Response, page: pagination.PageParams = Depends(), session: Session = Depends(database.get_session), user=Depends(auth.get_current_user)):
+        expenses = crud.get_expenses_for_user(session, user.id, page.limit, page.cursor)
+        pagination.set_next_cursor(response, expenses, page, "date")
+        return expenses
+
+    @ref.get("/admin/expenses/pending")
+    def list_pending_expenses(response: Response, page: pagination.PageParams = Depends(), session: Session = Depends(database.get_session), admin=Depends(auth.require_admin)):
+        expenses = crud.get_all_pending_expenses(session, page.limit, page.cursor)
+        pagination.set_next_cursor(response, expenses, page, "date")
+        return expenses
+
+    @ref.get("/admin/employees", response_model=List[schemas.EmployeeRead])
+    def list_employees(response: Response, page: pagination.PageParams = Depends(), session: Session = Depends(database.get_session), admin=Depends(auth.require_admin)):
+        employees = crud.get_users(session, page.limit, page.cursor)
+        pagination.set_next_cursor(response, employees, page, "created_at")
+        return employees
+
+    return ref
+
+
+def seed(rows):
+    """One employee with `rows` slips and expenses, `rows` other employees, and an admin."""
+    with Session(database.engine) as session:
+        employee_ids = make_employees(session, rows + 1)
+        employee_id = employee_ids[0]
+        admin = models.User(email="bench-admin@example.com", hashed_password="x", role="admin")
+        session.add(admin)
+        start = datetime(2015, 1, 1, 9, 30, 12, 345600)
+        session.execute(insert(models.SalarySlip), [
+            dict(id=models.gen_id(), employee_id=employee_id, month=f"{2000 + i // 12}-{i % 12 + 1:02d}",
+                 basic=50000.0 + i, allowances=2500.5, deductions=1200.25, net_pay=51300.25 + i,
+                 notes=None if i % 3 else "arrears included", created_at=start + timedelta(days=30 * i))
+            for i in range(rows)
+        ])
+        session.execute(insert(models.Expense), [
+            dict(id=models.gen_id(), employee_id=employee_id, date=start + timedelta(hours=7 * i),
+                 category=("travel", "food", "internet")[i % 3], amount=round(100 + i * 1.37, 2),
+                 description=f"trip #{i} — café", status="pending" if i % 2 else "approved", admin_comment=None)
+            for i in range(rows)
+        ])
+        session.commit()
+        return employee_id, admin.id
+
+
+async def timed_get(client, path, params, headers, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        r = await client.get(path, params=params, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+    return statistics.median(samples), r
+
+
+async def run(args, employee_token, admin_token):
+    endpoints = (
+        ("/employee/salary-slip", employee_token),
+        ("/employee/expense", employee_token),
+        ("/admin/expenses/pending", admin_token),
+        ("/admin/employees", admin_token),
+    )
+    params = {"limit": args.rows}
+    plain = {"Accept-Encoding": "identity"}
+    print(f"{'endpoint':<26} {'items':>6} {'before ms':>10} {'fast ms':>8} {'+gzip ms':>9} "
+          f"{'speedup':>8} {'KB':>7} {'gzip KB':>8} {'bytes':>6}")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=reference_app()), base_url="http://ref") as ref, \
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fast") as fast:
+        for path, token in endpoints:
+            auth_header = {"Authorization": f"Bearer {token}"}
+            before_ms, before = await timed_get(ref, path, params, {**auth_header, **plain}, args.iterations)
+            fast_ms, after = await timed_get(fast, path, params, {**auth_header, **plain}, args.iterations)
+            gzip_ms, zipped = await timed_get(fast, path, params, {**auth_header, "Accept-Encoding": "gzip"}, args.iterations)
+            if after.json() != before.json() or zipped.content != after.content:
+                raise SystemExit(f"{path}: response differs from the previous routes")
+            if after.headers.get(pagination.NEXT_CURSOR_HEADER) != before.headers.get(pagination.NEXT_CURSOR_HEADER):
+                raise SystemExit(f"{path}: next-page cursor differs from the previous routes")
+            wire = int(zipped.headers.get("content-length", len(zipped.content)))
+            print(f"{path:<26} {len(after.json()):>6} {before_ms:>10.2f} {fast_ms:>8.2f} {gzip_ms:>9.2f} "
+                  f"{before_ms / fast_ms:>7.1f}x {len(after.content) / 1024:>7.1f} {wire / 1024:>8.1f} "
+                  f"{'yes' if after.content == before.content else 'no':>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000, help="items per list (at most the page size limit)")
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    args.rows = min(args.rows, pagination.MAX_PAGE_SIZE)
+
+    database.init_db()
+    employee_id, admin_id = seed(args.rows)
+    employee_token = auth.create_access_token(data={"sub": employee_id, "role": "employee"})
+    admin_token = auth.create_access_token(data={"sub": admin_id, "role": "admin"})
+    asyncio.run(run(args, employee_token, admin_token))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Cost of enqueueing notifications in the outbox and throughput of draining
+them over one pooled SMTP connection to a local stand-in server, compared
+with opening a connection per message.
+
+    python -m benchmarks.bench_outbox --messages 2000
+"""
+import argparse
+import time
+
+from benchmarks import _common  # noqa: F401  (points DATABASE_URL at a temp db)
+from benchmarks import smtp_sink
+
+from sqlmodel import Session
+from app import database, notifications
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    n = args.messages
+
+    database.init_db()
+    sink = smtp_sink.start()
+    port = sink.server_address[1]
+
+    def transport():
+        return notifications.SmtpTransport(host="127.0.0.1", port=port, user="", starttls=False)
+
+    messages = [(f"bench{i}@example.com", "New Salary Slip Created", "A salary slip for 2025-01 has been created.") for i in range(n)]
+    with Session(database.engine) as session:
+        start = time.perf_counter()
+        notifications.enqueue_many(session, messages)
+        session.commit()
+        enqueue = time.perf_counter() - start
+
+    start = time.perf_counter()
+    while notifications.deliver_pending(database.engine, transport(), limit=500):
+        pass
+    pooled = time.perf_counter() - start
+    assert sink.messages == n, sink.messages
+    pooled_connections = sink.connections
+
+    sample = messages[: min(n, 200)]
+    start = time.perf_counter()
+    for to_email, subject, body in sample:
+        with transport() as conn:
+            conn.send(to_email, subject, body)
+    per_message = (time.perf_counter() - start) / len(sample)
+
+    print(f"enqueue (one bulk insert):  {n / enqueue:10.1f} msgs/s")
+    print(f"drain, pooled connection:   {n / pooled:10.1f} msgs/s  ({pooled_connections} connections)")
+    print(f"connection per message:     {1 / per_message:10.1f} msgs/s")
+
+
+if __name__ == "__main__":
+    main()
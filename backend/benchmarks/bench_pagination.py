@@ -0,0 +1,90 @@
+"""
+Latency of individual pages of one employee's slip history with keyset
+pagination, compared with LIMIT/OFFSET and with loading the whole history.
+
+    python -m benchmarks.bench_pagination --slips 200000 --page-size 100
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._common import make_employees
+
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from app import crud, database, models, pagination
+
+
+def seed(session, employee_id, count):
+    start = datetime(2000, 1, 1)
+    for offset in range(0, count, 50000):
+        rows = [
+            dict(
+                id=models.gen_id(), employee_id=employee_id, month=f"m{i}",
+                basic=1000.0, allowances=0.0, deductions=0.0, net_pay=1000.0,
+                created_at=start + timedelta(minutes=i),
+            )
+            for i in range(offset, min(offset + 50000, count))
+        ]
+        session.execute(insert(models.SalarySlip), rows)
+    session.commit()
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slips", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    size = args.page_size
+
+    database.init_db()
+    with Session(database.engine) as session:
+        (employee_id,) = make_employees(session, 1)
+        # a second employee so the filter has something to skip
+        (other_id,) = make_employees(session, 1, prefix="other")
+        seed(session, employee_id, args.slips)
+        seed(session, other_id, args.slips // 4)
+
+        pages = args.slips // size
+        probes = sorted({1, 10, 100, pages // 2, pages} & set(range(1, pages + 1)))
+        cursor, keyset_ms = None, {}
+        for page in range(1, pages + 1):
+            if page in probes:
+                ms, items = timed(lambda: crud.get_salary_slips_for_user(session, employee_id, size, cursor))
+                keyset_ms[page] = ms
+            else:
+                items = crud.get_salary_slips_for_user(session, employee_id, size, cursor)
+            last = items[-1]
+            cursor = pagination.encode_cursor(last.created_at, last.id)
+            session.expunge_all()
+
+        print(f"slips for employee: {args.slips}, page size: {size}")
+        print(f"{'page':>8}{'keyset ms':>12}{'offset ms':>12}")
+        for page in probes:
+            stmt = (
+                select(models.SalarySlip)
+                .where(models.SalarySlip.employee_id == employee_id)
+                .order_by(models.SalarySlip.created_at.desc(), models.SalarySlip.id.desc())
+                .offset((page - 1) * size)
+                .limit(size)
+            )
+            offset_ms, _ = timed(lambda: session.exec(stmt).all())
+            session.expunge_all()
+            print(f"{page:>8}{keyset_ms[page]:>12.2f}{offset_ms:>12.2f}")
+
+        full_ms, _ = timed(lambda: crud.get_salary_slips_for_user(session, employee_id), repeat=1)
+        print(f"whole history in one response: {full_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Bulk employee import versus crud.create_user per row, and a login burst
+against the bounded hashing pool showing fast rejection once it is full.
+
+    python -m benchmarks.bench_password_hashing --users 500 --burst 200
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import _common  # noqa: F401  (points DATABASE_URL at a temp db)
+
+from sqlmodel import Session
+from app import auth, crud, database, schemas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=200)
+    args = parser.parse_args()
+    n = args.users
+
+    database.init_db()
+    with Session(database.engine) as session:
+        start = time.perf_counter()
+        for i in range(n):
+            crud.create_user(session, schemas.UserCreate(email=f"one{i}@example.com", password=f"pw{i}"))
+        one_by_one = time.perf_counter() - start
+
+        rows = [(i + 2, {"email": f"bulk{i}@example.com", "password": f"pw{i}"}) for i in range(n)]
+        start = time.perf_counter()
+        created, _ = crud.import_users(session, rows)
+        bulk = time.perf_counter() - start
+        assert created == n
+
+    print(f"hash workers: {auth.HASH_WORKERS}  max pending: {auth.HASH_MAX_PENDING}")
+    print(f"create_user per row: {n / one_by_one:8.1f} users/s")
+    print(f"bulk import:         {n / bulk:8.1f} users/s  ({one_by_one / bulk:.1f}x)")
+
+    hashed = auth.get_password_hash("secret")
+
+    def login(_):
+        start = time.perf_counter()
+        try:
+            auth.verify_password("secret", hashed)
+            return "ok", time.perf_counter() - start
+        except auth.HashPoolBusy:
+            return "busy", time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.burst) as threads:
+        results = list(threads.map(login, range(args.burst)))
+    ok = [t for r, t in results if r == "ok"]
+    busy = [t for r, t in results if r == "busy"]
+    print(f"login burst of {args.burst}: {len(ok)} verified (max {max(ok) * 1000:.0f} ms), "
+          f"{len(busy)} rejected" + (f" (max {max(busy) * 1000:.2f} ms)" if busy else ""))
+
+
+if __name__ == "__main__":
+    main()
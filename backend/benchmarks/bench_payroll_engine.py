@@ -0,0 +1,90 @@
+"""
+The array payroll engine (app.payroll) against the plain per-employee
+implementation of the same rules in tests/payroll_reference.py, timed on
+`--employees` employees, and a database payroll run timed with and without
+`apply_rules`. tests/test_payroll.py checks that the two agree.
+
+    python -m benchmarks.bench_payroll_engine --employees 100000
+"""
+import argparse
+import time
+
+from benchmarks._common import make_employees
+
+import numpy as np
+from sqlmodel import Session
+from app import crud, database, payroll, schemas
+from tests.payroll_reference import slip as reference_slip
+
+
+# -------------------------------
+# DATA
+# -------------------------------
+def random_inputs(n, seed=1):
+    rng = np.random.default_rng(seed)
+    basic = np.round(np.exp(rng.uniform(np.log(6000), np.log(400000), n)), 2)
+    allowances = np.round(basic * rng.uniform(0.1, 0.9, n), 2)
+    deductions = np.where(rng.random(n) < 0.1, rng.choice([250.0, 500.0, 1200.5], n), 0.0)
+    lop_days = np.where(rng.random(n) < 0.1, rng.choice([0.5, 1, 2, 3, 10, 31, 40], n), 0.0)
+    arrears = np.where(rng.random(n) < 0.05, np.round(rng.uniform(100, 250000, n), 2), 0.0)
+    return basic, allowances, deductions, lop_days, arrears
+
+
+def best_of(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=100000)
+    parser.add_argument("--run-employees", type=int, default=5000, help="employees in the database payroll run")
+    args = parser.parse_args()
+
+    month = "2025-05"
+    inputs = random_inputs(args.employees)
+    columns = [a.tolist() for a in inputs]
+    engine_s = best_of(lambda: payroll.compute(month, *inputs), 5)
+    slips = [
+        dict(employee_id=str(i), month=month, basic=b, allowances=a, deductions=d)
+        for i, (b, a, d) in enumerate(zip(*columns[:3]))
+    ]
+    adjustments = {
+        str(i): {"lop_days": lop, "arrears": arr}
+        for i, (lop, arr) in enumerate(zip(*columns[3:])) if lop or arr
+    }
+    slips_s = best_of(lambda: payroll.compute_slips(slips, adjustments), 3)
+    reference_s = best_of(lambda: [reference_slip(month, *row) for row in zip(*columns)], 1)
+    print(f"\n{args.employees} employees, {month}")
+    print(f"{'reference, per employee':<34}{reference_s * 1000:>10.1f} ms")
+    print(f"{'payroll.compute (arrays)':<34}{engine_s * 1000:>10.1f} ms  {reference_s / engine_s:>6.1f}x")
+    print(f"{'payroll.compute_slips (dicts)':<34}{slips_s * 1000:>10.1f} ms  {reference_s / slips_s:>6.1f}x")
+
+    database.init_db()
+    with Session(database.engine) as session:
+        employee_ids = make_employees(session, args.run_employees)
+        template = schemas.SalarySlipTemplate(basic=60000, allowances=25000, deductions=0)
+        timings = {}
+        for apply_rules, month in ((False, "2025-06"), (True, "2025-07")):
+            run = schemas.PayrollRunCreate(
+                month=month, template=template, employee_ids=employee_ids, apply_rules=apply_rules,
+                adjustments={employee_ids[0]: schemas.PayrollAdjustment(lop_days=2, arrears=15000)},
+            )
+            if not apply_rules:
+                run.adjustments = None
+            start = time.perf_counter()
+            summary = crud.create_payroll_run(session, run)
+            timings[apply_rules] = time.perf_counter() - start
+            session.expunge_all()
+        print(f"\ndatabase payroll run, {args.run_employees} employees")
+        print(f"{'entered amounts':<34}{timings[False] * 1000:>10.1f} ms")
+        print(f"{'apply_rules (with components)':<34}{timings[True] * 1000:>10.1f} ms")
+        print(f"{'net pay of the computed run':<34}{summary['total_net_pay']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
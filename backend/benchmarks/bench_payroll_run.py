@@ -0,0 +1,51 @@
+"""
+Compare creating a month of salary slips one at a time through
+crud.create_salary_slip against a single crud.create_payroll_run.
+
+    python -m benchmarks.bench_payroll_run --employees 2000
+"""
+import argparse
+import time
+
+from benchmarks._common import make_employees
+
+from sqlmodel import Session, delete
+from app import crud, database, models, schemas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=2000)
+    args = parser.parse_args()
+
+    database.init_db()
+    with Session(database.engine) as session:
+        ids = make_employees(session, args.employees)
+
+    template = dict(basic=50000.0, allowances=5000.0, deductions=2500.0)
+
+    with Session(database.engine) as session:
+        start = time.perf_counter()
+        for emp_id in ids:
+            crud.create_salary_slip(session, schemas.SalarySlipCreate(employee_id=emp_id, month="2025-01", **template))
+        one_by_one = time.perf_counter() - start
+        session.exec(delete(models.SalarySlip))
+        session.commit()
+
+    with Session(database.engine) as session:
+        run_in = schemas.PayrollRunCreate(
+            slips=[schemas.SalarySlipCreate(employee_id=emp_id, month="2025-01", **template) for emp_id in ids]
+        )
+        start = time.perf_counter()
+        summary = crud.create_payroll_run(session, run_in)
+        bulk = time.perf_counter() - start
+        assert summary["created"] == len(ids)
+
+    n = len(ids)
+    print(f"slips: {n}")
+    print(f"one-at-a-time: {one_by_one:8.3f}s  {n / one_by_one:10.1f} slips/s")
+    print(f"payroll run:   {bulk:8.3f}s  {n / bulk:10.1f} slips/s  ({one_by_one / bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
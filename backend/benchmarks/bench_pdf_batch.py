@@ -0,0 +1,52 @@
+"""
+Throughput of rendering a month of salary-slip PDFs serially versus in the
+pdf_batch process pool, streamed into a ZIP archive.
+
+    python -m benchmarks.bench_pdf_batch --slips 500
+"""
+import argparse
+import time
+
+from app import models, pdf_batch
+
+
+def make_jobs(count):
+    jobs = []
+    for i in range(count):
+        slip = models.SalarySlip(
+            id=models.gen_id(), employee_id="x", month="2025-01",
+            basic=50000.0, allowances=5000.0, deductions=2500.0, net_pay=52500.0,
+        )
+        user = models.User(email=f"bench{i}@example.com", full_name=f"Employee {i}", hashed_password="x")
+        jobs.append(pdf_batch.make_job(slip, user))
+    return jobs
+
+
+def run(jobs, pool):
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in pdf_batch.stream_zip(jobs, pool=pool))
+    return time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slips", type=int, default=500)
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.slips)
+    pool = pdf_batch.get_pool()
+    # start the workers (and their ReportLab imports) outside the timing
+    list(pdf_batch.iter_rendered(jobs[: pdf_batch.PDF_WORKERS * 2], pool=pool))
+
+    serial, size = run(jobs, None)
+    pooled, _ = run(jobs, pool)
+    pdf_batch.shutdown()
+
+    n = len(jobs)
+    print(f"slips: {n}  workers: {pdf_batch.PDF_WORKERS}  zip size: {size / 1e6:.1f} MB")
+    print(f"serial: {serial:8.3f}s  {n / serial:8.1f} PDFs/s")
+    print(f"pooled: {pooled:8.3f}s  {n / pooled:8.1f} PDFs/s  ({serial / pooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
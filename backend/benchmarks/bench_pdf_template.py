@@ -0,0 +1,43 @@
+"""
+Per-slip render time and PDF size of the precompiled salary-slip template
+against full drawing with the logo embedded from disk on every call (the
+previous generate_salary_pdf).
+
+    python -m benchmarks.bench_pdf_template --iterations 200
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+from app import pdf_template
+
+
+def measure(template, slip, user, iterations):
+    template.render(slip, user)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data = template.render(slip, user).getvalue()
+    return (time.perf_counter() - start) / iterations, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    slip = SimpleNamespace(
+        id="bench", month="2025-01", basic=50000.0, allowances=5000.0,
+        deductions=2500.0, net_pay=52500.0, notes="Includes festival bonus",
+    )
+    user = SimpleNamespace(email="bench@example.com", full_name="Bench Employee")
+
+    full_t, full_size = measure(pdf_template.SalarySlipTemplate(precompiled=False), slip, user, args.iterations)
+    tmpl_t, tmpl_size = measure(pdf_template.SalarySlipTemplate(), slip, user, args.iterations)
+
+    print(f"full drawing: {full_t * 1000:7.2f} ms/slip  {full_size:7d} bytes")
+    print(f"template:     {tmpl_t * 1000:7.2f} ms/slip  {tmpl_size:7d} bytes")
+    print(f"speedup {full_t / tmpl_t:.1f}x, size -{(1 - tmpl_size / full_size) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
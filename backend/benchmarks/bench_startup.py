@@ -0,0 +1,112 @@
+"""
+Import time of app.main in a fresh interpreter, with and without the
+dependencies that are now loaded on first use, and time from launching
+uvicorn until the first request is answered:
+
+- INIT_DB_ON_STARTUP=1 on an empty database (first start)
+- INIT_DB_ON_STARTUP=1 on an initialised database (every restart before)
+- INIT_DB_ON_STARTUP=0 after `python -m app.bootstrap` (per-worker startup now)
+
+    python -m benchmarks.bench_startup --runs 7
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+{extra}
+import app.main
+elapsed = time.perf_counter() - start
+lazy = [m for m in ("reportlab", "smtplib") if m in sys.modules]
+print(elapsed, ",".join(lazy) or "-")
+"""
+
+
+def _env(database_url, **extra):
+    env = dict(os.environ, DATABASE_URL=database_url, OUTBOX_WORKER="0", PYTHONWARNINGS="ignore")
+    env.update(extra)
+    return env
+
+
+def import_time(database_url, extra=""):
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(extra=extra)],
+        cwd=BACKEND_DIR, env=_env(database_url), capture_output=True, text=True, check=True,
+    )
+    elapsed, loaded = out.stdout.split()
+    return float(elapsed), loaded
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_request_time(database_url, init_on_startup, timeout=60):
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(database_url, INIT_DB_ON_STARTUP=init_on_startup),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("server did not answer in time")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def fresh_url(directory, name):
+    return f"sqlite:///{os.path.join(directory, name)}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+    tmp = tempfile.mkdtemp(prefix="payroll-bench-startup-")
+    url = fresh_url(tmp, "ready.db")
+    subprocess.run([sys.executable, "-m", "app.bootstrap"], cwd=BACKEND_DIR, env=_env(url),
+                   capture_output=True, check=True)
+
+    print(f"{'import app.main':<44} {'median ms':>10} {'min ms':>8}  loaded")
+    for label, extra in (
+        ("lazy (current)", ""),
+        ("+ reportlab, smtplib, MIME (eager)", "from app import pdf_template\nimport smtplib, email.mime.text"),
+    ):
+        samples = [import_time(url, extra) for _ in range(args.runs)]
+        times = [t * 1000 for t, _ in samples]
+        print(f"{label:<44} {statistics.median(times):>10.1f} {min(times):>8.1f}  {samples[-1][1]}")
+
+    print(f"\n{'launch to first response':<44} {'median ms':>10} {'min ms':>8}")
+    cases = (
+        ("INIT_DB_ON_STARTUP=1, empty database", "1", lambda i: fresh_url(tmp, f"empty{i}.db")),
+        ("INIT_DB_ON_STARTUP=1, initialised database", "1", lambda i: url),
+        ("INIT_DB_ON_STARTUP=0, after app.bootstrap", "0", lambda i: url),
+    )
+    for label, flag, make_url in cases:
+        times = [first_request_time(make_url(i), flag) * 1000 for i in range(args.runs)]
+        print(f"{label:<44} {statistics.median(times):>10.1f} {min(times):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Local stand-in for replication: copies a SQLite primary into a replica file
+every few seconds with the online backup API, for trying READ_REPLICA_URLS.
+
+    python -m benchmarks.replica_sync --primary payroll.db --replica replica.db --interval 5
+    READ_REPLICA_URLS="sqlite:///file:replica.db?mode=ro&uri=true" uvicorn app.main:app
+"""
+import argparse
+import sqlite3
+import time
+
+
+def copy_once(primary, replica):
+    src = sqlite3.connect(primary)
+    # waits for readers of the replica to finish their transaction
+    dst = sqlite3.connect(replica, timeout=30)
+    try:
+        src.backup(dst)
+        # the copy carries the primary's WAL flag; the replica is opened
+        # read-only, which cannot create the WAL index, so use a rollback journal
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+        src.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--primary", default="payroll.db")
+    parser.add_argument("--replica", default="replica.db")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between copies")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+
+    while True:
+        started = time.perf_counter()
+        copy_once(args.primary, args.replica)
+        print(f"copied {args.primary} -> {args.replica} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
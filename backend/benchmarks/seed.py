@@ -0,0 +1,153 @@
+"""
+Fast synthetic dataset for benchmarks: users, salary slips and expenses
+written with bulk INSERTs, deterministic for a given --seed.
+
+Every user has the password BENCH_PASSWORD (hashed once) and the first user
+is the admin BENCH_ADMIN_EMAIL. To keep a dataset around between runs, point
+BENCH_DATABASE_URL at a file:
+
+    BENCH_DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed --users 100000 --slips 1000000 --expenses 2000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import _common  # noqa: F401  (selects the benchmark database)
+
+from sqlalchemy import insert
+from sqlmodel import Session, func, select
+from app import aggregates, auth, database, models
+
+BENCH_PASSWORD = "bench-password"
+BENCH_ADMIN_EMAIL = "bench-admin@example.com"
+BATCH_ROWS = 50000
+CATEGORIES = ("travel", "food", "equipment", "training", "internet", "medical")
+
+
+def _insert(conn, model, rows):
+    for i in range(0, len(rows), BATCH_ROWS):
+        conn.execute(insert(model), rows[i:i + BATCH_ROWS])
+
+
+def _id_factory(rnd):
+    """uuid4-shaped ids from the seeded generator: reproducible and much cheaper than uuid4()."""
+    def gen_id():
+        h = "%032x" % rnd.getrandbits(128)
+        return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{h[16:20]}-{h[20:]}"
+    return gen_id
+
+
+def _months(count, end):
+    months, year, month = [], end.year, end.month
+    for _ in range(count):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months[::-1]
+
+
+def seed(engine, users=1000, slips=10000, expenses=20000, seed=0):
+    """Insert the dataset and return the number of rows written per table."""
+    rnd = random.Random(seed)
+    gen_id = _id_factory(rnd)
+    hashed = auth.pwd_context.hash(BENCH_PASSWORD)
+    start = datetime(2020, 1, 1)
+    span = (datetime(2025, 1, 1) - start).total_seconds()
+
+    with engine.begin() as conn:
+        user_ids = []
+        rows = []
+        for i in range(users):
+            uid = gen_id()
+            user_ids.append(uid)
+            rows.append(dict(
+                id=uid,
+                email=BENCH_ADMIN_EMAIL if i == 0 else f"user{i}@bench.example.com",
+                full_name=f"Bench User {i}",
+                hashed_password=hashed,
+                role="admin" if i == 0 else "employee",
+                created_at=start + timedelta(seconds=i),
+            ))
+            if len(rows) == BATCH_ROWS:
+                _insert(conn, models.User, rows)
+                rows = []
+        _insert(conn, models.User, rows)
+        employees = user_ids[1:] or user_ids
+
+        # slips: one per employee per month, newest months last
+        months = _months(max(1, -(-slips // len(employees))), datetime(2024, 12, 1))
+        month_start = {m: datetime.strptime(m, "%Y-%m") + timedelta(days=27) for m in months}
+        rows = []
+        for n in range(slips):
+            month = months[n // len(employees)]
+            basic = float(rnd.randrange(20000, 150000, 500))
+            allowances = float(rnd.randrange(0, 20000, 100))
+            deductions = float(rnd.randrange(0, 10000, 100))
+            rows.append(dict(
+                id=gen_id(),
+                employee_id=employees[n % len(employees)],
+                month=month,
+                basic=basic,
+                allowances=allowances,
+                deductions=deductions,
+                net_pay=basic + allowances - deductions,
+                notes=None,
+                created_at=month_start[month] + timedelta(seconds=n % 86400),
+            ))
+            if len(rows) == BATCH_ROWS:
+                _insert(conn, models.SalarySlip, rows)
+                rows = []
+        _insert(conn, models.SalarySlip, rows)
+
+        rows = []
+        for n in range(expenses):
+            r = rnd.random()
+            status = "pending" if r < 0.2 else "approved" if r < 0.9 else "rejected"
+            rows.append(dict(
+                id=gen_id(),
+                employee_id=rnd.choice(employees),
+                date=start + timedelta(seconds=rnd.random() * span),
+                category=rnd.choice(CATEGORIES),
+                amount=round(rnd.uniform(50, 20000), 2),
+                description="synthetic expense",
+                status=status,
+                admin_comment=None,
+            ))
+            if len(rows) == BATCH_ROWS:
+                _insert(conn, models.Expense, rows)
+                rows = []
+        _insert(conn, models.Expense, rows)
+
+    with Session(engine) as session:
+        aggregates.rebuild(session)
+        session.commit()
+    return {"users": users, "slips": slips, "expenses": expenses}
+
+
+def dataset_size(engine):
+    with Session(engine) as session:
+        return {
+            "users": session.exec(select(func.count()).select_from(models.User)).one(),
+            "slips": session.exec(select(func.count()).select_from(models.SalarySlip)).one(),
+            "expenses": session.exec(select(func.count()).select_from(models.Expense)).one(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--slips", type=int, default=1000000)
+    parser.add_argument("--expenses", type=int, default=2000000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    database.init_db()
+    started = time.perf_counter()
+    counts = seed(database.engine, args.users, args.slips, args.expenses, args.seed)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"seeded {counts} into {database.DATABASE_URL} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Minimal local SMTP stand-in for exercising the notification outbox.
+
+    python -m benchmarks.smtp_sink --port 1025
+    NOTIFY_BACKEND=smtp SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=0 uvicorn app.main:app
+"""
+import argparse
+import socketserver
+import threading
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, _SmtpHandler)
+        self.messages = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count(self, messages=0, connections=0):
+        with self._lock:
+            self.messages += messages
+            self.connections += connections
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.count(connections=1)
+        self.reply("220 localhost smtp-sink")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.rstrip(b"\r\n")
+            if in_data:
+                if line == b".":
+                    in_data = False
+                    self.server.count(messages=1)
+                    self.reply("250 OK")
+                continue
+            cmd = line[:4].upper()
+            if cmd in (b"EHLO", b"HELO"):
+                self.reply("250 localhost")
+            elif cmd == b"DATA":
+                in_data = True
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif cmd == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def start(port=0):
+    server = SmtpSink(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    server = SmtpSink(("127.0.0.1", args.port))
+    print(f"SMTP sink listening on 127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Repeatable API scenarios run in-process against the ASGI app, with latency
+percentiles and throughput written to a JSON file so runs can be compared.
+
+    python -m benchmarks.suite --users 10000 --slips 100000 --expenses 200000 --output before.json
+    python -m benchmarks.suite ... --output after.json --baseline before.json
+
+With BENCH_DATABASE_URL pointing at a database filled by benchmarks.seed,
+--reuse skips seeding. Scenarios can be picked with --scenarios me,slip_list.
+Login requests rejected with 503 by the password hashing pool count as
+errors. Needs httpx.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import _common  # noqa: F401  (selects the benchmark database)
+
+# keep the run self-contained: no outbox delivery, a private PDF cache
+os.environ.setdefault("OUTBOX_WORKER", "0")
+os.environ.setdefault("PDF_CACHE_DIR", tempfile.mkdtemp(prefix="payroll-bench-pdf-"))
+
+import httpx
+from sqlmodel import Session, select
+from app import auth, database, models
+from app.main import app
+from benchmarks import seed as seeding
+
+
+class Fixtures:
+    """Ids and tokens sampled from the dataset for the scenarios to use."""
+
+    def __init__(self, engine, sample=2000, rnd=None):
+        rnd = rnd or random.Random(0)
+        with Session(engine) as session:
+            admin = session.exec(select(models.User).where(models.User.role == "admin")).first()
+            self.admin_email = admin.email
+            self.admin_token = auth.create_access_token(data={"sub": admin.id, "role": admin.role})
+            employees = session.exec(
+                select(models.User.id, models.User.email).where(models.User.role == "employee").limit(sample)
+            ).all()
+            self.employees = [(eid, email, auth.create_access_token(data={"sub": eid, "role": "employee"}))
+                              for eid, email in employees]
+            slips = session.exec(select(models.SalarySlip.id, models.SalarySlip.employee_id).limit(sample)).all()
+            self.slips = list(slips)
+            pending = session.exec(
+                select(models.Expense.id).where(models.Expense.status == "pending").limit(sample * 5)
+            ).all()
+            self.pending = list(pending)
+        rnd.shuffle(self.pending)
+        self.tokens = {eid: token for eid, _, token in self.employees}
+        self.rnd = rnd
+        self.run_counter = 0
+
+    def token_for(self, employee_id):
+        if employee_id not in self.tokens:
+            self.tokens[employee_id] = auth.create_access_token(data={"sub": employee_id, "role": "employee"})
+        return self.tokens[employee_id]
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+# Each scenario returns an awaitable request for iteration `i`.
+def login(client, fx, i):
+    _, email, _ = fx.employees[i % len(fx.employees)]
+    return client.post("/auth/login", data={"username": email, "password": seeding.BENCH_PASSWORD})
+
+
+def me(client, fx, i):
+    return client.get("/auth/me", headers=bearer(fx.employees[i % len(fx.employees)][2]))
+
+
+def slip_list(client, fx, i):
+    return client.get("/employee/salary-slip", params={"limit": 50}, headers=bearer(fx.employees[i % len(fx.employees)][2]))
+
+
+def pending_list(client, fx, i):
+    return client.get("/admin/expenses/pending", params={"limit": 100}, headers=bearer(fx.admin_token))
+
+
+def expense_approve(client, fx, i):
+    expense_id = fx.pending.pop()
+    return client.post(f"/admin/expenses/{expense_id}/action", params={"action": "approve"}, headers=bearer(fx.admin_token))
+
+
+def pdf_download(client, fx, i):
+    slip_id, employee_id = fx.slips[i % len(fx.slips)]
+    return client.get(f"/employee/salary-slip/{slip_id}/pdf", headers=bearer(fx.token_for(employee_id)))
+
+
+def payroll_run(client, fx, i):
+    fx.run_counter += 1
+    ids = [eid for eid, _, _ in fx.rnd.sample(fx.employees, min(100, len(fx.employees)))]
+    body = {
+        "month": f"bench-{fx.run_counter:05d}",
+        "template": {"basic": 50000, "allowances": 5000, "deductions": 2000},
+        "employee_ids": ids,
+    }
+    return client.post("/admin/payroll-runs", json=body, headers=bearer(fx.admin_token))
+
+
+# name: (scenario, default request count)
+SCENARIOS = {
+    "login": (login, 200),
+    "me": (me, 2000),
+    "slip_list": (slip_list, 2000),
+    "pending_list": (pending_list, 1000),
+    "expense_approve": (expense_approve, 1000),
+    "pdf_download": (pdf_download, 300),
+    "payroll_run": (payroll_run, 50),
+}
+
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+
+    def pct(p):
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 3)
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else None,
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1], 3) if ordered else None,
+    }
+
+
+async def run_scenario(client, fx, scenario, requests, concurrency):
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await scenario(client, fx, i)
+            elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_all(names, args, fx):
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in names:
+            scenario, default_requests = SCENARIOS[name]
+            requests = max(1, int(default_requests * args.scale))
+            # a short warm-up so caches and compiled statements do not skew the first samples
+            await run_scenario(client, fx, scenario, min(10, requests), 1)
+            if name == "expense_approve":
+                # every approval consumes one pending expense
+                requests = min(requests, len(fx.pending))
+            results[name] = await run_scenario(client, fx, scenario, requests, args.concurrency)
+            r = results[name]
+            print(f"{name:<16} {r['requests']:>6} {r['throughput_rps']:>9} {r['p50_ms']:>9} "
+                  f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['errors']:>6}")
+    # the app's lifespan does not run under ASGITransport, so close the async
+    # engine here: its driver threads would keep the process alive
+    await database.dispose_async_engine()
+    return results
+
+
+def git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results):
+    print(f"\n{'vs baseline':<16} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, r in results.items():
+        b = baseline.get("scenarios", {}).get(name)
+        if not b:
+            continue
+
+        def delta(key):
+            if not b.get(key) or r.get(key) is None:
+                return "n/a"
+            return f"{(r[key] - b[key]) / b[key] * 100:+.1f}%"
+
+        print(f"{name:<16} {delta('throughput_rps'):>9} {delta('p50_ms'):>9} {delta('p95_ms'):>9} {delta('p99_ms'):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--slips", type=int, default=100000)
+    parser.add_argument("--expenses", type=int, default=200000)
+    parser.add_argument("--reuse", action="store_true", help="use the existing data in BENCH_DATABASE_URL")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the request counts")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = set(names) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    database.init_db()
+    if not args.reuse:
+        seeding.seed(database.engine, args.users, args.slips, args.expenses)
+    fx = Fixtures(database.engine)
+
+    print(f"{'scenario':<16} {'reqs':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    results = asyncio.run(run_all(names, args, fx))
+
+    report = {
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": database.engine.dialect.name,
+        "dataset": seeding.dataset_size(database.engine),
+        "concurrency": args.concurrency,
+        "scenarios": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
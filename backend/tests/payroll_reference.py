@@ -0,0 +1,83 @@
+"""
+A plain per-employee implementation of the payroll rules, written from the
+rule descriptions in app.payroll_rules rather than from app.payroll. The
+tests check the array engine against it, and benchmarks.bench_payroll_engine
+times it.
+"""
+import calendar
+from decimal import ROUND_HALF_UP, Decimal
+
+from app.payroll_rules import RULES
+
+
+def rules_for(month):
+    found = None
+    for rules in RULES:
+        if rules["effective_from"] <= month and (found is None or rules["effective_from"] > found["effective_from"]):
+            found = rules
+    return found
+
+
+def round_half_up(amount, unit="1"):
+    # to the micro-rupee first, so binary noise does not decide a half
+    return float(Decimal(f"{amount:.6f}").quantize(Decimal(unit), rounding=ROUND_HALF_UP))
+
+
+def to_paise(amount):
+    return round_half_up(amount, "0.01")
+
+
+def annual_tax(income, rules):
+    tax = 0.0
+    slabs = rules["slabs"]
+    for i, (lower, rate) in enumerate(slabs):
+        upper = slabs[i + 1][0] if i + 1 < len(slabs) else float("inf")
+        if income > lower:
+            tax += rate * (min(income, upper) - lower)
+    limit = rules.get("rebate_limit")
+    if limit:
+        tax = 0.0 if income <= limit else min(tax, income - limit)
+    return tax * (1 + rules["cess"])
+
+
+def slip(month, basic, allowances, deductions, lop_days, arrears, rules=None):
+    rules = rules or rules_for(month)
+    proration = rules["proration"]
+    if proration["basis"] == "fixed_days":
+        days = proration["days"]
+    else:
+        days = calendar.monthrange(int(month[:4]), int(month[5:7]))[1]
+    paid_days = min(max(days - lop_days, 0.0), days)
+    earned_basic = to_paise(basic * (paid_days / days))
+    earned_allowances = to_paise(allowances * (paid_days / days))
+    gross = earned_basic + earned_allowances + arrears
+
+    pf = rules["provident_fund"]
+    wage = earned_basic if pf.get("wage_ceiling") is None else min(earned_basic, pf["wage_ceiling"])
+    provident_fund = round_half_up(wage * pf["rate"])
+
+    pt = rules["professional_tax"]
+    professional_tax = 0.0
+    for above, amount in pt.get("month_overrides", {}).get(month[5:7], pt["slabs"]):
+        if gross > above:
+            professional_tax = amount
+
+    it = rules["income_tax"]
+    annual = (basic + allowances) * 12
+    base = annual_tax(max(annual - it["standard_deduction"], 0.0), it)
+    with_arrears = annual_tax(max(annual + arrears - it["standard_deduction"], 0.0), it)
+    income_tax = round_half_up(base / 12 + (with_arrears - base))
+
+    total = provident_fund + professional_tax + income_tax + deductions
+    return {
+        "earned_basic": earned_basic,
+        "earned_allowances": earned_allowances,
+        "arrears": arrears,
+        "provident_fund": provident_fund,
+        "professional_tax": professional_tax,
+        "income_tax": income_tax,
+        "other_deductions": deductions,
+        "gross": gross,
+        "total_deductions": total,
+        "net_pay": to_paise(gross - total),
+    }
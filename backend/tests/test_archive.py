@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, update
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import aggregates, archive, exports, models
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        users = [models.User(email=f"e{i}@x.com", hashed_password="x") for i in range(3)]
+        session.add_all(users)
+        session.commit()
+        slips, expenses = [], []
+        for user in users:
+            for month in range(2021 * 12, 2024 * 12):
+                year, m = divmod(month, 12)
+                slips.append(dict(
+                    id=models.gen_id(), employee_id=user.id, month=f"{year}-{m + 1:02d}", basic=1000.0 + month,
+                    allowances=10.0, deductions=5.5, net_pay=1004.5 + month, notes=None, created_at=datetime(year, m + 1, 28),
+                ))
+                for day, status in ((3, "approved"), (17, "rejected"), (24, "pending")):
+                    expenses.append(dict(
+                        id=models.gen_id(), employee_id=user.id, date=datetime(year, m + 1, day), category="travel",
+                        amount=day + month / 100, description="d", status=status, admin_comment=None,
+                    ))
+        session.execute(insert(models.SalarySlip), slips)
+        session.execute(insert(models.Expense), expenses)
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def export(engine, query, archived, columns, fmt="csv"):
+    return b"".join(exports.stream_rows(query, columns, fmt, engine=engine, archived=archived))
+
+
+def slip_export(engine, **filters):
+    query = exports.salary_slips_query(**filters)
+    return export(engine, query, exports.archived_salary_slips(**filters), exports.SLIP_COLUMNS)
+
+
+def expense_export(engine, **filters):
+    query = exports.expenses_query(**filters)
+    return export(engine, query, exports.archived_expenses(**filters), exports.EXPENSE_COLUMNS, "ndjson")
+
+
+SLIP_FILTERS = [{}, {"month": "2021-05"}, {"from_month": "2022-02", "to_month": "2023-04"}, {"to_month": "2022-03"}]
+EXPENSE_FILTERS = [
+    {},
+    {"month": "2022-01", "status": "approved"},
+    {"start_date": datetime(2022, 3, 17).date(), "end_date": datetime(2023, 4, 3).date()},
+]
+
+
+def test_exports_include_archived_years(engine):
+    before = [slip_export(engine, **f) for f in SLIP_FILTERS] + [expense_export(engine, **f) for f in EXPENSE_FILTERS]
+    with Session(engine) as session:
+        for year in (2020, 2021, 2022):
+            archive.archive_fiscal_year(session, year)
+        assert session.exec(select(models.SalarySlip).where(models.SalarySlip.month < "2023-04")).first() is None
+    after = [slip_export(engine, **f) for f in SLIP_FILTERS] + [expense_export(engine, **f) for f in EXPENSE_FILTERS]
+    assert after == before
+
+
+def test_rows_edited_while_archiving_stay_live(engine, monkeypatch):
+    with Session(engine) as session:
+        edited = session.exec(select(models.SalarySlip.id).where(models.SalarySlip.month == "2021-06")).first()
+    delete_archived = archive._delete_archived
+
+    def edit_first(session, table, part, ids):
+        # another request edits the slip after it was read into the archive
+        if table == archive.SLIPS:
+            with Session(engine) as other:
+                other.execute(update(models.SalarySlip).where(models.SalarySlip.id == edited).values(notes="late edit"))
+                other.commit()
+        return delete_archived(session, table, part, ids)
+
+    monkeypatch.setattr(archive, "_delete_archived", edit_first)
+    with Session(engine) as session:
+        summary = archive.archive_fiscal_year(session, 2021)
+        assert summary["changed_kept"] == 1 and summary["salary_slips"] == 3 * 12 - 1
+        assert session.get(models.SalarySlip, edited).notes == "late edit"
+    assert b"late edit" in slip_export(engine, month="2021-06")
+    with Session(engine) as session:
+        aggregates.rebuild(session)
+        session.commit()
+        june = session.get(models.PayrollMonthTotal, "2021-06")
+        assert june.slip_count == 3 and june.net_pay == sum(1004.5 + 2021 * 12 + 5 for _ in range(3))
+
+    monkeypatch.setattr(archive, "_delete_archived", delete_archived)
+    with Session(engine) as session:
+        assert archive.archive_fiscal_year(session, 2021)["salary_slips"] == 1
+        assert session.get(models.SalarySlip, edited) is None
+    assert b"late edit" in slip_export(engine, month="2021-06")
@@ -0,0 +1,69 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from app import audit, models
+
+
+def entry(i):
+    return dict(at=datetime.utcnow(), actor_id=None, ip=None, action="update", entity="expense",
+                entity_id=str(i), before=None, after={"status": "approved"})
+
+
+def count(engine):
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(models.AuditLog)).one()
+
+
+def test_stop_under_load_writes_out_the_queue(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    SQLModel.metadata.create_all(engine)
+    writer = audit.AuditWriter(engine, queue_size=50, batch_size=10, flush_seconds=0.05)
+    write = writer.write
+
+    def slow_write(batch):
+        time.sleep(0.05)
+        write(batch)
+
+    writer.write = slow_write
+    writer.start()
+    queued = []
+    done = threading.Event()
+
+    def produce():
+        # requests still arriving keep the queue full
+        i = 0
+        while not done.is_set():
+            try:
+                writer.queue.put_nowait(entry(i))
+                queued.append(i)
+                i += 1
+            except queue.Full:
+                pass
+
+    producers = [threading.Thread(target=produce) for _ in range(2)]
+    for p in producers:
+        p.start()
+    time.sleep(0.2)
+    writer.stop(timeout=0.3)
+    done.set()
+    for p in producers:
+        p.join()
+    writer.join(10)
+    assert not writer.is_alive()
+    assert count(engine) == len(queued)
+
+
+def test_idle_writer_stops_promptly(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    SQLModel.metadata.create_all(engine)
+    writer = audit.AuditWriter(engine, flush_seconds=0.05)
+    writer.start()
+    writer.queue.put(entry(1))
+    writer.flush()
+    writer.stop(timeout=1)
+    assert not writer.is_alive()
+    assert count(engine) == 1
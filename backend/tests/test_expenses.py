@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, insert, update
+from sqlalchemy.sql import Update
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import crud, models
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'expenses.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def seed(engine, amounts):
+    with Session(engine) as session:
+        user = models.User(email="e@x.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        rows = [
+            dict(id=f"exp-{i}", employee_id=user.id, date=datetime(2025, 5, 1 + i), category="travel",
+                 amount=amount, description="d", status="pending", admin_comment=None)
+            for i, amount in enumerate(amounts)
+        ]
+        session.execute(insert(models.Expense), rows)
+        session.commit()
+    return [r["id"] for r in rows]
+
+
+def statuses(engine):
+    with Session(engine) as session:
+        return dict(session.exec(select(models.Expense.id, models.Expense.status)).all())
+
+
+def test_max_amount_is_exclusive(engine):
+    seed(engine, [10.0, 35.0, 50.0])
+    with Session(engine) as session:
+        changed = crud.bulk_update_expense_status(session, "approved", category="travel", max_amount=35.0)
+    assert [r["id"] for r in changed] == ["exp-0"]
+    assert statuses(engine) == {"exp-0": "approved", "exp-1": "pending", "exp-2": "pending"}
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_expenses_decided_meanwhile_are_not_overwritten(engine, monkeypatch, returning):
+    ids = seed(engine, [10.0, 20.0, 30.0])
+    monkeypatch.setattr(engine.dialect, "update_returning", returning)
+    decided = []
+
+    @event.listens_for(engine, "before_execute")
+    def reject_one_first(conn, clause, *args):
+        # another admin rejects an expense just before this action's UPDATE
+        if isinstance(clause, Update) and clause.table.name == "expense" and not decided:
+            decided.append(ids[1])
+            with Session(engine) as other:
+                other.execute(update(models.Expense).where(models.Expense.id == ids[1]).values(status="rejected"))
+                other.commit()
+
+    with Session(engine) as session:
+        if returning:
+            changed = crud.bulk_update_expense_status(session, "approved", expense_ids=ids)
+            assert sorted(r["id"] for r in changed) == [ids[0], ids[2]]
+        else:
+            with pytest.raises(ValueError):
+                crud.bulk_update_expense_status(session, "approved", expense_ids=ids)
+    expected = {ids[0]: "approved", ids[1]: "rejected", ids[2]: "approved"}
+    if not returning:
+        expected = {ids[0]: "pending", ids[1]: "rejected", ids[2]: "pending"}
+    assert statuses(engine) == expected
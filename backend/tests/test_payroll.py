@@ -0,0 +1,165 @@
+import copy
+
+import numpy as np
+import pytest
+
+from app import payroll
+from app.payroll_rules import RULES
+from tests import payroll_reference as reference
+
+# a month under each rule version, Februaries (professional tax override,
+# 28 and 29 days) and a 31-day month
+MONTHS = ("2023-06", "2024-02", "2024-09", "2025-02", "2025-05", "2026-02")
+
+
+def fixed_day_rules():
+    rules = copy.deepcopy(reference.rules_for("2025-05"))
+    rules["proration"] = {"basis": "fixed_days", "days": 30}
+    return rules
+
+
+def assert_matches_reference(month, rows, rules=None):
+    columns = [np.array(col, dtype=float) for col in zip(*rows)]
+    got = payroll.compute(month, *columns, rules=rules)
+    for i, row in enumerate(rows):
+        expected = reference.slip(month, *row, rules=rules)
+        for name, value in expected.items():
+            assert float(got[name][i]) == pytest.approx(value, abs=1e-6), (month, row, name)
+    return got
+
+
+def random_rows(n, seed):
+    rng = np.random.default_rng(seed)
+    basic = np.round(np.exp(rng.uniform(np.log(6000), np.log(400000), n)), 2)
+    allowances = np.round(basic * rng.uniform(0.1, 0.9, n), 2)
+    deductions = np.where(rng.random(n) < 0.1, rng.choice([250.0, 500.0, 1200.5], n), 0.0)
+    lop_days = np.where(rng.random(n) < 0.2, rng.choice([0.5, 1, 2, 3, 10, 31, 40], n), 0.0)
+    arrears = np.where(rng.random(n) < 0.1, np.round(rng.uniform(100, 250000, n), 2), 0.0)
+    return list(zip(*(a.tolist() for a in (basic, allowances, deductions, lop_days, arrears))))
+
+
+@pytest.mark.parametrize(
+    "amount, decimals, expected",
+    [
+        (0.5, 0, 1.0),
+        (1.5, 0, 2.0),
+        (2.5, 0, 3.0),
+        (2.4999, 0, 2.0),
+        (8337.5 * 0.12, 0, 1001.0),  # 1000.4999999999999 in binary
+        (2.675, 2, 2.68),
+        (1.005, 2, 1.01),
+        (-0.5, 0, -1.0),
+        (-2.675, 2, -2.68),
+        (0.0, 2, 0.0),
+    ],
+)
+def test_round_half_up(amount, decimals, expected):
+    assert payroll.round_half_up(amount, decimals) == expected
+    assert reference.round_half_up(amount, "0.01" if decimals else "1") == expected
+
+
+@pytest.mark.parametrize("month", MONTHS)
+def test_random_pay_matches_reference(month):
+    assert_matches_reference(month, random_rows(2000, seed=int(month.replace("-", ""))))
+
+
+def test_fixed_day_proration_matches_reference():
+    assert_matches_reference("2025-05", random_rows(2000, seed=7), rules=fixed_day_rules())
+
+
+@pytest.mark.parametrize("month, days", [("2024-02", 29), ("2025-02", 28), ("2025-05", 31)])
+def test_loss_of_pay_days(month, days):
+    lop = [0, 0.5, 1, 2.5, days - 1, days, days + 9]
+    rows = [(50000.0, 12345.67, 0.0, d, 0.0) for d in lop]
+    got = assert_matches_reference(month, rows)
+    # earned pay falls with every day, to nothing for a whole month or more
+    assert list(got["earned_basic"]) == sorted(got["earned_basic"], reverse=True)
+    assert got["earned_basic"][0] == 50000.0
+    assert got["earned_basic"][-2] == got["earned_basic"][-1] == 0.0
+    assert got["earned_basic"][1] == round(50000 * (days - 0.5) / days, 2)
+    # TDS is on contractual pay, whatever the days worked
+    assert len(set(got["income_tax"].tolist())) == 1
+
+
+def test_loss_of_pay_days_with_fixed_days():
+    rows = [(60000.0, 0.0, 0.0, d, 0.0) for d in (0, 1, 15, 30, 31)]
+    got = assert_matches_reference("2025-02", rows, rules=fixed_day_rules())
+    assert got["earned_basic"].tolist() == [60000.0, 58000.0, 30000.0, 0.0, 0.0]
+
+
+def test_arrears_pay_their_whole_extra_tax_in_the_month():
+    rows = [(150000.0, 50000.0, 0.0, 0.0, arrears) for arrears in (0.0, 100000.0, 250000.0)]
+    got = assert_matches_reference("2025-05", rows)
+    rules = reference.rules_for("2025-05")["income_tax"]
+    taxable = 200000.0 * 12 - rules["standard_deduction"]
+    base = reference.annual_tax(taxable, rules)
+    for i, arrears in enumerate((0.0, 100000.0, 250000.0)):
+        extra = reference.annual_tax(taxable + arrears, rules) - base
+        assert got["income_tax"][i] == reference.round_half_up(base / 12 + extra)
+        assert got["gross"][i] == 200000.0 + arrears
+    assert got["income_tax"][0] < got["income_tax"][1] < got["income_tax"][2]
+
+
+def test_arrears_with_loss_of_pay_days():
+    assert_matches_reference("2024-09", [(80000.0, 20000.0, 0.0, 3.0, 45000.0), (20000.0, 0.0, 0.0, 30.0, 5000.0)])
+
+
+@pytest.mark.parametrize("rules", RULES, ids=[r["version"] for r in RULES])
+def test_income_tax_slab_and_rebate_boundaries(rules):
+    it = rules["income_tax"]
+    month = rules["effective_from"]
+    rows = []
+    for bound in [lower for lower, _ in it["slabs"]] + [it["rebate_limit"]]:
+        for delta in (-12, -0.01, 0, 0.01, 12, 1200):
+            monthly = (bound + it["standard_deduction"] + delta) / 12
+            rows.append((monthly, 0.0, 0.0, 0.0, 0.0))
+            rows.append((monthly, 0.0, 0.0, 0.0, 50000.0))
+    got = assert_matches_reference(month, rows)
+    # no tax up to the rebate limit, and none to speak of just past it
+    at_limit = (it["rebate_limit"] + it["standard_deduction"]) / 12
+    assert payroll.compute(month, at_limit, rules=rules)["income_tax"][()] == 0.0
+    assert payroll.compute(month, at_limit + 1, rules=rules)["income_tax"][()] == 1.0
+    assert (got["income_tax"] >= 0).all()
+
+
+@pytest.mark.parametrize("month", ["2025-05", "2025-02"])
+def test_professional_tax_slab_boundaries(month):
+    rows = [(gross, 0.0, 0.0, 0.0, 0.0) for gross in (7500, 7500.01, 10000, 10000.01)]
+    got = assert_matches_reference(month, rows)
+    top = 300.0 if month.endswith("-02") else 200.0
+    assert got["professional_tax"].tolist() == [0.0, 175.0, 175.0, top]
+
+
+def test_provident_fund_rounds_halves_up():
+    # 8337.50 * 12% is 1000.50: half-to-even rounding would give 1000
+    got = assert_matches_reference("2025-05", [(8337.5, 0.0, 0.0, 0.0, 0.0), (20000.0, 0.0, 0.0, 0.0, 0.0)])
+    assert got["provident_fund"].tolist() == [1001.0, 1800.0]
+
+
+def test_zero_pay():
+    rows = [(0.0, 0.0, 0.0, 0.0, 0.0), (0.0, 0.0, 0.0, 5.0, 0.0), (0.0, 0.0, 500.0, 0.0, 0.0)]
+    got = assert_matches_reference("2025-05", rows)
+    for name in ("earned_basic", "earned_allowances", "provident_fund", "professional_tax", "income_tax", "gross"):
+        assert got[name].tolist() == [0.0, 0.0, 0.0], name
+    assert got["net_pay"].tolist() == [0.0, 0.0, -500.0]
+
+
+def test_compute_slips_groups_months_and_keeps_order():
+    slips = [
+        dict(employee_id="a", month="2025-05", basic=50000.0, allowances=10000.0, deductions=0.0),
+        dict(employee_id="b", month="2024-02", basic=30000.0, allowances=0.0, deductions=250.0),
+        dict(employee_id="c", month="2025-05", basic=8337.5, allowances=0.0, deductions=0.0),
+    ]
+    adjustments = {"a": {"lop_days": 2, "arrears": 15000.0}}
+    computed, versions = payroll.compute_slips(slips, adjustments)
+    assert versions == ["FY2025-26", "FY2023-24", "FY2025-26"]
+    for i, s in enumerate(slips):
+        adj = adjustments.get(s["employee_id"], {})
+        expected = reference.slip(s["month"], s["basic"], s["allowances"], s["deductions"], adj.get("lop_days", 0.0), adj.get("arrears", 0.0))
+        for name, value in expected.items():
+            assert computed[name][i] == pytest.approx(value, abs=1e-6), (s["employee_id"], name)
+
+
+def test_month_without_rules():
+    with pytest.raises(ValueError):
+        payroll.rules_for("2020-01")
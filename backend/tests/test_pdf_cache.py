@@ -0,0 +1,44 @@
+import os
+import threading
+
+from app.pdf_cache import PdfCache
+
+
+def test_directory_is_created_on_open_not_construction(tmp_path):
+    directory = tmp_path / "pdfs"
+    cache = PdfCache(str(directory), memory_items=4, disk_bytes=1024)
+    assert not directory.exists()
+    cache.open()
+    assert directory.is_dir()
+
+
+def test_disk_hit_survives_the_file_being_removed(tmp_path):
+    writer = PdfCache(str(tmp_path), memory_items=4, disk_bytes=1024)
+    writer.put("slip-a", b"%PDF-a")
+    # another worker, its memory tier empty, finds the file on disk
+    reader = PdfCache(str(tmp_path), memory_items=4, disk_bytes=1024)
+    reader.open()
+    assert reader.get("slip-a") == b"%PDF-a"
+    os.remove(tmp_path / "slip-a.pdf")
+    assert reader.get("slip-a") == b"%PDF-a"  # kept in memory
+    assert PdfCache(str(tmp_path), 4, 1024).get("slip-a") is None  # a miss, rendered again
+
+
+def test_same_key_is_counted_once(tmp_path):
+    cache = PdfCache(str(tmp_path), memory_items=4, disk_bytes=1024)
+    barrier = threading.Barrier(8)
+
+    def put():
+        barrier.wait()
+        cache.put("slip-a", b"x" * 100)
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cache.put("slip-b", b"y" * 50)
+    assert cache._disk_used == 150
+    cache.invalidate("slip")
+    assert cache._disk_used == 0
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
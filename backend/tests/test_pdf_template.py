@@ -0,0 +1,59 @@
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+from reportlab.pdfgen import canvas
+
+from app import pdf_template
+
+
+def slip_and_user():
+    slip = SimpleNamespace(month="2025-06", basic=1000.0, allowances=200.0, deductions=50.0, net_pay=1150.0, notes=None)
+    user = SimpleNamespace(full_name="Asha Rao", email="asha@x.com")
+    return slip, user
+
+
+def test_render_time_error_falls_back_to_full_drawing(monkeypatch):
+    template = pdf_template.SalarySlipTemplate()
+    assert template.ops is not None
+
+    def broken(c):
+        raise AttributeError("'Canvas' object has no attribute '_formsinuse'")
+
+    monkeypatch.setattr(template, "_replay_static", broken)
+    pdf = template.render(*slip_and_user()).getvalue()
+    assert pdf.startswith(b"%PDF")
+    assert template.ops is None
+    # later slips skip the template
+    assert template.render(*slip_and_user()).getvalue().startswith(b"%PDF")
+
+
+def test_field_errors_still_raise():
+    template = pdf_template.SalarySlipTemplate()
+    slip, user = slip_and_user()
+    slip.basic = None
+    try:
+        template.render(slip, user)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("expected a TypeError")
+    assert template.ops is not None
+
+
+def logo_placement(logo):
+    c = canvas.Canvas(BytesIO())
+    pdf_template.draw_static(c, logo)
+    end = next(i for i, op in enumerate(c._code) if op.endswith(" Do"))
+    return c._code[end - 2:end]
+
+
+@pytest.mark.parametrize("size", [None, (100, 300), (600, 40)])
+def test_logo_is_placed_like_draw_image(tmp_path, monkeypatch, size):
+    if size is not None:
+        path = tmp_path / "logo.png"
+        Image.new("RGB", size, "navy").save(path)
+        monkeypatch.setattr(pdf_template, "LOGO_PATH", str(path))
+    template_logo = pdf_template._LogoImage(pdf_template.LOGO_PATH)
+    assert logo_placement(template_logo) == logo_placement(None)
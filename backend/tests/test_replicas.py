@@ -0,0 +1,57 @@
+import sqlite3
+
+from sqlalchemy import event, text
+from sqlmodel import create_engine
+
+from app import auth, replicas
+
+
+def database(path, rows):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (name TEXT)"))
+        conn.execute(text("INSERT INTO item VALUES (:name)"), [{"name": name} for name in rows])
+    return engine
+
+
+def test_session_moves_to_the_primary_when_the_replica_fails(tmp_path):
+    primary = database(tmp_path / "primary.db", ["a", "b"])
+    database(tmp_path / "replica.db", ["a"]).dispose()
+    replica = replicas.Replica(f"sqlite:///file:{tmp_path / 'replica.db'}?mode=ro&uri=true")
+    count = text("SELECT count(*) FROM item")
+    with replica.engine.connect() as conn:
+        session = replicas.ReplicaSession(bind=conn, replica=replica, primary=primary)
+        assert session.exec(count).one() == (1,)
+
+        def fail(cursor, statement, parameters, context):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        event.listen(replica.engine, "do_execute", fail)
+        assert session.exec(count).one() == (2,)
+        assert session.execute(count).scalar() == 2
+        assert not replica.available(0.0)
+        session.close()
+
+
+def test_expired_write_marks_are_swept(monkeypatch):
+    monkeypatch.setattr(replicas, "_recent_writers", {})
+    monkeypatch.setattr(replicas, "_next_sweep", 0.0)
+    clock = [1000.0]
+    monkeypatch.setattr(replicas.time, "monotonic", lambda: clock[0])
+    for i in range(100):
+        monkeypatch.setattr(replicas, "_request_user_id", lambda i=i: f"user-{i}")
+        replicas._mark_write(None)
+        clock[0] += 1
+    # only the marks younger than REPLICA_STICKY_SECONDS, and those written since the last sweep, are left
+    assert len(replicas._recent_writers) <= 2 * replicas.REPLICA_STICKY_SECONDS + 1
+    assert "user-99" in replicas._recent_writers
+
+
+def test_bearer_token():
+    def scope(*headers):
+        return {"headers": [(name.encode(), value.encode()) for name, value in headers]}
+
+    assert auth.bearer_token(scope(("accept", "*/*"), ("authorization", "Bearer abc"))) == "abc"
+    assert auth.bearer_token(scope(("authorization", "bearer abc"))) == "abc"
+    assert auth.bearer_token(scope(("authorization", "Basic abc"))) is None
+    assert auth.bearer_token(scope()) is None
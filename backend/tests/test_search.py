@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, insert, update
+from sqlmodel import Session, SQLModel, create_engine
+
+from app import crud, models, search
+
+NAMES = ["Anand Kumar", "Kumari Devi", "Ravi Anand", "Priya Sharma", "Sharmila Rao", "Anandi Joshi"]
+
+# the index as it was keyed before search_rowid, on the user table's implicit rowid
+_ROWID_LAYOUT = (
+    """
+    CREATE VIRTUAL TABLE user_search USING fts5(
+        full_name, email, content='user', content_rowid='rowid', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER user_search_insert AFTER INSERT ON "user" BEGIN
+        INSERT INTO user_search(rowid, full_name, email) VALUES (new.rowid, new.full_name, new.email);
+    END
+    """,
+    "INSERT INTO user_search(user_search) VALUES ('rebuild')",
+)
+
+
+def users(names, start=0):
+    now = datetime(2025, 4, 1)
+    return [
+        dict(
+            id=models.gen_id(),
+            email=f"{name.split()[0].lower()}.{i}@acme.com",
+            full_name=name,
+            hashed_password="x",
+            role="employee",
+            created_at=now + timedelta(seconds=i),
+        )
+        for i, name in enumerate(names, start)
+    ]
+
+
+def found(engine, q):
+    with Session(engine) as session:
+        return sorted(u.full_name for u in crud.get_users(session, q=q))
+
+
+def renumber(engine):
+    # what VACUUM may do to a table without an INTEGER PRIMARY KEY
+    with engine.begin() as conn:
+        conn.exec_driver_sql('UPDATE "user" SET rowid = -rowid')
+        conn.exec_driver_sql('UPDATE "user" SET rowid = 1000 - rowid')
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_index_follows_inserts_updates_and_deletes(engine):
+    search.install(engine)
+    rows = users(NAMES)
+    with Session(engine) as session:
+        session.execute(insert(models.User), rows)
+        session.commit()
+    assert found(engine, "anand") == ["Anand Kumar", "Anandi Joshi", "Ravi Anand"]
+    assert found(engine, "ANAND kum") == ["Anand Kumar"]
+    with Session(engine) as session:
+        session.execute(update(models.User).where(models.User.id == rows[3]["id"]).values(full_name="Zebediah Quux"))
+        session.execute(delete(models.User).where(models.User.id == rows[4]["id"]))
+        session.commit()
+    assert found(engine, "zebed") == ["Zebediah Quux"]
+    assert found(engine, "sharm") == []
+
+
+def test_index_survives_renumbered_rowids(engine):
+    search.install(engine)
+    rows = users(NAMES)
+    with Session(engine) as session:
+        session.execute(insert(models.User), rows)
+        session.execute(delete(models.User).where(models.User.id.in_([rows[0]["id"], rows[1]["id"]])))
+        session.commit()
+    renumber(engine)
+    assert found(engine, "anand") == ["Anandi Joshi", "Ravi Anand"]
+    assert found(engine, "priya") == ["Priya Sharma"]
+    with Session(engine) as session:
+        session.execute(insert(models.User), users(["Kumar Anand"], start=len(NAMES)))
+        session.commit()
+    assert found(engine, "anand") == ["Anandi Joshi", "Kumar Anand", "Ravi Anand"]
+
+
+def test_install_replaces_an_index_keyed_on_rowid(engine):
+    with Session(engine) as session:
+        session.execute(insert(models.User), users(NAMES))
+        session.commit()
+    with engine.begin() as conn:
+        for statement in _ROWID_LAYOUT:
+            conn.exec_driver_sql(statement)
+    search.install(engine)
+    with Session(engine) as session:
+        session.execute(insert(models.User), users(["Kumar Anand"], start=len(NAMES)))
+        session.commit()
+    renumber(engine)
+    assert found(engine, "anand") == ["Anand Kumar", "Anandi Joshi", "Kumar Anand", "Ravi Anand"]
+    search.install(engine)  # already keyed on search_rowid: nothing to do
+    assert found(engine, "kumar") == ["Anand Kumar", "Kumar Anand", "Kumari Devi"]
@@ -11,4 +11,19 @@ export function setToken(token) {
   else delete api.defaults.headers.common["Authorization"];
 }
 
+// List endpoints return one page at a time and send the cursor for the next
+// page in X-Next-Cursor; follow it until the list is complete.
+export async function getAll(url, params = {}) {
+  const items = [];
+  let cursor = null;
+  do {
+    const res = await api.get(url, {
+      params: { ...params, limit: 1000, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return items;
+}
+
 export default api;
\ No newline at end of file
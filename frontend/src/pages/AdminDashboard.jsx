@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import api from "../api";
+import api, { getAll } from "../api";
 import Navbar from "../components/Navbar";
 
 export default function AdminDashboard({ user }) {
@@ -25,19 +25,19 @@ export default function AdminDashboard({ user }) {
   // LOAD DATA
   // ---------------------------
   const loadData = async () => {
-    const empRes = await api.get("/admin/employees");
-    const expRes = await api.get("/admin/expenses/pending");
+    const empList = await getAll("/admin/employees");
+    const pending = await getAll("/admin/expenses/pending");
 
     // Attach employee name to expense
-    const Mapped = expRes.data.map((e) => {
-      const emp = empRes.data.find((x) => x.id === e.employee_id);
+    const Mapped = pending.map((e) => {
+      const emp = empList.find((x) => x.id === e.employee_id);
       return {
         ...e,
         employee_name: emp ? emp.full_name || emp.email : "Unknown",
       };
     });
 
-    setEmployees(empRes.data);
+    setEmployees(empList);
     setExpenses(Mapped);
   };
 
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import api from "../api";
+import api, { getAll } from "../api";
 import Navbar from "../components/Navbar";
 
 // Chart.js
@@ -40,11 +40,11 @@ export default function EmployeeDashboard({ user }) {
   useEffect(() => {
     const load = async () => {
       try {
-        const s = await api.get("/employee/salary-slip");
-        const e = await api.get("/employee/expense");
+        const s = await getAll("/employee/salary-slip");
+        const e = await getAll("/employee/expense");
 
-        setSlips(s.data);
-        setExpenses(e.data);
+        setSlips(s);
+        setExpenses(e);
       } catch (err) {
         console.error("Failed loading data:", err);
       }